@@ -1,21 +1,54 @@
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify, flash
+from flask import Flask, render_template, request, redirect, url_for, session, jsonify, flash, g
 import os
 import math
 import sqlite3
 from werkzeug.utils import secure_filename
 from config import Config
-from utils.db_helper import get_db, close_db
+from utils.db_helper import get_db, close_db, DEFAULT_DATABASE_PATH
 from utils.helper import calculate_book_price, format_authors, safe_thumbnail
-from utils.category_mapper import get_display_categories, get_sql_conditions_for_category, get_normalized_category
+from utils.category_mapper import CATEGORY_MAPPING, get_display_categories, get_sql_conditions_for_category
+from utils.cart_store import SQLiteCartStore, EMPTY_CART
+from utils.pricing import PricingEngine, COUPONS, reprice_items
+from utils.book import Book
+from utils.book_fragments import BookFragmentCache, render_books_page
+from utils.catalog_bootstrap import BootstrapCache, render_bootstrap, DEFAULT_PRICE_MAX, PER_PAGE, FEATURED
+from utils.facets import PRICE_BOUNDS, RATING_BOUNDS, bucket_sql, count_facets
+from utils.compression import Compressor, precompressed
+from utils.metrics import Metrics
+from utils.admission import AdmissionControl
+from utils.query_log import QueryLog
+from utils.lazy import LazyProxy
+from utils.assets import init_assets
+from utils.template_cache import init_template_cache, preload_templates
+from utils.thumbnails import ThumbnailCache, SIZES as THUMBNAIL_SIZES, send_thumbnail
+from utils.exports import Exporter, sqlite_rows
+from utils.swr_cache import SWRCache
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 import re
-import boto3
-from botocore.exceptions import ClientError
 
 app = Flask(__name__)
 app.config.from_object(Config)
 
+# gzip/brotli negotiation for HTML and JSON responses
+compressor = Compressor(app)
+
+# Latency histograms, query/AWS call timings and cache stats at /metrics
+metrics = Metrics(app)
+
+# Per-class rate and concurrency limits; browse/search spikes are shed with 429/503
+admission = AdmissionControl(app)
+metrics.add_collector(admission.metric_lines)
+
+# Slow SQLite statements with EXPLAIN QUERY PLAN at /admin/slow-queries
+query_log = QueryLog(app)
+
+# Fingerprinted static assets (python build_assets.py) via asset_url()
+init_assets(app)
+
+# Compiled templates persist across restarts in a bytecode cache
+init_template_cache(app)
+
 # Register database teardown
 app.teardown_appcontext(close_db)
 
@@ -27,43 +60,124 @@ except OSError:
 
 # User storage is now handled via database
 
+# Carts live server-side; the session only carries the cart ID
+cart_store = SQLiteCartStore(get_db)
+pricing_engine = PricingEngine()
+
+# Pre-serialized /api/books fragments, reused while their book's row is unchanged
+book_fragments = BookFragmentCache()
+
+# Homepage aggregates and related books, served stale-while-revalidate; `app` lets
+# background refreshes open their own connection via get_db()
+catalog_cache = SWRCache(
+    soft_ttl=app.config['CATALOG_CACHE_SOFT_TTL'],
+    hard_ttl=app.config['CATALOG_CACHE_HARD_TTL'],
+    version=lambda: book_fragments.catalog_version,
+    app=app
+)
+metrics.add_collector(lambda: catalog_cache.metric_lines('catalog'))
+
+# The catalog page's first-load document, an entry of the catalog cache
+catalog_bootstrap = BootstrapCache(catalog_cache)
+
+# Streaming NDJSON/CSV downloads of the catalog and orders (/admin/export/<dataset>)
+exporter = Exporter(app, rows=lambda dataset, since: sqlite_rows(
+    app.config.get('DATABASE_PATH', DEFAULT_DATABASE_PATH), dataset, since
+))
+
+# Resized book covers, cached on disk
+thumbnails = ThumbnailCache(
+    app.config.get('THUMBNAIL_CACHE_DIR') or os.path.join(app.instance_path, 'thumbnails')
+)
+
+metrics.track_caches(
+    pricing=pricing_engine,
+    book_fragments=book_fragments,
+    catalog_bootstrap=catalog_bootstrap,
+    catalog=catalog_cache,
+    compression=compressor,
+    template_bytecode=app.jinja_env.bytecode_cache
+)
+
+def _sns_client():
+    import boto3  # Only loaded once an order confirmation is actually sent
+    metrics.instrument_boto3()
+    return boto3.client('sns', region_name=os.getenv('AWS_DEFAULT_REGION', 'us-east-1'))
+
+# Order confirmations (SNS_TOPIC_ARN); the client is created on first publish
+sns = LazyProxy(_sns_client)
+
 
 # Helper to map DB row to frontend book object
 def map_book_row(row):
-    """Convert database row to dictionary with frontend-friendly keys."""
-    if not row:
-        return None
-    
-    book = dict(row)
-    
-    # Map database columns to frontend keys
-    book['id'] = row['isbn13']  # Use isbn13 as ID since no auto-increment id column
-    book['title'] = row['title'] or 'Untitled'
-    book['author'] = row['authors'] or 'Unknown Author'
-    book['category'] = get_normalized_category(row['categories']) # Logic normalization
-    # book['original_category'] = row['categories'] # debug
-    book['price'] = float(row['price']) if row['price'] else 399.0
-    book['stock'] = int(row['stock']) if row['stock'] else 0
-    book['image'] = row['thumbnail'] or '/static/images/book-placeholder.jpg'
-    book['rating'] = float(row['average_rating']) if row['average_rating'] else 0.0
-    book['description'] = row['description'] or 'No description available.'
-    book['isbn'] = row['isbn13']
-    book['isbn10'] = row['isbn10'] or ''
-    book['subtitle'] = row['subtitle'] or ''
-    book['publisher'] = "Unknown Publisher"  # Not in CSV schema
-    book['pages'] = int(row['num_pages']) if row['num_pages'] else 0
-    book['language'] = "English"  # Default language
-    book['pub_date'] = str(int(row['published_year'])) if row['published_year'] else "Unknown"
-    book['ratings_count'] = int(row['ratings_count']) if row['ratings_count'] else 0
-    book['reviews'] = []  # Placeholder for future review feature
-    
-    return book
+    """Convert database row to a Book with frontend-friendly attributes."""
+    return Book.from_row(row)
+
+
+def get_cart_id(create=False):
+    """Return the session's cart ID, creating a server-side cart if asked."""
+    cart_id = session.get('cart_id')
+    if not cart_id and create:
+        cart_id = cart_store.create_cart()
+        session['cart_id'] = cart_id
+        session['cart_count'] = 0
+    return cart_id
+
+
+def load_cart():
+    """
+    Load the session's Cart (items, coupon, version) lazily, at most once per
+    request. The session's cart badge count is taken from what the store holds.
+    """
+    if 'cart' not in g:
+        cart_id = session.get('cart_id')
+        g.cart = cart_store.load(cart_id) if cart_id else EMPTY_CART
+        if session.get('cart_count', 0) != len(g.cart.items):
+            session['cart_count'] = len(g.cart.items)
+    return g.cart
+
+
+def refresh_cart_count(cart_id):
+    """Recount the session's cart badge from the store after a write; returns the count."""
+    session['cart_count'] = cart_store.count(cart_id)
+    return session['cart_count']
+
+
+def fetch_catalog_rows(isbns):
+    """Read current price and stock for many books with a single query."""
+    isbns = list(isbns)
+    if not isbns:
+        return {}
+    
+    placeholders = ','.join('?' * len(isbns))
+    rows = get_db().execute(
+        f'SELECT isbn13, price, stock FROM books WHERE isbn13 IN ({placeholders})', isbns
+    ).fetchall()
+    return {r['isbn13']: {'price': r['price'], 'stock': r['stock'] or 0} for r in rows}
+
+
+def price_cart(reprice=False):
+    """
+    Price the session's cart with the shared engine (memoized per cart version).
+    With reprice=True the lines are first repriced in batch against the catalog.
+    Returns (cart_items, coupon, totals).
+    """
+    cart = load_cart()
+    cart_items, version = cart.items, cart.version
+    
+    if reprice and cart_items:
+        cart_items, changed = reprice_items(cart_items, fetch_catalog_rows(i['isbn13'] for i in cart_items))
+        if changed:
+            cart_store.set_prices(session['cart_id'], changed)
+            version = None  # Stored version no longer matches the repriced lines
+    
+    totals = pricing_engine.price(cart_items, cart.coupon, session.get('cart_id'), version)
+    return cart_items, cart.coupon, totals
 
 # ==================== PUBLIC ROUTES ====================
 
-@app.route('/')
-def index():
-    """Homepage with featured books, categories, and recent additions."""
+def load_home_aggregates():
+    """Featured and recent books plus catalog statistics for the homepage."""
     db = get_db()
     
     # Featured books (highest rated with most reviews)
@@ -75,19 +189,6 @@ def index():
     ).fetchall()
     featured_books = [map_book_row(r) for r in featured_rows]
     
-    category_rows = db.execute(
-        '''SELECT DISTINCT categories FROM books 
-           WHERE categories IS NOT NULL AND categories != ''
-           LIMIT 50'''
-    ).fetchall()
-    # Normalize and get unique set for display if needed mixed with predefined?
-    # Actually, index page categories row usually shows 'cards' or links. 
-    # Let's just use the clean list from mapper for the "Browse by Category" section if we controlled it.
-    # But for now, let's keep the backend logic consistent.
-    # The index page might show random ones, let's normalize them too just in case.
-    # But easier: just pass the 8 main ones from mapper.
-    categories = get_display_categories()[:8]
-    
     # Recently published books
     recent_rows = db.execute(
         '''SELECT * FROM books 
@@ -97,6 +198,23 @@ def index():
     ).fetchall()
     recent_books = [map_book_row(r) for r in recent_rows]
     
+    # Statistics
+    total_books = db.execute('SELECT COUNT(*) as count FROM books').fetchone()['count']
+    avg_rating = db.execute(
+        'SELECT AVG(average_rating) as avg FROM books WHERE average_rating IS NOT NULL'
+    ).fetchone()['avg']
+    return featured_books, recent_books, total_books, avg_rating
+
+
+@app.route('/')
+@precompressed
+def index():
+    """Homepage with featured books, categories, and recent additions."""
+    # The 8 main display categories from the mapper
+    categories = get_display_categories()[:8]
+    
+    featured_books, recent_books, total_books, avg_rating = catalog_cache.get(('home',), load_home_aggregates)
+    
     # Testimonials
     testimonials = [
         {
@@ -116,12 +234,6 @@ def index():
         }
     ]
     
-    # Statistics
-    total_books = db.execute('SELECT COUNT(*) as count FROM books').fetchone()['count']
-    avg_rating = db.execute(
-        'SELECT AVG(average_rating) as avg FROM books WHERE average_rating IS NOT NULL'
-    ).fetchone()['avg']
-    
     return render_template(
         'index.html',
         featured_books=featured_books,
@@ -134,6 +246,7 @@ def index():
 
 
 @app.route('/catalog')
+@precompressed
 def catalog():
     """Catalog page with filtering and sorting."""
     # Use logical categories
@@ -143,20 +256,31 @@ def catalog():
 
 
 @app.route('/api/books')
+@precompressed
 def get_books():
     """API endpoint for filtered and paginated book list."""
     db = get_db()
     
-    # Base query
-    query = 'SELECT * FROM books WHERE 1=1'
-    params = []
+    # Search and author filters (these also scope the facet counts)
+    scope = ''
+    scope_params = []
     
     # Search filter
     search_query = request.args.get('q', '').strip()
     if search_query:
-        query += ' AND (LOWER(title) LIKE ? OR LOWER(authors) LIKE ? OR LOWER(description) LIKE ?)'
+        scope += ' AND (LOWER(title) LIKE ? OR LOWER(authors) LIKE ? OR LOWER(description) LIKE ?)'
         search_param = f'%{search_query.lower()}%'
-        params.extend([search_param, search_param, search_param])
+        scope_params.extend([search_param, search_param, search_param])
+    
+    # Author filter
+    author = request.args.get('author', '').strip()
+    if author:
+        scope += ' AND LOWER(authors) LIKE ?'
+        scope_params.append(f'%{author.lower()}%')
+    
+    # Base query
+    query = 'SELECT * FROM books WHERE 1=1' + scope
+    params = list(scope_params)
     
     # Category filter (Normalized Logic)
     category = request.args.get('category', '').strip()
@@ -175,12 +299,6 @@ def get_books():
     except ValueError:
         price_max = 2000
     
-    # Author filter
-    author = request.args.get('author', '').strip()
-    if author:
-        query += ' AND LOWER(authors) LIKE ?'
-        params.append(f'%{author.lower()}%')
-    
     # Stock filter
     in_stock = request.args.get('in_stock', '').lower() == 'true'
     if in_stock:
@@ -220,20 +338,85 @@ def get_books():
     
     # Execute query
     rows = db.execute(query, params).fetchall()
-    books_data = [map_book_row(r) for r in rows]
+    fragments = book_fragments.fragments(rows, to_book=map_book_row)
     
     total_pages = math.ceil(total_books / per_page) if total_books > 0 else 1
     
-    return jsonify({
-        'books': books_data,
-        'total': total_books,
-        'page': page,
-        'pages': total_pages,
-        'per_page': per_page
-    })
+    # Facet counts depend on the filters only, not the sort or page
+    facets = None
+    if request.args.get('facets', '').lower() == 'true':
+        facets = catalog_cache.get(
+            ('facets', search_query.lower(), author.lower(), category, price_max, in_stock),
+            lambda: load_facets(scope, scope_params, category, price_max, in_stock)
+        )
+    
+    body = render_books_page(fragments, total_books, page, total_pages, per_page, facets)
+    return app.response_class(body, mimetype='application/json')
+
+
+def load_facets(scope, scope_params, category, price_max, in_stock):
+    """
+    get_books() facet counts from one grouped query over the books in `scope`.
+    Like the category filter, a raw category counts toward every display
+    category with a matching keyword.
+    """
+    groups = get_db().execute(
+        f'''SELECT LOWER(categories), {bucket_sql('price', PRICE_BOUNDS)}, price <= ?, stock > 0,
+                  {bucket_sql('average_rating', RATING_BOUNDS)}, COUNT(*)
+           FROM books WHERE 1=1{scope} GROUP BY 1, 2, 3, 4, 5''',
+        [price_max] + scope_params
+    ).fetchall()
+    matches = {}
+    rows = []
+    for raw, price, within_price, stocked, rating, count in groups:
+        if raw not in matches:
+            matches[raw] = tuple(
+                name for name, keywords in CATEGORY_MAPPING.items()
+                if raw and any(keyword in raw for keyword in keywords)
+            )
+        rows.append((matches[raw], price, bool(within_price), bool(stocked), rating, count))
+    # As in get_books(), a category outside the mapping (or 'All') filters nothing
+    return count_facets(rows, category if category in CATEGORY_MAPPING else None, price_max, in_stock)
+
+
+@app.route('/api/catalog/bootstrap')
+@precompressed
+def catalog_bootstrap_document():
+    """Categories with counts, the default first page and featured books in one response."""
+    return app.response_class(catalog_bootstrap.get(build_catalog_bootstrap), mimetype='application/json')
+
+
+def build_catalog_bootstrap():
+    db = get_db()
+    
+    # Counts match /api/books' category filter (any keyword LIKE the raw categories),
+    # applied to the few hundred distinct raw values rather than to every row
+    counts = dict.fromkeys(get_display_categories(), 0)
+    raw_counts = db.execute(
+        '''SELECT LOWER(categories), COUNT(*) FROM books
+           WHERE price <= ? AND categories IS NOT NULL GROUP BY 1''',
+        (DEFAULT_PRICE_MAX,)
+    ).fetchall()
+    for raw, count in raw_counts:
+        for category, keywords in CATEGORY_MAPPING.items():
+            if any(keyword in raw for keyword in keywords):
+                counts[category] += count
+
+    total_books = db.execute(
+        'SELECT COUNT(*) FROM books WHERE price <= ?', (DEFAULT_PRICE_MAX,)
+    ).fetchone()[0]
+    rows = db.execute(
+        'SELECT * FROM books WHERE price <= ? ORDER BY average_rating DESC, ratings_count DESC LIMIT ?',
+        (DEFAULT_PRICE_MAX, PER_PAGE)
+    ).fetchall()
+    fragments = book_fragments.fragments(rows, to_book=map_book_row)
+    
+    # The sidebar's featured books are the top of the default (highest rated) page
+    return render_bootstrap(counts.items(), fragments, total_books, fragments[:FEATURED])
 
 
 @app.route('/book/<isbn13>')
+@precompressed
 def product_details(isbn13):
     """Individual book detail page."""
     db = get_db()
@@ -246,18 +429,34 @@ def product_details(isbn13):
         return render_template('404.html', message="Book not found"), 404
     
     # Fetch related books (same category, exclude current book)
-    related_rows = db.execute(
-        '''SELECT * FROM books 
-           WHERE categories = ? AND isbn13 != ? 
-           ORDER BY average_rating DESC 
-           LIMIT 4''',
-        (book['category'], isbn13)
-    ).fetchall()
-    related_books = [map_book_row(r) for r in related_rows]
+    def load_related():
+        related_rows = get_db().execute(
+            '''SELECT * FROM books 
+               WHERE categories = ? AND isbn13 != ? 
+               ORDER BY average_rating DESC 
+               LIMIT 4''',
+            (book.categories, isbn13)
+        ).fetchall()
+        return [map_book_row(r) for r in related_rows]
+    
+    related_books = catalog_cache.get(('related', isbn13), load_related)
     
     return render_template('product_details.html', book=book, related_books=related_books)
 
 
+@app.route('/img/<isbn13>/<size>')
+def book_image(isbn13, size):
+    """Same-origin, resized book cover (WebP or JPEG) from the thumbnail cache."""
+    if size not in THUMBNAIL_SIZES:
+        return '', 404
+    
+    def source_url():
+        row = get_db().execute('SELECT thumbnail FROM books WHERE isbn13 = ?', (isbn13,)).fetchone()
+        return row['thumbnail'] if row else None
+    
+    return send_thumbnail(thumbnails, isbn13, size, source_url)
+
+
 @app.route('/search')
 def search():
     """Search results page."""
@@ -663,36 +862,11 @@ def checkout():
     if 'user_id' not in session:
         return redirect(url_for('login'))
 
-    cart_items = session.get('cart', [])
-    if not cart_items:
+    if not load_cart().items:
         return redirect(url_for('cart'))
-        
-    coupon = session.get('coupon', None)
     
-    # Calculate totals again for display (logic duplicated for now, could be helper)
-    subtotal = sum(item['price'] * item['quantity'] for item in cart_items)
-    
-    discount = 0
-    if coupon:
-        if coupon['type'] == 'percent':
-            discount = subtotal * (coupon['value'] / 100)
-        elif coupon['type'] == 'fixed':
-            discount = coupon['value']
-    
-    shipping = 0 if subtotal > 500 else 50
-    if subtotal == 0: shipping = 0
-        
-    taxable_amount = max(0, subtotal - discount)
-    tax = taxable_amount * 0.18
-    total = max(0, subtotal - discount + shipping + tax)
-    
-    totals = {
-        'subtotal': subtotal,
-        'discount': discount,
-        'shipping': shipping,
-        'tax': tax,
-        'total': total
-    }
+    # Show what the order will actually cost at current catalog prices
+    cart_items, coupon, totals = price_cart(reprice=True)
     
     db = get_db()
     user = None
@@ -704,9 +878,10 @@ def checkout():
 @app.route('/checkout/place-order', methods=['POST'])
 def place_order():
     """Place order and send confirmation email via AWS SNS."""
-    # Cart is a list of items in the session
-    cart_items = session.get('cart', [])
-    if not cart_items:
+    # Cart lines live in the server-side cart store
+    cart = load_cart()
+    coupon = cart.coupon
+    if not cart.items:
         return jsonify({'success': False, 'message': 'Cart is empty'}), 400
     
     try:
@@ -730,41 +905,23 @@ def place_order():
         if not all([full_name, email, phone, address1, city, state, pincode]):
             return jsonify({'success': False, 'message': 'Please fill all required fields'}), 400
         
-        # Recalculate Totals (Secure source of truth)
-        subtotal = sum(item['price'] * item['quantity'] for item in cart_items)
-        coupon = session.get('coupon', None)
-        discount = 0
-        if coupon:
-            if coupon['type'] == 'percent':
-                discount = subtotal * (coupon['value'] / 100)
-            elif coupon['type'] == 'fixed':
-                discount = coupon['value']
+        # Batch-read current price and stock for every line (one query)
+        db = get_db()
+        catalog_rows = fetch_catalog_rows(item['isbn13'] for item in cart.items)
         
-        shipping = 0 if subtotal > 500 else 50
-        if subtotal == 0: 
-            shipping = 0
-            
-        taxable_amount = max(0, subtotal - discount)
-        tax = taxable_amount * 0.18
-        total = max(0, subtotal - discount + shipping + tax)
-
-        totals = {
-            'subtotal': subtotal,
-            'discount': discount,
-            'shipping': shipping,
-            'tax': tax,
-            'total': total
-        }
+        # Recalculate Totals (Secure source of truth)
+        cart_items, changed = reprice_items(cart.items, catalog_rows)
+        totals = pricing_engine.price(
+            cart_items, coupon, session['cart_id'], None if changed else cart.version
+        )
 
         # Generate Order ID
         import secrets
         order_id = f"ORD-{datetime.now().year}-{secrets.token_hex(4).upper()}"
         
-        db = get_db()
-        
         # Verify stock
         for item in cart_items:
-            book = db.execute('SELECT stock FROM books WHERE isbn13 = ?', (item['isbn13'],)).fetchone()
+            book = catalog_rows.get(item['isbn13'])
             if not book or book['stock'] < item['quantity']:
                 return jsonify({
                     'success': False,
@@ -784,11 +941,11 @@ def place_order():
             email,
             full_name,
             phone,
-            totals['subtotal'],
-            totals['discount'],
-            totals['shipping'],
-            totals['tax'],
-            totals['total'],
+            float(totals['subtotal']),
+            float(totals['discount']),
+            float(totals['shipping']),
+            float(totals['tax']),
+            float(totals['total']),
             coupon.get('code') if coupon else None,
             'Pending'
         ))
@@ -803,9 +960,9 @@ def place_order():
                 order_id,
                 item['isbn13'],
                 item['title'],
-                item['price'],
+                float(item['price']),
                 item['quantity'],
-                item['price'] * item['quantity']
+                float(item['subtotal'])
             ))
             
             db.execute(
@@ -825,18 +982,17 @@ def place_order():
         ))
         
         db.commit()
+        # Stock only: cached aggregates refresh in the background, fragments follow their rows
+        catalog_cache.expire()
         
         # Clear cart
-        session.pop('cart', None)
-        session.pop('coupon', None)
-        session.modified = True
+        cart_store.clear(session['cart_id'])
+        session['cart_count'] = 0
         
         # ============================================================
         # Send Order Confirmation via AWS SNS
         # ============================================================
         try:
-            # Initialize SNS client
-            sns_client = boto3.client('sns', region_name=os.getenv('AWS_DEFAULT_REGION', 'us-east-1'))
             sns_topic_arn = os.getenv('SNS_TOPIC_ARN')
             
             if sns_topic_arn:
@@ -903,7 +1059,7 @@ This is an automated message. Please do not reply to this email.
 """
                 
                 # Publish to SNS Topic
-                response = sns_client.publish(
+                response = sns.publish(
                     TopicArn=sns_topic_arn,
                     Subject=email_subject,
                     Message=email_body,
@@ -933,17 +1089,15 @@ This is an automated message. Please do not reply to this email.
                 print("⚠️  SNS_TOPIC_ARN not configured. Email notification skipped.")
                 print(f"   Order ID: {order_id} placed successfully without notification.")
                 
-        except ClientError as e:
-            error_code = e.response['Error']['Code']
-            error_message = e.response['Error']['Message']
-            print(f"❌ SNS Error: {error_code} - {error_message}")
-            print(f"   Order {order_id} was placed but email notification failed.")
-            # Don't fail the order if email fails
-            
         except Exception as e:
-            print(f"⚠️  Email notification failed: {e}")
-            print(f"   Order {order_id} was placed successfully.")
             # Don't fail the order if email fails
+            error = getattr(e, 'response', None)  # botocore's ClientError, without importing botocore here
+            if isinstance(error, dict) and 'Error' in error:
+                print(f"❌ SNS Error: {error['Error'].get('Code')} - {error['Error'].get('Message')}")
+                print(f"   Order {order_id} was placed but email notification failed.")
+            else:
+                print(f"⚠️  Email notification failed: {e}")
+                print(f"   Order {order_id} was placed successfully.")
         
         return jsonify({
             'success': True,
@@ -987,37 +1141,7 @@ def order_confirmation(order_id):
 @app.route('/cart')
 def cart():
     """Shopping cart page."""
-    cart_items = session.get('cart', [])
-    coupon = session.get('coupon', None)
-    
-    # Calculate totals
-    subtotal = sum(item['price'] * item['quantity'] for item in cart_items)
-    
-    discount = 0
-    if coupon:
-        if coupon['type'] == 'percent':
-            discount = subtotal * (coupon['value'] / 100)
-        elif coupon['type'] == 'fixed':
-            discount = coupon['value']
-    
-    # Shipping logic (Free if > 500)
-    shipping = 0 if subtotal > 500 else 50
-    if subtotal == 0:
-        shipping = 0
-        
-    # Tax (18% GST on subtotal after discount + shipping) - Simplified: Tax on (Subtotal - Discount)
-    taxable_amount = max(0, subtotal - discount)
-    tax = taxable_amount * 0.18
-    
-    total = max(0, subtotal - discount + shipping + tax)
-    
-    totals = {
-        'subtotal': subtotal,
-        'discount': discount,
-        'shipping': shipping,
-        'tax': tax,
-        'total': total
-    }
+    cart_items, coupon, totals = price_cart()
     
     return render_template('cart.html', cart_items=cart_items, totals=totals, coupon=coupon)
 
@@ -1035,39 +1159,19 @@ def add_to_cart():
     if not isbn13:
         return jsonify({'success': False, 'message': 'Invalid book'}), 400
     
-    # Initialize cart in session
-    if 'cart' not in session:
-        session['cart'] = []
-    
-    # Check if book already in cart
-    cart = session['cart']
-    found = False
-    
-    for item in cart:
-        if item['isbn13'] == isbn13:
-            item['quantity'] += quantity
-            found = True
-            break
+    cart_id = get_cart_id(create=True)
     
-    if not found:
+    # Single-row update if the book is already in the cart
+    if not cart_store.increment(cart_id, isbn13, quantity):
         # Fetch book details
         db = get_db()
         book_row = db.execute('SELECT * FROM books WHERE isbn13 = ?', (isbn13,)).fetchone()
         
         if book_row:
             book = map_book_row(book_row)
-            cart.append({
-                'isbn13': isbn13,
-                'title': book['title'],
-                'price': book['price'],
-                'image': book['image'],
-                'quantity': quantity
-            })
-    
-    session['cart'] = cart
-    session.modified = True
+            cart_store.add_line(cart_id, isbn13, book.title, book.price, book.image, quantity)
     
-    return jsonify({'success': True, 'cart_count': len(cart), 'message': 'Added to cart'})
+    return jsonify({'success': True, 'cart_count': refresh_cart_count(cart_id), 'message': 'Added to cart'})
 
 
 @app.route('/api/cart/update', methods=['POST'])
@@ -1077,15 +1181,10 @@ def update_cart_item():
     isbn13 = data.get('isbn13')
     quantity = int(data.get('quantity', 1))
     
-    cart = session.get('cart', [])
+    cart_id = get_cart_id()
+    if cart_id:
+        cart_store.set_quantity(cart_id, isbn13, max(1, quantity))  # Ensure at least 1
     
-    for item in cart:
-        if item['isbn13'] == isbn13:
-            item['quantity'] = max(1, quantity) # Ensure at least 1
-            break
-            
-    session['cart'] = cart
-    session.modified = True
     return jsonify({'success': True})
 
 
@@ -1095,23 +1194,22 @@ def remove_from_cart():
     data = request.get_json()
     isbn13 = data.get('isbn13')
     
-    cart = session.get('cart', [])
-    session['cart'] = [item for item in cart if item['isbn13'] != isbn13]
-    session.modified = True
-    
-    # If cart empty, remove coupon too
-    if not session['cart']:
-        session.pop('coupon', None)
+    cart_id = get_cart_id()
+    if cart_id and cart_store.remove(cart_id, isbn13):
+        # If cart empty, remove coupon too
+        if not refresh_cart_count(cart_id):
+            cart_store.set_coupon(cart_id, None)
         
-    return jsonify({'success': True, 'cart_count': len(session['cart'])})
+    return jsonify({'success': True, 'cart_count': session.get('cart_count', 0)})
 
 
 @app.route('/api/cart/clear', methods=['POST'])
 def clear_cart():
     """Clear entire cart."""
-    session['cart'] = []
-    session.pop('coupon', None)
-    session.modified = True
+    cart_id = get_cart_id()
+    if cart_id:
+        cart_store.clear(cart_id)
+    session['cart_count'] = 0
     return jsonify({'success': True})
 
 
@@ -1121,18 +1219,11 @@ def apply_coupon():
     data = request.get_json()
     code = data.get('code', '').upper()
     
-    # Mock coupons
-    coupons = {
-        'BOOK20': {'type': 'percent', 'value': 20, 'desc': '20% Off'},
-        'FIRST100': {'type': 'fixed', 'value': 100, 'desc': '₹100 Off'},
-        'WELCOME20': {'type': 'percent', 'value': 20, 'desc': 'Welcome Offer'}
-    }
-    
-    if code in coupons:
-        session['coupon'] = {
+    if code in COUPONS:
+        cart_store.set_coupon(get_cart_id(create=True), {
             'code': code,
-            **coupons[code]
-        }
+            **COUPONS[code]
+        })
         return jsonify({'success': True, 'message': f'Coupon {code} applied!'})
     
     return jsonify({'success': False, 'message': 'Invalid coupon code.'})
@@ -1209,6 +1300,7 @@ def add_book():
                 image or '/static/images/book-placeholder.jpg', 0, 0, datetime.now().year, 0
             ))
             db.commit()
+            book_fragments.invalidate(isbn13)
             flash('Book added successfully!', 'success')
             return redirect(url_for('admin_books'))
             
@@ -1232,6 +1324,7 @@ def delete_book(isbn13):
         db = get_db()
         db.execute('DELETE FROM books WHERE isbn13 = ?', (isbn13,))
         db.commit()
+        book_fragments.invalidate(isbn13)
         return jsonify({'success': True, 'message': 'Book deleted successfully'})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -1323,6 +1416,10 @@ def internal_error(error):
     """500 error handler."""
     return render_template('500.html'), 500
 
+# Compile all templates now (filters above must be registered first)
+if app.config.get('TEMPLATE_PRELOAD', True):
+    preload_templates(app)
+
 # ==================== RUN APPLICATION ====================
 
 if __name__ == '__main__':
@@ -1,12 +1,33 @@
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify, flash
+from flask import Flask, render_template, request, redirect, url_for, session, jsonify, flash, g
 import os
+import json
 import math
 import boto3
-from boto3.dynamodb.conditions import Key, Attr
+from boto3.dynamodb.conditions import Key, Attr, ConditionExpressionBuilder
+from boto3.dynamodb.types import TypeSerializer
 from decimal import Decimal
 from werkzeug.utils import secure_filename
 from config import Config
-from utils.category_mapper import get_display_categories, get_normalized_category
+from utils.category_mapper import get_display_categories
+from utils.cart_store import DynamoCartStore, EMPTY_CART
+from utils.pricing import PricingEngine, COUPONS, reprice_items
+from utils.dynamo_codec import deserialize_book, deserialize_item
+from utils.book_fragments import BookFragmentCache, render_books_page
+from utils.catalog_bootstrap import BootstrapCache, render_bootstrap, DEFAULT_PRICE_MAX, PER_PAGE, FEATURED
+from utils.facets import book_rows, count_facets
+from utils.bitmap_index import popcount
+from utils.compression import Compressor, precompressed
+from utils.metrics import Metrics
+from utils.admission import AdmissionControl
+from utils.capacity import CapacityTracker
+from utils.lazy import LazyProxy
+from utils.catalog_snapshot import SnapshotManager
+from utils.single_flight import SingleFlight
+from utils.swr_cache import SWRCache
+from utils.assets import init_assets
+from utils.template_cache import init_template_cache, preload_templates
+from utils.thumbnails import ThumbnailCache, SIZES as THUMBNAIL_SIZES, send_thumbnail
+from utils.exports import Exporter, dynamodb_rows
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 import re
@@ -18,18 +39,106 @@ load_dotenv()
 app = Flask(__name__)
 app.config.from_object(Config)
 
+# gzip/brotli negotiation for HTML and JSON responses
+compressor = Compressor(app)
+
+# Latency histograms, query/AWS call timings and cache stats at /metrics
+metrics = Metrics(app)
+
+# Per-class rate and concurrency limits; browse/search spikes are shed with 429/503
+admission = AdmissionControl(app)
+metrics.add_collector(admission.metric_lines)
+
+# Fingerprinted static assets (python build_assets.py) via asset_url()
+init_assets(app)
+
+# Compiled templates persist across restarts in a bytecode cache
+init_template_cache(app)
+
+# Consumed read/write units per route and table (/admin/capacity)
+capacity = CapacityTracker(app)
+
 # DynamoDB Configuration
+# Clients, the resource and tables are built on first use: loading boto3's
+# service models is the bulk of a cold start and many workers never need SNS.
 AWS_REGION = os.getenv('AWS_DEFAULT_REGION', 'us-east-1')
-dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
-sns = boto3.client('sns', region_name=AWS_REGION)
+
+def _dynamodb_resource():
+    resource = boto3.resource('dynamodb', region_name=AWS_REGION)
+    capacity.instrument(resource.meta.client)
+    return resource
+
+def _dynamodb_client():
+    # Low-level client for hot read paths; items are decoded by utils.dynamo_codec
+    client = boto3.client('dynamodb', region_name=AWS_REGION)
+    capacity.instrument(client)
+    return client
+
+def _table(name):
+    return LazyProxy(lambda: dynamodb.Table(name))
+
+dynamodb = LazyProxy(_dynamodb_resource)
+dynamodb_client = LazyProxy(_dynamodb_client)
+sns = LazyProxy(lambda: boto3.client('sns', region_name=AWS_REGION))
 
 # Table references
-books_table = dynamodb.Table('Books')
-users_table = dynamodb.Table('Users')
-admins_table = dynamodb.Table('Admins')
-orders_table = dynamodb.Table('Orders')
-order_items_table = dynamodb.Table('OrderItems')
-addresses_table = dynamodb.Table('DeliveryAddresses')
+books_table = _table('Books')
+users_table = _table('Users')
+admins_table = _table('Admins')
+orders_table = _table('Orders')
+order_items_table = _table('OrderItems')
+addresses_table = _table('DeliveryAddresses')
+carts_table = _table('Carts')
+
+# Carts live server-side; the session only carries the cart ID
+cart_store = DynamoCartStore(carts_table)
+pricing_engine = PricingEngine()
+
+# Identical concurrent reads (scans, item lookups, /api/books pages) share one backend call
+flights = SingleFlight()
+metrics.add_collector(flights.metric_lines)
+
+# Pre-serialized /api/books fragments, reused while their book's row is unchanged
+book_fragments = BookFragmentCache()
+
+# Homepage aggregates, related books and the full listing scan, served stale-while-revalidate
+catalog_cache = SWRCache(
+    soft_ttl=app.config['CATALOG_CACHE_SOFT_TTL'],
+    hard_ttl=app.config['CATALOG_CACHE_HARD_TTL'],
+    version=lambda: book_fragments.catalog_version
+)
+metrics.add_collector(lambda: catalog_cache.metric_lines('catalog'))
+
+# The catalog page's first-load document, an entry of the catalog cache
+catalog_bootstrap = BootstrapCache(catalog_cache)
+
+# Catalog listings from one snapshot file shared by every worker (CATALOG_SNAPSHOT)
+catalog_snapshot = SnapshotManager(
+    app,
+    build=lambda: scan_books_with_filter(),
+    on_swap=lambda snapshot: book_fragments.invalidate(),
+    on_stock=lambda: catalog_cache.expire(),  # Another worker's orders: facet counts refresh in the background
+    flights=flights
+)
+
+# Streaming NDJSON/CSV downloads of the catalog and orders (/admin/export/<dataset>)
+exporter = Exporter(app, rows=lambda dataset, since: dynamodb_rows(dynamodb_client, {
+    'books': books_table.name, 'orders': orders_table.name, 'order_items': order_items_table.name
+}, dataset, since))
+
+# Resized book covers, cached on disk
+thumbnails = ThumbnailCache(
+    app.config.get('THUMBNAIL_CACHE_DIR') or os.path.join(app.instance_path, 'thumbnails')
+)
+
+metrics.track_caches(
+    pricing=pricing_engine,
+    book_fragments=book_fragments,
+    catalog_bootstrap=catalog_bootstrap,
+    catalog=catalog_cache,
+    compression=compressor,
+    template_bytecode=app.jinja_env.bytecode_cache
+)
 
 # Ensure instance folder exists
 try:
@@ -39,70 +148,122 @@ except OSError:
 
 # ==================== HELPER FUNCTIONS ====================
 
-def decimal_to_float(obj):
-    """Convert Decimal to float for JSON serialization."""
-    if isinstance(obj, Decimal):
-        return float(obj)
-    elif isinstance(obj, dict):
-        return {k: decimal_to_float(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [decimal_to_float(i) for i in obj]
-    return obj
-
-def map_book_row(item):
-    """Convert DynamoDB item to dictionary with frontend-friendly keys."""
-    if not item:
-        return None
-    
-    # Convert Decimals to floats
-    item = decimal_to_float(item)
-    
-    book = dict(item)
-    book['id'] = item.get('isbn13', '')
-    book['title'] = item.get('title', 'Untitled')
-    book['author'] = item.get('authors', 'Unknown Author')
-    book['category'] = get_normalized_category(item.get('categories', ''))
-    book['price'] = float(item.get('price', 399.0))
-    book['stock'] = int(item.get('stock', 0))
-    book['image'] = item.get('thumbnail', '/static/images/book-placeholder.jpg')
-    book['rating'] = float(item.get('average_rating', 0.0))
-    book['description'] = item.get('description', 'No description available.')
-    book['isbn'] = item.get('isbn13', '')
-    book['isbn10'] = item.get('isbn10', '')
-    book['subtitle'] = item.get('subtitle', '')
-    book['publisher'] = "Unknown Publisher"
-    book['pages'] = int(item.get('num_pages', 0))
-    book['language'] = "English"
-    book['pub_date'] = str(int(item.get('published_year', 0))) if item.get('published_year') else "Unknown"
-    book['ratings_count'] = int(item.get('ratings_count', 0))
-    book['reviews'] = []
-    
-    return book
+def build_filter(filter_expression, kwargs):
+    """Render a boto3 condition into low-level FilterExpression request arguments."""
+    serializer = TypeSerializer()
+    expression = ConditionExpressionBuilder().build_expression(filter_expression)
+    kwargs['FilterExpression'] = expression.condition_expression
+    kwargs['ExpressionAttributeNames'] = expression.attribute_name_placeholders
+    if expression.attribute_value_placeholders:
+        kwargs['ExpressionAttributeValues'] = {
+            k: serializer.serialize(v) for k, v in expression.attribute_value_placeholders.items()
+        }
+    return kwargs
 
 def scan_books_with_filter(filter_expression=None, limit=None):
-    """Scan books table with optional filter."""
-    scan_kwargs = {}
+    """Scan books table with optional filter. Returns book dicts ready for the frontend."""
+    scan_kwargs = {'TableName': books_table.name}
     
     if filter_expression:
-        scan_kwargs['FilterExpression'] = filter_expression
+        build_filter(filter_expression, scan_kwargs)
     
     if limit:
         scan_kwargs['Limit'] = limit
     
-    response = books_table.scan(**scan_kwargs)
+    # Concurrent identical scans run once; callers get their own list to filter and sort
+    key = ('scan', json.dumps(scan_kwargs, sort_keys=True))
+    return list(flights.do(key, lambda: _scan_books(scan_kwargs, limit)))
+
+def _scan_books(scan_kwargs, limit):
+    response = dynamodb_client.scan(**scan_kwargs)
     items = response.get('Items', [])
     
     # Handle pagination if needed
     while 'LastEvaluatedKey' in response and (not limit or len(items) < limit):
         scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
-        response = books_table.scan(**scan_kwargs)
+        response = dynamodb_client.scan(**scan_kwargs)
         items.extend(response.get('Items', []))
         
         if limit and len(items) >= limit:
             items = items[:limit]
             break
     
-    return items
+    return [deserialize_book(item) for item in items]
+
+def catalog_books():
+    """Every book, from the stale-while-revalidate cache; callers get their own list."""
+    return list(catalog_cache.get(('all_books',), scan_books_with_filter))
+
+def get_book(isbn13):
+    """Fetch one book by ISBN, decoded straight to the frontend dict (None if missing)."""
+    def read():
+        response = dynamodb_client.get_item(TableName=books_table.name, Key={'isbn13': {'S': isbn13}})
+        return deserialize_book(response.get('Item'))
+    return flights.do(('get_item', isbn13), read)
+
+def get_cart_id(create=False):
+    """Return the session's cart ID, creating a server-side cart if asked."""
+    cart_id = session.get('cart_id')
+    if not cart_id and create:
+        cart_id = cart_store.create_cart()
+        session['cart_id'] = cart_id
+        session['cart_count'] = 0
+    return cart_id
+
+def load_cart():
+    """
+    Load the session's Cart (items, coupon, version) lazily, at most once per
+    request. The session's cart badge count is taken from what the store holds.
+    """
+    if 'cart' not in g:
+        cart_id = session.get('cart_id')
+        g.cart = cart_store.load(cart_id) if cart_id else EMPTY_CART
+        if session.get('cart_count', 0) != len(g.cart.items):
+            session['cart_count'] = len(g.cart.items)
+    return g.cart
+
+def refresh_cart_count(cart_id):
+    """Recount the session's cart badge from the store after a write; returns the count."""
+    session['cart_count'] = cart_store.count(cart_id)
+    return session['cart_count']
+
+def fetch_catalog_rows(isbns):
+    """Read current price and stock for many books with BatchGetItem (100 keys per call)."""
+    isbns = list(dict.fromkeys(isbns))
+    rows = {}
+    
+    for start in range(0, len(isbns), 100):
+        request_items = {
+            'Books': {
+                'Keys': [{'isbn13': isbn} for isbn in isbns[start:start + 100]],
+                'ProjectionExpression': 'isbn13, price, stock'
+            }
+        }
+        while request_items:
+            response = dynamodb.batch_get_item(RequestItems=request_items)
+            for item in response.get('Responses', {}).get('Books', []):
+                rows[item['isbn13']] = {'price': item.get('price'), 'stock': int(item.get('stock', 0))}
+            request_items = response.get('UnprocessedKeys') or None
+    
+    return rows
+
+def price_cart(reprice=False):
+    """
+    Price the session's cart with the shared engine (memoized per cart version).
+    With reprice=True the lines are first repriced in batch against the catalog.
+    Returns (cart_items, coupon, totals).
+    """
+    cart = load_cart()
+    cart_items, version = cart.items, cart.version
+    
+    if reprice and cart_items:
+        cart_items, changed = reprice_items(cart_items, fetch_catalog_rows(i['isbn13'] for i in cart_items))
+        if changed:
+            cart_store.set_prices(session['cart_id'], changed)
+            version = None  # Stored version no longer matches the repriced lines
+    
+    totals = pricing_engine.price(cart_items, cart.coupon, session.get('cart_id'), version)
+    return cart_items, cart.coupon, totals
 
 
 # ==================== SNS HELPER ====================
@@ -130,36 +291,56 @@ def send_sns_notification(subject, message):
 
 
 @app.route('/')
+@precompressed
 def index():
     """Homepage with featured books, categories, and recent additions."""
     
-    # Featured books (scan and sort in memory - DynamoDB doesn't support ORDER BY on scan)
-    all_books = scan_books_with_filter(
-        filter_expression=Attr('average_rating').exists()
-    )
-    
-    # Sort by rating and count
-    featured_books = sorted(
-        all_books,
-        key=lambda x: (float(x.get('average_rating', 0)), int(x.get('ratings_count', 0))),
-        reverse=True
-    )[:6]
-    featured_books = [map_book_row(b) for b in featured_books]
+    if catalog_snapshot.enabled:
+        # Top-N straight off the snapshot columns: no scan, and only the 12 shown Books are built
+        snapshot = catalog_snapshot.current()
+        featured_books = snapshot.top(6, 'rating', require='average_rating')
+        recent_books = snapshot.top(6, 'newest', require='published_year')
+        total_books = len(snapshot)
+        avg_rating = snapshot.mean('rating', require='average_rating')
+    else:
+        # Scan-based aggregates, refreshed in the background once past their soft TTL
+        def load_home():
+            # Featured books (scan and sort in memory - DynamoDB doesn't support ORDER BY on scan)
+            all_books = scan_books_with_filter(
+                filter_expression=Attr('average_rating').exists()
+            )
+            
+            # Sort by rating and count
+            featured_books = sorted(
+                all_books,
+                key=lambda x: (x.rating, x.ratings_count),
+                reverse=True
+            )[:6]
+            
+            # Recent books (sort by published year)
+            all_books_pub = scan_books_with_filter(
+                filter_expression=Attr('published_year').exists()
+            )
+            recent_books = sorted(
+                all_books_pub,
+                key=lambda x: x.published_year,
+                reverse=True
+            )[:6]
+            
+            # Statistics
+            response = books_table.scan(Select='COUNT')
+            total_books = response['Count']
+            
+            # Average rating calculation
+            all_rated = scan_books_with_filter(filter_expression=Attr('average_rating').exists())
+            avg_rating = sum(b.rating for b in all_rated) / len(all_rated) if all_rated else 0
+            return featured_books, recent_books, total_books, avg_rating
+        
+        featured_books, recent_books, total_books, avg_rating = catalog_cache.get(('home',), load_home)
     
     # Categories
     categories = get_display_categories()[:8]
     
-    # Recent books (sort by published year)
-    all_books_pub = scan_books_with_filter(
-        filter_expression=Attr('published_year').exists()
-    )
-    recent_books = sorted(
-        all_books_pub,
-        key=lambda x: float(x.get('published_year', 0)),
-        reverse=True
-    )[:6]
-    recent_books = [map_book_row(b) for b in recent_books]
-    
     # Testimonials
     testimonials = [
         {'name': 'Alice Johnson', 'role': 'Student', 'text': 'BookStore Manager helped me find all my textbooks at great prices!'},
@@ -167,14 +348,6 @@ def index():
         {'name': 'Sarah Lee', 'role': 'Teacher', 'text': 'A wonderful resource for our local community. Highly recommended!'}
     ]
     
-    # Statistics
-    response = books_table.scan(Select='COUNT')
-    total_books = response['Count']
-    
-    # Average rating calculation
-    all_rated = scan_books_with_filter(filter_expression=Attr('average_rating').exists())
-    avg_rating = sum(float(b.get('average_rating', 0)) for b in all_rated) / len(all_rated) if all_rated else 0
-    
     return render_template(
         'index.html',
         featured_books=featured_books,
@@ -186,77 +359,28 @@ def index():
     )
 
 @app.route('/catalog')
+@precompressed
 def catalog():
     """Catalog page with filtering and sorting."""
     categories = get_display_categories()
     return render_template('catalog.html', categories=categories)
 
 @app.route('/api/books')
+@precompressed
 def get_books():
     """API endpoint for filtered and paginated book list."""
     
-    # Get all books (we'll filter in Python due to DynamoDB limitations)
-    all_books = scan_books_with_filter()
-    
-    # Search filter
     search_query = request.args.get('q', '').strip().lower()
-    if search_query:
-        all_books = [
-            b for b in all_books
-            if search_query in str(b.get('title', '')).lower() or
-               search_query in str(b.get('authors', '')).lower() or
-               search_query in str(b.get('description', '')).lower()
-        ]
-    
-    # Category filter
     category = request.args.get('category', '').strip()
-    if category and category != 'All':
-        all_books = [
-            b for b in all_books
-            if get_normalized_category(b.get('categories', '')) == category
-        ]
-    
-    # Price filter
+    if category == 'All':
+        category = ''
     try:
         price_max = float(request.args.get('price_max', 2000))
-        all_books = [b for b in all_books if float(b.get('price', 0)) <= price_max]
     except ValueError:
-        pass
-    
-    # Author filter
+        price_max = None
     author = request.args.get('author', '').strip().lower()
-    if author:
-        all_books = [
-            b for b in all_books
-            if author in str(b.get('authors', '')).lower()
-        ]
-    
-    # Stock filter
     in_stock = request.args.get('in_stock', '').lower() == 'true'
-    if in_stock:
-        all_books = [b for b in all_books if int(b.get('stock', 0)) > 0]
-    
-    # Sorting
     sort_by = request.args.get('sort', 'rating')
-    if sort_by == 'price_low':
-        all_books.sort(key=lambda x: float(x.get('price', 0)))
-    elif sort_by == 'price_high':
-        all_books.sort(key=lambda x: float(x.get('price', 0)), reverse=True)
-    elif sort_by == 'az':
-        all_books.sort(key=lambda x: str(x.get('title', '')))
-    elif sort_by == 'za':
-        all_books.sort(key=lambda x: str(x.get('title', '')), reverse=True)
-    elif sort_by == 'newest':
-        all_books.sort(key=lambda x: float(x.get('published_year', 0)), reverse=True)
-    elif sort_by == 'oldest':
-        all_books.sort(key=lambda x: float(x.get('published_year', 0)))
-    elif sort_by == 'rating':
-        all_books.sort(key=lambda x: (float(x.get('average_rating', 0)), int(x.get('ratings_count', 0))), reverse=True)
-    elif sort_by == 'popular':
-        all_books.sort(key=lambda x: int(x.get('ratings_count', 0)), reverse=True)
-    
-    # Count total
-    total_books = len(all_books)
     
     # Pagination
     try:
@@ -267,42 +391,160 @@ def get_books():
         per_page = 12
     
     offset = (page - 1) * per_page
-    paginated_books = all_books[offset:offset + per_page]
     
-    books_data = [map_book_row(b) for b in paginated_books]
+    def load_page():
+        if catalog_snapshot.enabled:
+            # ANDed bitmap indexes, then this page's ranks; Books are built for this page only
+            snapshot = catalog_snapshot.current()
+            matched = snapshot.match(search_query, category, price_max, author, in_stock)
+            rows = snapshot.bitmaps.ranked(matched, sort_by, offset + per_page)[offset:]
+            return popcount(matched), [snapshot.book(i) for i in rows]
+        else:
+            # Get all books (we'll filter in Python due to DynamoDB limitations)
+            all_books = catalog_books()
+        
+            # Search filter
+            if search_query:
+                all_books = [
+                    b for b in all_books
+                    if search_query in b.title.lower() or
+                       search_query in b.authors.lower() or
+                       search_query in b.description.lower()
+                ]
+        
+            # Category filter
+            if category:
+                all_books = [
+                    b for b in all_books
+                    if b.category == category
+                ]
+        
+            # Price filter
+            if price_max is not None:
+                all_books = [b for b in all_books if b.price <= price_max]
+        
+            # Author filter
+            if author:
+                all_books = [
+                    b for b in all_books
+                    if author in b.authors.lower()
+                ]
+        
+            # Stock filter
+            if in_stock:
+                all_books = [b for b in all_books if b.stock > 0]
+        
+            # Sorting
+            if sort_by == 'price_low':
+                all_books.sort(key=lambda x: x.price)
+            elif sort_by == 'price_high':
+                all_books.sort(key=lambda x: x.price, reverse=True)
+            elif sort_by == 'az':
+                all_books.sort(key=lambda x: x.title)
+            elif sort_by == 'za':
+                all_books.sort(key=lambda x: x.title, reverse=True)
+            elif sort_by == 'newest':
+                all_books.sort(key=lambda x: x.published_year, reverse=True)
+            elif sort_by == 'oldest':
+                all_books.sort(key=lambda x: x.published_year)
+            elif sort_by == 'rating':
+                all_books.sort(key=lambda x: (x.rating, x.ratings_count), reverse=True)
+            elif sort_by == 'popular':
+                all_books.sort(key=lambda x: x.ratings_count, reverse=True)
+        
+            return len(all_books), all_books[offset:offset + per_page]
+    
+    # Concurrent requests for the same page share one filter/sort (and at most one scan)
+    key = ('books_page', search_query, category, price_max, author, in_stock, sort_by, page)
+    total_books, paginated_books = flights.do(key, load_page)
+    
+    # Facet counts depend on the filters only, not the sort or page
+    facets = None
+    if request.args.get('facets', '').lower() == 'true':
+        facets = catalog_cache.get(
+            ('facets', search_query, category, price_max, author, in_stock),
+            lambda: load_facets(search_query, category, price_max, author, in_stock)
+        )
+    
+    fragments = book_fragments.fragments(paginated_books)
     total_pages = math.ceil(total_books / per_page) if total_books > 0 else 1
     
-    return jsonify({
-        'books': books_data,
-        'total': total_books,
-        'page': page,
-        'pages': total_pages,
-        'per_page': per_page
-    })
+    body = render_books_page(fragments, total_books, page, total_pages, per_page, facets)
+    return app.response_class(body, mimetype='application/json')
+
+def load_facets(search_query, category, price_max, author, in_stock):
+    """get_books() facet counts over the books matching the search and author."""
+    if catalog_snapshot.enabled:
+        # Popcounts of the snapshot's ANDed bitmap indexes
+        snapshot = catalog_snapshot.current()
+        base = snapshot.match(search_query, author=author)
+        return snapshot.bitmaps.facets(base, category, price_max, in_stock)
+    
+    # One pass over the cached books
+    books = (
+        (b.category, b.price, b.stock, b.rating) for b in catalog_books()
+        if (not search_query or search_query in b.title.lower() or
+            search_query in b.authors.lower() or search_query in b.description.lower())
+        and (not author or author in b.authors.lower())
+    )
+    return count_facets(book_rows(books, price_max), category, price_max, in_stock)
+
+@app.route('/api/catalog/bootstrap')
+@precompressed
+def catalog_bootstrap_document():
+    """Categories with counts, the default first page and featured books in one response."""
+    return app.response_class(catalog_bootstrap.get(build_catalog_bootstrap), mimetype='application/json')
+
+
+def build_catalog_bootstrap():
+    categories = get_display_categories()
+    counts = dict.fromkeys(categories, 0)
+    
+    if catalog_snapshot.enabled:
+        snapshot = catalog_snapshot.current()
+        index = snapshot.bitmaps
+        matched = snapshot.match(price_max=DEFAULT_PRICE_MAX)
+        for category in categories:
+            counts[category] = popcount(matched & index.categories.get(category, 0))
+        total_books = popcount(matched)
+        page_books = [snapshot.book(i) for i in index.ranked(matched, 'rating', PER_PAGE)]
+    else:
+        # One scan serves the counts and the first page
+        books = [b for b in catalog_books() if b.price <= DEFAULT_PRICE_MAX]
+        for book in books:
+            if book.category in counts:
+                counts[book.category] += 1
+        books.sort(key=lambda x: (x.rating, x.ratings_count), reverse=True)
+        total_books = len(books)
+        page_books = books[:PER_PAGE]
+    
+    fragments = book_fragments.fragments(page_books)
+    
+    # The sidebar's featured books are the top of the default (highest rated) page
+    return render_bootstrap(counts.items(), fragments, total_books, fragments[:FEATURED])
+
 
 @app.route('/book/<isbn13>')
+@precompressed
 def product_details(isbn13):
     """Individual book detail page."""
     
     try:
-        response = books_table.get_item(Key={'isbn13': isbn13})
-        book_item = response.get('Item')
+        book = get_book(isbn13)
         
-        if not book_item:
+        if not book:
             return render_template('404.html', message="Book not found"), 404
         
-        book = map_book_row(book_item)
-        
-        # Fetch related books (same category)
-        category = book_item.get('categories', '')
-        related_items = scan_books_with_filter(
-            filter_expression=Attr('categories').eq(category) & Attr('isbn13').ne(isbn13),
-            limit=20
-        )
+        # Fetch related books (same category), top 4 by rating
+        category = book.categories
+        def load_related():
+            related_items = scan_books_with_filter(
+                filter_expression=Attr('categories').eq(category) & Attr('isbn13').ne(isbn13),
+                limit=20
+            )
+            return sorted(related_items, key=lambda x: x.rating, reverse=True)[:4]
         
-        # Sort by rating and limit to 4
-        related_items.sort(key=lambda x: float(x.get('average_rating', 0)), reverse=True)
-        related_books = [map_book_row(r) for r in related_items[:4]]
+        related_books = catalog_cache.get(('related', isbn13), load_related)
         
         return render_template('product_details.html', book=book, related_books=related_books)
         
@@ -310,6 +552,28 @@ def product_details(isbn13):
         print(f"Error fetching book: {e}")
         return render_template('404.html', message="Book not found"), 404
 
+@app.route('/img/<isbn13>/<size>')
+def book_image(isbn13, size):
+    """Same-origin, resized book cover (WebP or JPEG) from the thumbnail cache."""
+    if size not in THUMBNAIL_SIZES:
+        return '', 404
+    
+    def source_url():
+        if catalog_snapshot.enabled:
+            # Cover URLs don't change with stock: a bisect over the snapshot's ISBN index, no read
+            snapshot = catalog_snapshot.current()
+            row = snapshot.find(isbn13)
+            if row >= 0:
+                return snapshot.string('thumbnail', row) or None
+        response = dynamodb_client.get_item(
+            TableName=books_table.name,
+            Key={'isbn13': {'S': isbn13}},
+            ProjectionExpression='thumbnail'
+        )
+        return response.get('Item', {}).get('thumbnail', {}).get('S')
+    
+    return send_thumbnail(thumbnails, isbn13, size, source_url)
+
 @app.route('/search')
 def search():
     """Search results page."""
@@ -319,22 +583,26 @@ def search():
         return redirect(url_for('catalog'))
     
     # Search in all books
-    all_books = scan_books_with_filter()
+    if catalog_snapshot.enabled:
+        snapshot = catalog_snapshot.current()
+        all_books = [snapshot.book(i) for i in snapshot.select(query=query)]
+    else:
+        all_books = catalog_books()
     
     # Filter and rank results
     results = []
     for book in all_books:
-        title_match = query in str(book.get('title', '')).lower()
-        author_match = query in str(book.get('authors', '')).lower()
-        desc_match = query in str(book.get('description', '')).lower()
+        title_match = query in book.title.lower()
+        author_match = query in book.authors.lower()
+        desc_match = query in book.description.lower()
         
         if title_match or author_match or desc_match:
             rank = 1 if title_match else (2 if author_match else 3)
             results.append((rank, book))
     
     # Sort by rank then rating
-    results.sort(key=lambda x: (x[0], -float(x[1].get('average_rating', 0))))
-    books = [map_book_row(r[1]) for r in results[:50]]
+    results.sort(key=lambda x: (x[0], -x[1].rating))
+    books = [r[1] for r in results[:50]]
     
     return render_template('search.html', books=books, query=query, count=len(books))
 
@@ -628,8 +896,8 @@ def customer_dashboard():
         # Random recommendations
         all_books = scan_books_with_filter(limit=50)
         import random
-        recommended_books = [map_book_row(b) for b in random.sample(all_books, min(4, len(all_books)))]
-        recently_viewed = [map_book_row(b) for b in random.sample(all_books, min(6, len(all_books)))]
+        recommended_books = random.sample(all_books, min(4, len(all_books)))
+        recently_viewed = random.sample(all_books, min(6, len(all_books)))
         
         # Real Data Integration with Fallback
         real_orders = []
@@ -725,9 +993,7 @@ def admin_dashboard():
         
         # Low stock books
         all_books = scan_books_with_filter()
-        low_stock_items = [b for b in all_books if int(b.get('stock', 0)) <= 5]
-        low_stock_items.sort(key=lambda x: int(x.get('stock', 0)))
-        low_stock_books = [map_book_row(b) for b in low_stock_items[:10]]
+        low_stock_books = sorted((b for b in all_books if b.stock <= 5), key=lambda x: x.stock)[:10]
         
         # Mock orders (Fallback)
         orders = [
@@ -805,34 +1071,7 @@ def admin_dashboard():
 @app.route('/cart')
 def cart():
     """Shopping cart page."""
-    cart_items = session.get('cart', [])
-    coupon = session.get('coupon', None)
-    
-    # Calculate totals
-    subtotal = sum(item['price'] * item['quantity'] for item in cart_items)
-    discount = 0
-    
-    if coupon:
-        if coupon['type'] == 'percent':
-            discount = subtotal * (coupon['value'] / 100)
-        elif coupon['type'] == 'fixed':
-            discount = coupon['value']
-    
-    shipping = 0 if subtotal > 500 else 50
-    if subtotal == 0:
-        shipping = 0
-    
-    taxable_amount = max(0, subtotal - discount)
-    tax = taxable_amount * 0.18
-    total = max(0, subtotal - discount + shipping + tax)
-    
-    totals = {
-        'subtotal': subtotal,
-        'discount': discount,
-        'shipping': shipping,
-        'tax': tax,
-        'total': total
-    }
+    cart_items, coupon, totals = price_cart()
     
     return render_template('cart.html', cart_items=cart_items, totals=totals, coupon=coupon)
 
@@ -849,42 +1088,21 @@ def add_to_cart():
     if not isbn13:
         return jsonify({'success': False, 'message': 'Invalid book'}), 400
     
-    # Initialize cart
-    if 'cart' not in session:
-        session['cart'] = []
-    
-    cart = session['cart']
-    found = False
+    cart_id = get_cart_id(create=True)
     
-    for item in cart:
-        if item['isbn13'] == isbn13:
-            item['quantity'] += quantity
-            found = True
-            break
-    
-    if not found:
+    # Single-row update if the book is already in the cart
+    if not cart_store.increment(cart_id, isbn13, quantity):
         # Fetch book from DynamoDB
         try:
-            response = books_table.get_item(Key={'isbn13': isbn13})
-            book_item = response.get('Item')
+            book = get_book(isbn13)
             
-            if book_item:
-                book = map_book_row(book_item)
-                cart.append({
-                    'isbn13': isbn13,
-                    'title': book['title'],
-                    'price': book['price'],
-                    'image': book['image'],
-                    'quantity': quantity
-                })
+            if book:
+                cart_store.add_line(cart_id, isbn13, book.title, book.price, book.image, quantity)
         except Exception as e:
             print(f"Error fetching book: {e}")
             return jsonify({'success': False, 'message': 'Book not found'}), 404
     
-    session['cart'] = cart
-    session.modified = True
-    
-    return jsonify({'success': True, 'cart_count': len(cart), 'message': 'Added to cart'})
+    return jsonify({'success': True, 'cart_count': refresh_cart_count(cart_id), 'message': 'Added to cart'})
 
 @app.route('/api/cart/update', methods=['POST'])
 def update_cart_item():
@@ -893,15 +1111,9 @@ def update_cart_item():
     isbn13 = data.get('isbn13')
     quantity = int(data.get('quantity', 1))
     
-    cart = session.get('cart', [])
-    
-    for item in cart:
-        if item['isbn13'] == isbn13:
-            item['quantity'] = max(1, quantity)
-            break
-    
-    session['cart'] = cart
-    session.modified = True
+    cart_id = get_cart_id()
+    if cart_id:
+        cart_store.set_quantity(cart_id, isbn13, max(1, quantity))
     
     return jsonify({'success': True})
 
@@ -911,21 +1123,20 @@ def remove_from_cart():
     data = request.get_json()
     isbn13 = data.get('isbn13')
     
-    cart = session.get('cart', [])
-    session['cart'] = [item for item in cart if item['isbn13'] != isbn13]
-    session.modified = True
-    
-    if not session['cart']:
-        session.pop('coupon', None)
+    cart_id = get_cart_id()
+    if cart_id and cart_store.remove(cart_id, isbn13):
+        if not refresh_cart_count(cart_id):
+            cart_store.set_coupon(cart_id, None)
     
-    return jsonify({'success': True, 'cart_count': len(session['cart'])})
+    return jsonify({'success': True, 'cart_count': session.get('cart_count', 0)})
 
 @app.route('/api/cart/clear', methods=['POST'])
 def clear_cart():
     """Clear entire cart."""
-    session['cart'] = []
-    session.pop('coupon', None)
-    session.modified = True
+    cart_id = get_cart_id()
+    if cart_id:
+        cart_store.clear(cart_id)
+    session['cart_count'] = 0
     
     return jsonify({'success': True})
 
@@ -935,14 +1146,8 @@ def apply_coupon():
     data = request.get_json()
     code = data.get('code', '').upper()
     
-    coupons = {
-        'BOOK20': {'type': 'percent', 'value': 20, 'desc': '20% Off'},
-        'FIRST100': {'type': 'fixed', 'value': 100, 'desc': '₹100 Off'},
-        'WELCOME20': {'type': 'percent', 'value': 20, 'desc': 'Welcome Offer'}
-    }
-    
-    if code in coupons:
-        session['coupon'] = {'code': code, **coupons[code]}
+    if code in COUPONS:
+        cart_store.set_coupon(get_cart_id(create=True), {'code': code, **COUPONS[code]})
         return jsonify({'success': True, 'message': f'Coupon {code} applied!'})
     
     return jsonify({'success': False, 'message': 'Invalid coupon code.'})
@@ -953,38 +1158,11 @@ def checkout():
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
-    cart_items = session.get('cart', [])
-    
-    if not cart_items:
+    if not load_cart().items:
         return redirect(url_for('cart'))
     
-    coupon = session.get('coupon', None)
-    
-    # Calculate totals
-    subtotal = sum(item['price'] * item['quantity'] for item in cart_items)
-    discount = 0
-    
-    if coupon:
-        if coupon['type'] == 'percent':
-            discount = subtotal * (coupon['value'] / 100)
-        elif coupon['type'] == 'fixed':
-            discount = coupon['value']
-    
-    shipping = 0 if subtotal > 500 else 50
-    if subtotal == 0:
-        shipping = 0
-    
-    taxable_amount = max(0, subtotal - discount)
-    tax = taxable_amount * 0.18
-    total = max(0, subtotal - discount + shipping + tax)
-    
-    totals = {
-        'subtotal': subtotal,
-        'discount': discount,
-        'shipping': shipping,
-        'tax': tax,
-        'total': total
-    }
+    # Show what the order will actually cost at current catalog prices
+    cart_items, coupon, totals = price_cart(reprice=True)
     
     # Get user
     user = None
@@ -1000,9 +1178,10 @@ def checkout():
 @app.route('/checkout/place-order', methods=['POST'])
 def place_order():
     """Place order and send confirmation email."""
-    cart_items = session.get('cart', [])
+    cart = load_cart()
+    coupon = cart.coupon
     
-    if not cart_items:
+    if not cart.items:
         return jsonify({'success': False, 'message': 'Cart is empty'}), 400
     
     try:
@@ -1026,32 +1205,18 @@ def place_order():
         if not all([full_name, email, phone, address1, city, state, pincode]):
             return jsonify({'success': False, 'message': 'Please fill all required fields'}), 400
         
-        # Calculate totals
-        subtotal = sum(item['price'] * item['quantity'] for item in cart_items)
-        coupon = session.get('coupon', None)
-        discount = 0
-        
-        if coupon:
-            if coupon['type'] == 'percent':
-                discount = subtotal * (coupon['value'] / 100)
-            elif coupon['type'] == 'fixed':
-                discount = coupon['value']
-        
-        shipping = 0 if subtotal > 500 else 50
-        if subtotal == 0:
-            shipping = 0
-        
-        taxable_amount = max(0, subtotal - discount)
-        tax = taxable_amount * 0.18
-        total = max(0, subtotal - discount + shipping + tax)
-        
-        totals = {
-            'subtotal': Decimal(str(subtotal)),
-            'discount': Decimal(str(discount)),
-            'shipping': Decimal(str(shipping)),
-            'tax': Decimal(str(tax)),
-            'total': Decimal(str(total))
-        }
+        # Batch-read current price and stock for every line
+        try:
+            catalog_rows = fetch_catalog_rows(item['isbn13'] for item in cart.items)
+        except Exception as e:
+            print(f"Stock check error: {e}")
+            return jsonify({'success': False, 'message': 'Error checking stock'}), 500
+        
+        # Calculate totals (Decimal end to end, no float round trip)
+        cart_items, changed = reprice_items(cart.items, catalog_rows)
+        totals = pricing_engine.price(
+            cart_items, coupon, session['cart_id'], None if changed else cart.version
+        )
         
         # Generate Order ID
         import secrets
@@ -1059,18 +1224,13 @@ def place_order():
         
         # Verify stock
         for item in cart_items:
-            try:
-                response = books_table.get_item(Key={'isbn13': item['isbn13']})
-                book = response.get('Item')
-                
-                if not book or int(book.get('stock', 0)) < item['quantity']:
-                    return jsonify({
-                        'success': False,
-                        'message': f"{item['title']} is out of stock"
-                    }), 400
-            except Exception as e:
-                print(f"Stock check error: {e}")
-                return jsonify({'success': False, 'message': 'Error checking stock'}), 500
+            book = catalog_rows.get(item['isbn13'])
+            
+            if not book or book['stock'] < item['quantity']:
+                return jsonify({
+                    'success': False,
+                    'message': f"{item['title']} is out of stock"
+                }), 400
         
         # Insert order
         orders_table.put_item(Item={
@@ -1095,21 +1255,27 @@ def place_order():
                 'order_id': order_id,
                 'isbn13': item['isbn13'],
                 'title': item['title'],
-                'price': Decimal(str(item['price'])),
+                'price': item['price'],
                 'quantity': item['quantity'],
-                'subtotal': Decimal(str(item['price'] * item['quantity']))
+                'subtotal': item['subtotal']
             })
             
             # Update stock
             try:
-                books_table.update_item(
+                updated = books_table.update_item(
                     Key={'isbn13': item['isbn13']},
                     UpdateExpression='SET stock = stock - :qty',
-                    ExpressionAttributeValues={':qty': item['quantity']}
+                    ExpressionAttributeValues={':qty': item['quantity']},
+                    ReturnValues='UPDATED_NEW'
                 )
+                # Overlaid on the catalog snapshot's stock and in-stock bitmap in every worker
+                catalog_snapshot.record_stock(item['isbn13'], updated['Attributes']['stock'])
             except Exception as e:
                 print(f"Stock update error: {e}")
         
+        # Stock only: the cached scan refreshes in the background, fragments follow their rows
+        catalog_cache.expire()
+        
         # Insert delivery address
         addresses_table.put_item(Item={
             'order_id': order_id,
@@ -1124,16 +1290,15 @@ def place_order():
         })
         
         # Clear cart
-        session.pop('cart', None)
-        session.pop('coupon', None)
-        session.modified = True
+        cart_store.clear(session['cart_id'])
+        session['cart_count'] = 0
         
         # TODO: Send email via SNS
         print(f"📧 Order confirmation email would be sent to {email}")
         
         # Send order details via SNS
         msg_subject = f"New Order Placed: {order_id}"
-        msg_body = f"Order ID: {order_id}\nCustomer: {full_name} ({email})\nAmount: ₹{float(total):.2f}\n\nItems:\n"
+        msg_body = f"Order ID: {order_id}\nCustomer: {full_name} ({email})\nAmount: ₹{totals['total']:.2f}\n\nItems:\n"
         for item in cart_items:
             msg_body += f"- {item['title']} (x{item['quantity']})\n"
             
@@ -1160,26 +1325,26 @@ def order_confirmation(order_id):
     """Order confirmation page."""
     try:
         # Get order
-        order_response = orders_table.get_item(Key={'order_id': order_id})
-        order = order_response.get('Item')
+        order_response = dynamodb_client.get_item(
+            TableName=orders_table.name, Key={'order_id': {'S': order_id}}
+        )
+        order = deserialize_item(order_response.get('Item'))
         
         if not order:
             return redirect(url_for('index'))
         
         # Get order items
-        items_response = order_items_table.query(
-            KeyConditionExpression=Key('order_id').eq(order_id)
+        items_response = dynamodb_client.query(
+            TableName=order_items_table.name,
+            KeyConditionExpression='order_id = :oid',
+            ExpressionAttributeValues={':oid': {'S': order_id}}
         )
-        items = items_response.get('Items', [])
+        items = [deserialize_item(item) for item in items_response.get('Items', [])]
         
         # Get address
         address_response = addresses_table.get_item(Key={'order_id': order_id})
         address = address_response.get('Item')
         
-        # Convert Decimals
-        order = decimal_to_float(order)
-        items = decimal_to_float(items)
-        
         return render_template('order_confirmation.html', order=order, items=items, address=address)
         
     except Exception as e:
@@ -1208,18 +1373,18 @@ def admin_books():
     if search_query:
         all_books = [
             b for b in all_books
-            if search_query in str(b.get('title', '')).lower() or
-               search_query in str(b.get('isbn13', '')).lower()
+            if search_query in b.title.lower() or
+               search_query in b.isbn13.lower()
         ]
     
     # Sort by title
-    all_books.sort(key=lambda x: str(x.get('title', '')))
+    all_books.sort(key=lambda x: x.title)
     
     total_books = len(all_books)
     offset = (page - 1) * per_page
     paginated_books = all_books[offset:offset + per_page]
     
-    books = [map_book_row(b) for b in paginated_books]
+    books = paginated_books
     total_pages = math.ceil(total_books / per_page)
     
     return render_template(
@@ -1276,6 +1441,9 @@ def add_book():
                 'subtitle': '',
                 'created_at': datetime.now().isoformat()
             })
+            book_fragments.invalidate(isbn13)
+            if catalog_snapshot.enabled:
+                catalog_snapshot.reload()  # All workers swap to the new file
             
             flash('Book added successfully!', 'success')
             return redirect(url_for('admin_books'))
@@ -1295,6 +1463,9 @@ def delete_book(isbn13):
     
     try:
         books_table.delete_item(Key={'isbn13': isbn13})
+        book_fragments.invalidate(isbn13)
+        if catalog_snapshot.enabled:
+            catalog_snapshot.reload()  # All workers swap to the new file
         return jsonify({'success': True, 'message': 'Book deleted successfully'})
         
     except Exception as e:
@@ -1368,6 +1539,10 @@ def internal_error(error):
     """500 error handler."""
     return render_template('500.html'), 500
 
+# Compile all templates now (filters above must be registered first)
+if app.config.get('TEMPLATE_PRELOAD', True):
+    preload_templates(app)
+
 # ==================== RUN APPLICATION ====================
 
 if __name__ == '__main__':
@@ -0,0 +1,104 @@
+"""
+/api/books serialization benchmark.
+CPU time per response for a 12-book page: jsonify() over Book.to_json()
+dicts versus splicing cached per-book fragments into the envelope, both for
+cached Book objects (app_aws.py) and for rows fetched per request (app.py).
+
+Usage: python -m benchmarks.bench_api_books [--csv data/books.csv] [--requests 20000]
+"""
+import argparse
+import random
+import sqlite3
+import time
+
+from flask import Flask, jsonify
+
+from benchmarks.bench_book_model import load_rows
+from utils.book import Book, BOOK_COLUMNS
+from utils.book_fragments import BookFragmentCache, render_books_page
+
+PER_PAGE = 12
+
+
+def cpu_per_request(handler, pages):
+    start = time.process_time()
+    for page in pages:
+        handler(page)
+    return (time.process_time() - start) / len(pages)
+
+
+def report(label, old, new, cache):
+    print(f"\n{label}")
+    print(f"{'jsonify':>10}: {old * 1e6:8.1f} µs CPU/request")
+    print(f"{'fragments':>10}: {new * 1e6:8.1f} µs CPU/request  (hit ratio {cache.hits / (cache.hits + cache.misses):.2%})")
+    print(f"{'saving':>10}: {(1 - new / old):8.1%}")
+
+
+def run(csv_path, requests, seed=42):
+    rows = load_rows(csv_path)
+    books = [Book.from_row(r) for r in rows]
+    total = len(books)
+    page_count = -(-total // PER_PAGE)
+    # Skewed traffic: most requests hit the first few pages
+    rng = random.Random(seed)
+    pages = [min(page_count, int(rng.paretovariate(1.2))) for _ in range(requests)]
+
+    app = Flask(__name__)
+    app.json.compact = True
+    cache = BookFragmentCache()
+
+    def with_jsonify(page):
+        chunk = books[(page - 1) * PER_PAGE:page * PER_PAGE]
+        return jsonify({
+            'books': [b.to_json() for b in chunk], 'total': total, 'page': page,
+            'pages': page_count, 'per_page': PER_PAGE
+        })
+
+    def with_fragments(page):
+        chunk = books[(page - 1) * PER_PAGE:page * PER_PAGE]
+        fragments = cache.fragments(chunk)
+        return app.response_class(
+            render_books_page(fragments, total, page, page_count, PER_PAGE), mimetype='application/json'
+        )
+
+    # app.py: every request reads fresh sqlite3.Rows; both sides pay the same query
+    db = sqlite3.connect(':memory:')
+    db.row_factory = sqlite3.Row
+    db.execute(f"CREATE TABLE books ({', '.join(BOOK_COLUMNS)})")
+    db.executemany(f"INSERT INTO books VALUES ({', '.join('?' * len(BOOK_COLUMNS))})", [tuple(r) for r in rows])
+    row_cache = BookFragmentCache()
+
+    def page_rows(page):
+        return db.execute('SELECT * FROM books LIMIT ? OFFSET ?', (PER_PAGE, (page - 1) * PER_PAGE)).fetchall()
+
+    def rows_with_jsonify(page):
+        return jsonify({
+            'books': [Book.from_row(r).to_json() for r in page_rows(page)], 'total': total, 'page': page,
+            'pages': page_count, 'per_page': PER_PAGE
+        })
+
+    def rows_with_fragments(page):
+        fragments = row_cache.fragments(page_rows(page), to_book=Book.from_row)
+        return app.response_class(
+            render_books_page(fragments, total, page, page_count, PER_PAGE), mimetype='application/json'
+        )
+
+    with app.app_context():
+        assert with_jsonify(1).get_data() == with_fragments(1).get_data()
+        assert rows_with_jsonify(1).get_data() == rows_with_fragments(1).get_data()
+        old = cpu_per_request(with_jsonify, pages)
+        new = cpu_per_request(with_fragments, pages)
+        old_rows = cpu_per_request(rows_with_jsonify, pages)
+        new_rows = cpu_per_request(rows_with_fragments, pages)
+
+    print(f"{requests} requests over {len(set(pages))} distinct pages")
+    report('Book objects (app_aws.py)', old, new, cache)
+    report('SQLite rows (app.py)', old_rows, new_rows, row_cache)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--csv', default='data/books.csv', help='books CSV to load')
+    parser.add_argument('--requests', type=int, default=20000, help='simulated requests')
+    args = parser.parse_args()
+    run(args.csv, args.requests)
@@ -0,0 +1,99 @@
+"""
+Book model benchmark.
+Loads data/books.csv into an in-memory SQLite books table, then compares the
+old dict-per-row mapping with the __slots__ Book for build time, retained
+memory and JSON serialization of a listing.
+
+Usage: python -m benchmarks.bench_book_model [--csv data/books.csv] [--number 5]
+"""
+import argparse
+import csv
+import json
+import random
+import sqlite3
+import timeit
+import tracemalloc
+
+from utils.book import Book, BOOK_COLUMNS
+from utils.category_mapper import get_normalized_category
+
+
+def legacy_map_book_row(row):
+    """The dict mapping both apps used before the Book model."""
+    book = dict(row)
+    book['id'] = row['isbn13']
+    book['title'] = row['title'] or 'Untitled'
+    book['author'] = row['authors'] or 'Unknown Author'
+    book['category'] = get_normalized_category(row['categories'])
+    book['price'] = float(row['price']) if row['price'] else 399.0
+    book['stock'] = int(row['stock']) if row['stock'] else 0
+    book['image'] = row['thumbnail'] or '/static/images/book-placeholder.jpg'
+    book['rating'] = float(row['average_rating']) if row['average_rating'] else 0.0
+    book['description'] = row['description'] or 'No description available.'
+    book['isbn'] = row['isbn13']
+    book['isbn10'] = row['isbn10'] or ''
+    book['subtitle'] = row['subtitle'] or ''
+    book['publisher'] = "Unknown Publisher"
+    book['pages'] = int(row['num_pages']) if row['num_pages'] else 0
+    book['language'] = "English"
+    book['pub_date'] = str(int(row['published_year'])) if row['published_year'] else "Unknown"
+    book['ratings_count'] = int(row['ratings_count']) if row['ratings_count'] else 0
+    book['reviews'] = []
+    return book
+
+
+def load_rows(csv_path, seed=42):
+    rng = random.Random(seed)
+    db = sqlite3.connect(':memory:')
+    db.row_factory = sqlite3.Row
+    db.execute(f"CREATE TABLE books ({', '.join(BOOK_COLUMNS)})")
+
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        rows = [
+            tuple(row.get(c) or None for c in BOOK_COLUMNS[:-2]) + (round(rng.uniform(99, 1999), 2), rng.randint(0, 50))
+            for row in csv.DictReader(f)
+        ]
+    db.executemany(f"INSERT INTO books VALUES ({', '.join('?' * len(BOOK_COLUMNS))})", rows)
+    return db.execute('SELECT * FROM books').fetchall()
+
+
+def retained_bytes(build, rows):
+    tracemalloc.start()
+    books = [build(r) for r in rows]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del books
+    return size
+
+
+def run(csv_path, number):
+    rows = load_rows(csv_path)
+    legacy = [legacy_map_book_row(r) for r in rows]
+    books = [Book.from_row(r) for r in rows]
+
+    results = [
+        ('build', lambda: [legacy_map_book_row(r) for r in rows], lambda: [Book.from_row(r) for r in rows]),
+        ('json all', lambda: json.dumps(legacy), lambda: json.dumps([b.to_json() for b in books])),
+        ('json page', lambda: json.dumps(legacy[:12]), lambda: json.dumps([b.to_json() for b in books[:12]])),
+    ]
+
+    print(f"{len(rows)} books, best of {number}")
+    print(f"{'':>10} {'dict':>12} {'Book':>12}")
+    for name, old, new in results:
+        old_t = min(timeit.repeat(old, number=1, repeat=number))
+        new_t = min(timeit.repeat(new, number=1, repeat=number))
+        print(f"{name:>10} {old_t * 1000:>10.2f}ms {new_t * 1000:>10.2f}ms")
+
+    old_mem = retained_bytes(legacy_map_book_row, rows)
+    new_mem = retained_bytes(Book.from_row, rows)
+    print(f"{'memory':>10} {old_mem / 1e6:>10.2f}MB {new_mem / 1e6:>10.2f}MB")
+    print(f"{'json size':>10} {len(json.dumps(legacy)) / 1e6:>10.2f}MB "
+          f"{len(json.dumps([b.to_json() for b in books])) / 1e6:>10.2f}MB")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--csv', default='data/books.csv', help='books CSV to load')
+    parser.add_argument('--number', type=int, default=5, help='repetitions (best is reported)')
+    args = parser.parse_args()
+    run(args.csv, args.number)
@@ -0,0 +1,72 @@
+"""
+DynamoDB book deserialization benchmark.
+Decodes the same low-level scan page two ways:
+  chain  - boto3 TypeDeserializer (Decimals) -> Book.from_item()
+  direct - utils.dynamo_codec.deserialize_book()
+and checks both produce identical books.
+
+Usage: python -m benchmarks.bench_dynamo_codec [--csv data/books.csv] [--number 5]
+"""
+import argparse
+import csv
+import random
+import timeit
+from decimal import Decimal
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+from utils.book import Book
+from utils.dynamo_codec import deserialize_book
+
+NUMERIC_FIELDS = ('published_year', 'average_rating', 'num_pages', 'ratings_count')
+
+
+def load_items(csv_path, seed=42):
+    """Build low-level items the way a Books scan returns them."""
+    rng = random.Random(seed)
+    serializer = TypeSerializer()
+    items = []
+
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            book = {k: v for k, v in row.items() if v}
+            for field in NUMERIC_FIELDS:
+                if field in book:
+                    book[field] = Decimal(book[field])
+            book['price'] = Decimal(str(round(rng.uniform(99, 1999), 2)))
+            book['stock'] = rng.randint(0, 50)
+            items.append({k: serializer.serialize(v) for k, v in book.items()})
+
+    return items
+
+
+def chain(items):
+    deserializer = TypeDeserializer()
+    resource_items = [{k: deserializer.deserialize(v) for k, v in item.items()} for item in items]
+    return [Book.from_item(item) for item in resource_items]
+
+
+def direct(items):
+    return [deserialize_book(item) for item in items]
+
+
+def run(csv_path, number):
+    items = load_items(csv_path)
+    state = lambda books: [[getattr(b, slot) for slot in Book.__slots__] for b in books]
+    assert state(chain(items)) == state(direct(items)), "direct decoder disagrees with the boto3 chain"
+
+    chain_time = min(timeit.repeat(lambda: chain(items), number=1, repeat=number))
+    direct_time = min(timeit.repeat(lambda: direct(items), number=1, repeat=number))
+
+    print(f"{len(items)} items, best of {number}")
+    print(f"{'chain':>8}: {chain_time * 1000:9.1f} ms  ({chain_time / len(items) * 1e6:.2f} µs/item)")
+    print(f"{'direct':>8}: {direct_time * 1000:9.1f} ms  ({direct_time / len(items) * 1e6:.2f} µs/item)")
+    print(f"{'speedup':>8}: {chain_time / direct_time:9.2f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--csv', default='data/books.csv', help='books CSV to build items from')
+    parser.add_argument('--number', type=int, default=5, help='repetitions (best is reported)')
+    args = parser.parse_args()
+    run(args.csv, args.number)
@@ -0,0 +1,71 @@
+"""
+Cart pricing benchmark.
+Compares the old inline float math against the Decimal pricing engine,
+cold (first price of a cart version) and memoized (unchanged cart), for carts
+of 1 to 500 lines.
+
+Usage: python -m benchmarks.bench_pricing [--number 2000]
+"""
+import argparse
+import random
+import timeit
+
+from utils.pricing import PricingEngine, COUPONS, compute_totals, reprice_items
+
+CART_SIZES = (1, 10, 50, 100, 500)
+
+
+def legacy_totals(cart_items, coupon):
+    """The float calculation the routes used before the pricing engine."""
+    subtotal = sum(item['price'] * item['quantity'] for item in cart_items)
+
+    discount = 0
+    if coupon:
+        if coupon['type'] == 'percent':
+            discount = subtotal * (coupon['value'] / 100)
+        elif coupon['type'] == 'fixed':
+            discount = coupon['value']
+
+    shipping = 0 if subtotal > 500 or subtotal == 0 else 50
+    tax = max(0, subtotal - discount) * 0.18
+    total = max(0, subtotal - discount + shipping + tax)
+    return {'subtotal': subtotal, 'discount': discount, 'shipping': shipping, 'tax': tax, 'total': total}
+
+
+def make_cart(lines, seed=42):
+    rng = random.Random(seed)
+    return [
+        {
+            'isbn13': f"978{i:010d}",
+            'title': f"Book {i}",
+            'price': round(rng.uniform(99, 1999), 2),
+            'image': '',
+            'quantity': rng.randint(1, 3)
+        }
+        for i in range(lines)
+    ]
+
+
+def run(number):
+    coupon = {'code': 'BOOK20', **COUPONS['BOOK20']}
+    print(f"{'lines':>6} {'legacy float':>14} {'engine cold':>14} {'memo hit':>14} {'reprice':>14}   (µs/call)")
+
+    for lines in CART_SIZES:
+        cart_items = make_cart(lines)
+        catalog_rows = {item['isbn13']: {'price': item['price'] + 1, 'stock': 10} for item in cart_items}
+        engine = PricingEngine()
+        engine.price(cart_items, coupon, 'bench', (lines, 1, 0))
+
+        timings = [
+            timeit.timeit(lambda: legacy_totals(cart_items, coupon), number=number),
+            timeit.timeit(lambda: compute_totals(cart_items, coupon), number=number),
+            timeit.timeit(lambda: engine.price(cart_items, coupon, 'bench', (lines, 1, 0)), number=number),
+            timeit.timeit(lambda: reprice_items(cart_items, catalog_rows), number=number),
+        ]
+        print(f"{lines:>6} " + ' '.join(f"{t / number * 1e6:>14.2f}" for t in timings))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--number', type=int, default=2000, help='calls per measurement')
+    run(parser.parse_args().number)
@@ -0,0 +1,344 @@
+"""
+End-to-end route benchmark for both backends.
+Seeds app.py (SQLite) and app_aws.py (DynamoDB under moto) from data/books.csv
+at 1x/10x/100x scale, then drives the Flask test client through the storefront
+routes and reports p50/p99 latency and throughput per route. Results are saved
+as JSON; --compare prints the change against a saved baseline and exits
+non-zero when a route's p50 regressed by more than --threshold.
+
+Latencies are in-process (test client, no network or WSGI server). moto scans
+cost roughly 2 ms per item and app_aws.py scans the whole Books table for the
+homepage, /api/books and /search, so run DynamoDB on a slice of the CSV
+(e.g. --backend dynamodb --limit 100) rather than the full catalog.
+
+Usage: python -m benchmarks.bench_routes [--backend sqlite dynamodb] [--scale 1 10 100]
+                                         [--limit N] [--requests 100] [--output results.json]
+                                         [--compare baseline.json]
+"""
+import argparse
+import contextlib
+import csv
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from utils.book import BOOK_COLUMNS
+
+SORTS = ('rating', 'popular', 'price_low', 'price_high', 'az', 'za', 'newest', 'oldest')
+FILTERS = {
+    'q': 'love',
+    'category': 'Fiction',
+    'author': 'king',
+    'price_max': '500',
+    'in_stock': 'true',
+}
+SEARCH_TERMS = ('love', 'history', 'war', 'king', 'science')
+PAGES = 5  # /api/books requests cycle through the first few pages
+
+STOCK = 1_000_000  # Enough that checkout never runs out mid-benchmark
+USER_ID = 1
+
+ORDER_FORM = {
+    'full_name': 'Bench Mark', 'email': 'bench@example.com', 'phone': '9999999999',
+    'address1': '1 Test Street', 'address2': '', 'city': 'Pune', 'state': 'MH',
+    'pincode': '411001', 'landmark': ''
+}
+
+
+# === SEED DATA ===
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the apps' print() and error logging while seeding and measuring."""
+    with open(os.devnull, 'w') as devnull, \
+            contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+        yield
+
+
+def load_csv(csv_path, seed=42, limit=None):
+    """Book tuples in BOOK_COLUMNS order, with the import-time price and a fixed stock."""
+    rng = random.Random(seed)
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        rows = []
+        for row in csv.DictReader(f):
+            pages = float(row['num_pages']) if row.get('num_pages') else None
+            price = round(299 + pages * 0.5, 2) if pages else 399.0
+            values = [row.get(c) or None for c in BOOK_COLUMNS[:-2]]
+            rows.append(tuple(values) + (round(price * rng.uniform(0.8, 1.2), 2), STOCK))
+            if len(rows) == limit:
+                break
+    return rows
+
+
+def scaled(rows, scale):
+    """Repeat the catalog `scale` times; copies get a unique isbn13 suffix."""
+    for copy in range(scale):
+        for row in rows:
+            yield row if copy == 0 else (f"{row[0]}-{copy}",) + row[1:]
+
+
+def seed_sqlite(db_path, rows, scale):
+    db = sqlite3.connect(db_path)
+    with open('schema.sql') as f:
+        db.executescript(f.read())
+    db.executemany(
+        f"INSERT INTO books ({', '.join(BOOK_COLUMNS)}) VALUES ({', '.join('?' * len(BOOK_COLUMNS))})",
+        scaled(rows, scale)
+    )
+    db.commit()
+    count = db.execute('SELECT COUNT(*) FROM books').fetchone()[0]
+    db.close()
+    return count
+
+
+def seed_dynamodb(rows, scale):
+    import boto3
+    from create_dynamodb_tables import create_table
+
+    with open('dynamo_schema.json') as f:
+        schemas = json.load(f)
+    dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
+    with quiet():
+        for schema in schemas.values():
+            create_table(dynamodb, schema)
+
+    count = 0
+    with dynamodb.Table('Books').batch_writer() as batch:
+        for row in scaled(rows, scale):
+            item = {}
+            for column, value in zip(BOOK_COLUMNS, row):
+                if value is None or value == '':
+                    continue
+                if column in ('isbn13', 'isbn10', 'title', 'subtitle', 'authors', 'categories', 'thumbnail', 'description'):
+                    item[column] = value
+                else:
+                    item[column] = Decimal(str(value))
+            batch.put_item(Item=item)
+            count += 1
+    return count
+
+
+# === SCENARIOS ===
+
+def scenarios(isbns, rng):
+    """(name, method, path-or-callable, setup) for every measured route."""
+    def pick_isbn():
+        return rng.choice(isbns)
+
+    def api_books(**params):
+        def path(i):
+            query = dict(params, page=str(1 + i % PAGES))
+            return '/api/books?' + '&'.join(f"{k}={v}" for k, v in query.items())
+        return path
+
+    def fill_cart(client):
+        for isbn13 in rng.sample(isbns, 2):
+            client.post('/api/cart/add', json={'isbn13': isbn13, 'quantity': 1})
+
+    yield 'home', 'GET', lambda i: '/', None
+    for sort in SORTS:
+        yield f"api_books sort={sort}", 'GET', api_books(sort=sort), None
+    for name, value in FILTERS.items():
+        yield f"api_books {name}={value}", 'GET', api_books(**{name: value}), None
+    yield 'search', 'GET', lambda i: f"/search?q={SEARCH_TERMS[i % len(SEARCH_TERMS)]}", None
+    yield 'book_details', 'GET', lambda i: f"/book/{pick_isbn()}", None
+    yield 'cart_add', 'POST', lambda i: ('/api/cart/add', {'isbn13': pick_isbn(), 'quantity': 1}), None
+    yield 'place_order', 'POST', lambda i: ('/checkout/place-order', ORDER_FORM), fill_cart
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, min(len(sorted_values) - 1, -(-len(sorted_values) * pct // 100) - 1))
+    return sorted_values[int(index)]
+
+
+def measure(client, method, target, setup, requests, warmup):
+    latencies = []
+    statuses = {}
+    busy = 0.0
+
+    for i in range(warmup + requests):
+        if setup:
+            setup(client)
+        if method == 'GET':
+            path, body = target(i), None
+        else:
+            path, body = target(i)
+
+        start = time.perf_counter()
+        response = client.open(path, method=method, json=body)
+        response.get_data()
+        elapsed = time.perf_counter() - start
+
+        if i >= warmup:
+            latencies.append(elapsed)
+            busy += elapsed
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    latencies.sort()
+    return {
+        'method': method,
+        'requests': requests,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'mean_ms': round(busy / requests * 1000, 3),
+        'throughput_rps': round(requests / busy, 1),
+        'status': statuses,
+        'errors': sum(n for code, n in statuses.items() if int(code) >= 400),
+    }
+
+
+def run_backend(module, isbns, requests, warmup, seed):
+    app = module.app
+    app.config.update(DEBUG=False, TESTING=False, ADMISSION_CONTROL=False)  # Measure routes, not 429s
+    module.book_fragments.invalidate()  # Catalog changed under the app
+
+    rng = random.Random(seed)
+    results = {}
+    with app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess['user_id'] = USER_ID
+            sess['username'] = 'bench'
+        for name, method, target, setup in scenarios(isbns, rng):
+            with quiet():
+                results[name] = measure(client, method, target, setup, requests, warmup)
+            print_row(name, results[name])
+    return results
+
+
+def bench_sqlite(rows, scale, requests, warmup, seed):
+    workdir = tempfile.mkdtemp(prefix='bench-sqlite-')
+    try:
+        db_path = os.path.join(workdir, 'bookstore.db')
+        start = time.perf_counter()
+        count = seed_sqlite(db_path, rows, scale)
+        seed_seconds = time.perf_counter() - start
+
+        with quiet():
+            import app as module
+        module.app.config['DATABASE_PATH'] = db_path
+        isbns = [r[0] for r in sqlite3.connect(db_path).execute('SELECT isbn13 FROM books')]
+        print(f"\n[sqlite x{scale}] {count} books, seeded in {seed_seconds:.1f}s")
+        return count, seed_seconds, run_backend(module, isbns, requests, warmup, seed)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def bench_dynamodb(rows, scale, requests, warmup, seed):
+    from moto import mock_aws
+
+    with mock_aws():
+        start = time.perf_counter()
+        count = seed_dynamodb(rows, scale)
+        seed_seconds = time.perf_counter() - start
+
+        with quiet():
+            import app_aws as module
+        isbns = [row[0] for row in scaled(rows, scale)]
+        print(f"\n[dynamodb x{scale}] {count} books, seeded in {seed_seconds:.1f}s")
+        return count, seed_seconds, run_backend(module, isbns, requests, warmup, seed)
+
+
+BACKENDS = {'sqlite': bench_sqlite, 'dynamodb': bench_dynamodb}
+
+
+# === REPORTING ===
+
+def print_row(name, result):
+    print(f"  {name:<28} p50 {result['p50_ms']:9.2f} ms   p99 {result['p99_ms']:9.2f} ms   "
+          f"{result['throughput_rps']:8.1f} req/s" + (f"   {result['errors']} errors" if result['errors'] else ''))
+
+
+def compare(current, baseline, threshold):
+    """Print per-route deltas against a baseline; returns the regressed routes."""
+    regressions = []
+    print(f"\nComparison with baseline ({baseline['meta']['created']}), threshold {threshold:.0%}")
+
+    for backend, scales in current['results'].items():
+        for scale, run in scales.items():
+            base_run = baseline['results'].get(backend, {}).get(scale)
+            if not base_run:
+                print(f"[{backend} x{scale}] not in baseline")
+                continue
+            print(f"[{backend} x{scale}]")
+            for name, result in run['routes'].items():
+                base = base_run['routes'].get(name)
+                if not base:
+                    print(f"  {name:<28} new route")
+                    continue
+                p50 = result['p50_ms'] / base['p50_ms'] - 1
+                p99 = result['p99_ms'] / base['p99_ms'] - 1
+                rps = result['throughput_rps'] / base['throughput_rps'] - 1
+                flag = ''
+                if p50 > threshold:
+                    flag = '  REGRESSION'
+                    regressions.append(f"{backend} x{scale} {name}")
+                print(f"  {name:<28} p50 {p50:+7.1%}   p99 {p99:+7.1%}   throughput {rps:+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--csv', default='data/books.csv', help='books CSV to seed from')
+    parser.add_argument('--backend', nargs='+', choices=BACKENDS, default=list(BACKENDS), help='backends to run')
+    parser.add_argument('--scale', nargs='+', type=int, default=[1, 10, 100], help='catalog multipliers')
+    parser.add_argument('--limit', type=int, help='only seed the first N CSV rows (before scaling)')
+    parser.add_argument('--requests', type=int, default=100, help='measured requests per route')
+    parser.add_argument('--warmup', type=int, default=5, help='unmeasured requests per route')
+    parser.add_argument('--seed', type=int, default=42, help='random seed for data and request mix')
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--compare', metavar='BASELINE', help='results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='p50 slowdown counted as a regression')
+    args = parser.parse_args()
+
+    # Everything AWS stays inside moto; an empty topic ARN skips order notifications
+    for key in ('AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY'):
+        os.environ[key] = 'testing'
+    os.environ['AWS_DEFAULT_REGION'] = 'us-east-1'
+    os.environ['SNS_TOPIC_ARN'] = ''
+
+    rows = load_csv(args.csv, args.seed, args.limit)
+    output = {
+        'meta': {
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'csv': args.csv,
+            'limit': args.limit,
+            'requests': args.requests,
+            'warmup': args.warmup,
+            'seed': args.seed,
+        },
+        'results': {},
+    }
+
+    for backend in args.backend:
+        for scale in args.scale:
+            count, seed_seconds, routes = BACKENDS[backend](rows, scale, args.requests, args.warmup, args.seed)
+            output['results'].setdefault(backend, {})[str(scale)] = {
+                'books': count, 'seed_seconds': round(seed_seconds, 2), 'routes': routes
+            }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(output, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} route(s) regressed")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Fork-shared catalog benchmark.
+Builds a synthetic catalog in a master process, either as a list of Book
+objects (a conventional per-process cache) or as a CatalogSnapshot buffer,
+then forks N workers that each serve listing-style reads over the whole
+catalog. Reports each worker's dirty private (copied-on-write) memory from
+/proc/self/smaps_rollup: with Book objects every worker ends up with its own
+copy, while the memory-mapped snapshot stays in the shared page cache. The
+"swapped" mode maps the file in each worker after the fork, as after a
+snapshot swap, so its indexes are the worker's own reads of the file.
+Also times single- vs multi-filter selects on the snapshot's bitmap indexes.
+Linux only.
+
+Usage: python -m benchmarks.bench_snapshot [--books 100000] [--workers 1 2 4 8]
+"""
+import argparse
+import gc
+import os
+import tempfile
+import time
+
+from generate_data import CatalogProfile, SyntheticDataset
+from utils.book import Book, BOOK_COLUMNS
+from utils.catalog_snapshot import CatalogSnapshot
+
+
+def private_kb():
+    """Private_Dirty of this process in kB: memory no other process can share."""
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            if line.startswith('Private_Dirty:'):
+                return int(line.split()[1])
+    return 0
+
+
+def serve_objects(books):
+    """What /api/books does with a cached Book list: filter, sort, take a page."""
+    in_stock = [b for b in books if b.stock > 0 and b.price <= 2000]
+    in_stock.sort(key=lambda b: (b.rating, b.ratings_count), reverse=True)
+    return in_stock[:12]
+
+
+def serve_snapshot(snapshot):
+    """The same listing off the snapshot columns."""
+    rows = snapshot.select(price_max=2000, in_stock=True, sort='rating', limit=12)
+    return [snapshot.book(i) for i in rows]
+
+
+def time_filters(snapshot, repeat=20):
+    """Milliseconds per first-page select: bitmap ANDs should keep combinations as cheap as one filter."""
+    category = max(snapshot.bitmaps.categories, key=lambda name: snapshot.bitmaps.categories[name].bit_length())
+    cases = (
+        ('category', dict(category=category)),
+        ('in stock', dict(in_stock=True)),
+        ('price <= 500', dict(price_max=500)),
+        ('category + in stock + price', dict(category=category, in_stock=True, price_max=500)),
+        ('... + author', dict(category=category, in_stock=True, price_max=500, author='a')),
+    )
+    for label, filters in cases:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            snapshot.select(sort='rating', limit=12, **filters)
+        print(f"   {label:<30} {(time.perf_counter() - start) / repeat * 1000:>7.2f} ms")
+
+
+def run(mode, catalog, workers):
+    """Fork `workers` children that serve a few requests; returns their private memory growth in MB."""
+    serve = serve_objects if mode == 'objects' else serve_snapshot
+    gc.collect()
+    gc.freeze()  # As gunicorn.conf.py does before forking
+
+    pipes = []
+    for _ in range(workers):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            before = private_kb()
+            target = CatalogSnapshot.load(catalog) if mode == 'swapped' else catalog
+            for _ in range(3):
+                serve(target)
+                gc.collect()  # A worker's collections are what dirty shared object pages
+            os.write(write_fd, str(private_kb() - before).encode())
+            os._exit(0)
+        os.close(write_fd)
+        pipes.append((pid, read_fd))
+
+    growth = []
+    for pid, read_fd in pipes:
+        growth.append(int(os.read(read_fd, 64) or 0) / 1024)
+        os.close(read_fd)
+        os.waitpid(pid, 0)
+    gc.unfreeze()
+    return growth
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--csv', default='data/books.csv')
+    parser.add_argument('--books', type=int, default=100000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    dataset = SyntheticDataset(CatalogProfile(args.csv), args.books, 1, 0, args.seed)
+    print(f"📚 Generating {args.books} books...")
+    books = [Book(*[row[column] for column in BOOK_COLUMNS]) for row in dataset.books()]
+
+    start = time.perf_counter()
+    path = os.path.join(tempfile.mkdtemp(), 'catalog.snapshot')
+    CatalogSnapshot.from_books(books).write(path)
+    snapshot = CatalogSnapshot.load(path)
+    print(f"   Snapshot: {len(snapshot.data) / 1e6:.1f} MB, built in {time.perf_counter() - start:.2f}s")
+    start = time.perf_counter()
+    snapshot.bitmaps.prepare()  # As SnapshotManager.preload() does before forking
+    print(f"   Bitmap indexes read in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    print("\n⏱️  First-page selects")
+    time_filters(snapshot)
+
+    for mode, catalog in (('objects', books), ('snapshot', snapshot), ('swapped', path)):
+        print(f"\n🧪 {mode}")
+        for workers in args.workers:
+            growth = run(mode, catalog, workers)
+            print(f"   {workers:>2} workers: {sum(growth):>8.1f} MB private in total "
+                  f"({sum(growth) / workers:.1f} MB per worker)")
+
+
+if __name__ == '__main__':
+    main()
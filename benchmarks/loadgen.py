@@ -0,0 +1,348 @@
+"""
+Traffic replay load generator.
+Runs concurrent virtual users against a running app (app.py or app_aws.py),
+each replaying what catalog.js does in a browser: load /catalog plus its two
+/api/books calls, then debounced searches, slider/filter/sort changes,
+pagination, book pages and cart/checkout flows. Load is applied in stages
+(users:seconds) and reported per interval and per stage: throughput, latency
+percentiles and error rate, with the first stage where extra users stop
+buying throughput flagged as the saturation point.
+
+The app's admission control (utils/admission.py) sheds over-limit requests
+with 429/503, which count as errors here and cap throughput at its limits
+rather than at the app's capacity. Start the app with ADMISSION_CONTROL=0 to
+find where the app itself saturates, or leave it on to test the limits.
+
+Usage: python -m benchmarks.loadgen --url http://127.0.0.1:5000 --mix browse
+                                    --stages 5:30 10:30 20:30 40:30 [--think 1.0]
+                                    [--output load.json]
+"""
+import argparse
+import gzip
+import http.cookiejar
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from benchmarks.bench_routes import ORDER_FORM, percentile
+
+# Relative frequency of each session type per mix
+MIXES = {
+    'browse': {'browse': 80, 'search': 15, 'checkout': 5},
+    'search': {'browse': 20, 'search': 75, 'checkout': 5},
+    'checkout': {'browse': 30, 'search': 10, 'checkout': 60},
+}
+
+CATEGORIES = ('Fiction', 'Juvenile Fiction', 'Biography & Autobiography', 'History', 'Science', 'Philosophy')
+SORTS = ('rating', 'popular', 'price_low', 'price_high', 'az', 'za', 'newest', 'oldest')
+SEARCH_TERMS = ('love', 'history', 'war', 'magic', 'science', 'murder', 'family', 'king', 'dragon', 'life')
+AUTHORS = ('king', 'austen', 'tolkien', 'christie', 'rowling', 'dickens')
+PASSWORD = 'LoadTest123!'
+TIMEOUT = 30
+
+
+class Recorder:
+    """Thread-safe log of (finished_at, name, seconds, ok) samples."""
+
+    def __init__(self):
+        self.samples = []
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds, ok):
+        with self._lock:
+            self.samples.append((time.monotonic(), name, seconds, ok))
+
+    def between(self, start, end):
+        with self._lock:
+            return [s for s in self.samples if start <= s[0] < end]
+
+
+def summarize(samples, seconds, by_name=False):
+    """Throughput, percentiles (ms) and error rate of a window of samples."""
+    if not samples:
+        return {'requests': 0, 'rps': 0.0, 'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'error_rate': 0.0}
+    latencies = sorted(s[2] for s in samples)
+    errors = sum(1 for s in samples if not s[3])
+    result = {
+        'requests': len(samples),
+        'rps': round(len(samples) / seconds, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+        'error_rate': round(errors / len(samples), 4),
+    }
+    if by_name:
+        names = sorted({s[1] for s in samples})
+        result['endpoints'] = {name: summarize([s for s in samples if s[1] == name], seconds) for name in names}
+    return result
+
+
+class VirtualUser(threading.Thread):
+    """One browser: its own cookie jar, catalog state and think time."""
+
+    def __init__(self, index, runner):
+        super().__init__(daemon=True)
+        self.index = index
+        self.runner = runner
+        self.rng = random.Random(runner.seed * 100003 + index)
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+        self.isbns = []
+        self.logged_in = False
+
+    # --- HTTP ---
+
+    def request(self, name, path, data=None, json_body=None):
+        """Timed request; returns the body (or None on error) and records the sample."""
+        url = self.runner.url + path
+        headers = {'Accept-Encoding': 'gzip'}
+        if json_body is not None:
+            data = json.dumps(json_body).encode()
+            headers['Content-Type'] = 'application/json'
+        elif data is not None:
+            data = urllib.parse.urlencode(data).encode()
+
+        start = time.perf_counter()
+        try:
+            with self.opener.open(urllib.request.Request(url, data=data, headers=headers), timeout=TIMEOUT) as response:
+                body = response.read()
+                if response.headers.get('Content-Encoding') == 'gzip':
+                    body = gzip.decompress(body)
+            ok = True
+        except urllib.error.HTTPError as e:
+            body, ok = None, False
+            e.close()
+        except OSError:
+            body, ok = None, False
+        elapsed = time.perf_counter() - start
+
+        if self.runner.recording:
+            self.runner.recorder.add(name, elapsed, ok)
+        return body
+
+    def books(self, name, **params):
+        """GET /api/books the way catalog.js builds the query string."""
+        query = {
+            'q': '', 'category': '', 'price_max': 2000, 'author': '', 'in_stock': 'false',
+            'sort': 'rating', 'page': 1
+        }
+        query.update(params)
+        body = self.request(name, '/api/books?' + urllib.parse.urlencode(query))
+        if body:
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                return None
+            found = [book['isbn'] for book in payload.get('books', [])]
+            if found:
+                self.isbns = found
+            return payload
+        return None
+
+    def think(self):
+        if self.runner.think:
+            time.sleep(self.rng.expovariate(1 / self.runner.think))
+
+    def alive(self):
+        return not self.runner.stopping and self.index < self.runner.target_users
+
+    # --- Sessions ---
+
+    def load_catalog(self):
+        """Page load: the HTML, then fetchBooks() and fetchFeatured()."""
+        self.request('catalog', '/catalog')
+        self.books('api_books')
+        self.request('featured', '/api/books?sort=rating&page=1')
+
+    def browse(self):
+        self.load_catalog()
+        state = {}
+        for _ in range(self.rng.randint(2, 6)):
+            if not self.alive():
+                return
+            self.think()
+            action = self.rng.random()
+            if action < 0.25:
+                state.update(category=self.rng.choice(CATEGORIES), page=1)
+            elif action < 0.45:
+                state.update(sort=self.rng.choice(SORTS), page=1)
+            elif action < 0.6:
+                state.update(price_max=self.rng.choice((300, 500, 800, 1200)), page=1)  # slider release
+            elif action < 0.7:
+                state.update(in_stock='true', page=1)
+            elif action < 0.85:
+                state['page'] = state.get('page', 1) + 1
+            elif self.isbns:
+                self.request('book', f"/book/{self.rng.choice(self.isbns)}")
+                continue
+            self.books('api_books', **state)
+
+    def search(self):
+        self.load_catalog()
+        for _ in range(self.rng.randint(1, 4)):
+            if not self.alive():
+                return
+            self.think()
+            field = 'author' if self.rng.random() < 0.25 else 'q'
+            term = self.rng.choice(AUTHORS if field == 'author' else SEARCH_TERMS)
+            # Debounced typing: a request fires at each pause of 500ms or more
+            for cut in sorted(set(self.rng.sample(range(2, len(term)), k=min(2, len(term) - 2)))):
+                if self.rng.random() < 0.3:
+                    self.books('api_books_search', **{field: term[:cut]})
+            self.books('api_books_search', **{field: term})
+            if self.isbns and self.rng.random() < 0.4:
+                self.think()
+                self.request('book', f"/book/{self.rng.choice(self.isbns)}")
+
+    def checkout(self):
+        if not self.logged_in:
+            self.login()
+        self.load_catalog()
+        for isbn13 in self.rng.sample(self.isbns, min(len(self.isbns), self.rng.randint(1, 3))):
+            self.think()
+            self.request('book', f"/book/{isbn13}")
+            self.request('cart_add', '/api/cart/add', json_body={'isbn13': isbn13, 'quantity': 1})
+        self.think()
+        self.request('cart', '/cart')
+        self.request('checkout', '/checkout')
+        self.think()
+        self.request('place_order', '/checkout/place-order', json_body=ORDER_FORM)
+
+    def login(self):
+        """Sign up once per virtual user (serialized: app_aws assigns ids by scanning) and log in."""
+        username = f"lg{self.runner.run_id}u{self.index}"
+        with self.runner.signup_lock:
+            self.request('signup', '/signup', data={
+                'name': 'Load Test', 'email': f"{username}@example.com", 'username': username,
+                'password': PASSWORD, 'confirm_password': PASSWORD
+            })
+        self.request('login', '/login', data={'username': username, 'password': PASSWORD})
+        self.logged_in = True
+
+    def run(self):
+        sessions = list(self.runner.mix)
+        weights = [self.runner.mix[s] for s in sessions]
+        while self.alive():
+            getattr(self, self.rng.choices(sessions, weights=weights)[0])()
+            self.think()
+
+
+class LoadRunner:
+    def __init__(self, url, mix, stages, think, interval, seed):
+        self.url = url.rstrip('/')
+        self.mix = MIXES[mix]
+        self.stages = stages
+        self.think = think
+        self.interval = interval
+        self.seed = seed
+        self.run_id = f"{int(time.time()) % 100000}"
+        self.recorder = Recorder()
+        self.signup_lock = threading.Lock()
+        self.target_users = 0
+        self.recording = True
+        self.stopping = False
+        self.users = []
+
+    def scale_to(self, count):
+        self.target_users = count
+        # Users beyond the target exit on their own; restart any that already did
+        for index in range(count):
+            if index >= len(self.users) or not self.users[index].is_alive():
+                user = VirtualUser(index, self)
+                if index < len(self.users):
+                    self.users[index] = user
+                else:
+                    self.users.append(user)
+                user.start()
+
+    def run(self):
+        timeline, stage_results = [], []
+        started = time.monotonic()
+        print(f"{'time':>6} {'users':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+
+        for users, seconds in self.stages:
+            self.scale_to(users)
+            stage_start = time.monotonic()
+            stage_end = stage_start + seconds
+            window_start = stage_start
+            while window_start < stage_end:
+                window_end = min(stage_end, window_start + self.interval)
+                time.sleep(max(0.0, window_end - time.monotonic()))
+                row = summarize(self.recorder.between(window_start, window_end), window_end - window_start)
+                row.update(t=round(window_end - started, 1), users=users)
+                timeline.append(row)
+                print(f"{row['t']:6.0f} {users:5d} {row['rps']:8.1f} {_ms(row['p50_ms'])} {_ms(row['p95_ms'])} "
+                      f"{_ms(row['p99_ms'])} {row['error_rate']:7.1%}")
+                window_start = window_end
+
+            stage = summarize(self.recorder.between(stage_start, stage_end), seconds, by_name=True)
+            stage['users'] = users
+            stage_results.append(stage)
+
+        self.stopping = True
+        self.recording = False
+        return timeline, stage_results
+
+
+def _ms(value):
+    return f"{value:8.1f}" if value is not None else f"{'-':>8}"
+
+
+def saturation_point(stages, min_gain=0.05):
+    """First stage where adding users raised throughput by less than `min_gain`."""
+    for previous, stage in zip(stages, stages[1:]):
+        if stage['users'] > previous['users'] and stage['rps'] < previous['rps'] * (1 + min_gain):
+            return stage
+    return None
+
+
+def parse_stage(text):
+    users, _, seconds = text.partition(':')
+    return int(users), float(seconds or 30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='base URL of the running app')
+    parser.add_argument('--mix', choices=MIXES, default='browse', help='traffic mix to replay')
+    parser.add_argument('--stages', nargs='+', type=parse_stage, default=[(5, 30), (10, 30), (20, 30), (40, 30)],
+                        metavar='USERS:SECONDS', help='load steps, e.g. 5:30 10:30 20:30')
+    parser.add_argument('--think', type=float, default=1.0, help='mean think time in seconds (0 = closed loop)')
+    parser.add_argument('--interval', type=float, default=5.0, help='seconds per timeline row')
+    parser.add_argument('--seed', type=int, default=42, help='random seed for user behaviour')
+    parser.add_argument('--output', help='write timeline and stage summaries as JSON')
+    args = parser.parse_args()
+
+    runner = LoadRunner(args.url, args.mix, args.stages, args.think, args.interval, args.seed)
+    print(f"🚦 Replaying '{args.mix}' traffic against {runner.url}")
+    timeline, stages = runner.run()
+
+    print(f"\n{'users':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for stage in stages:
+        print(f"{stage['users']:5d} {stage['rps']:8.1f} {_ms(stage['p50_ms'])} {_ms(stage['p95_ms'])} "
+              f"{_ms(stage['p99_ms'])} {stage['error_rate']:7.1%}")
+
+    saturated = saturation_point(stages)
+    if saturated:
+        print(f"\n📈 Saturation at ~{saturated['users']} users: throughput flat at {saturated['rps']} req/s, "
+              f"p99 {saturated['p99_ms']} ms")
+    else:
+        print("\n📈 Throughput still rising at the last stage; add larger stages to find saturation")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'url': runner.url, 'mix': args.mix, 'think': args.think,
+                'stages': stages, 'timeline': timeline,
+                'saturation_users': saturated['users'] if saturated else None,
+            }, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Cold-start profiler.
+Imports app.py and/or app_aws.py in fresh interpreters under `python -X
+importtime`, reports the median wall-clock import time and the modules that
+cost the most (self time and cumulative time of top-level imports), and
+exits non-zero when an app's median exceeds --budget seconds.
+
+Usage: python -m benchmarks.startup [--app app app_aws] [--runs 5] [--top 15] [--budget 1.5]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MARKER = 'IMPORT_SECONDS'
+PROBE = (
+    "import time; start = time.perf_counter(); import {module}; "
+    "print('" + MARKER + "', time.perf_counter() - start)"
+)
+
+
+def import_env():
+    env = dict(os.environ)
+    # app_aws creates its clients lazily, but boto3 still wants a region and credentials
+    env.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    env.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    env.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+    env.setdefault('SNS_TOPIC_ARN', '')
+    return env
+
+
+def profile_import(module, importtime=True):
+    """Import `module` in a fresh interpreter; returns (seconds, [(self_us, cumulative_us, depth, name)])."""
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    command += ['-c', PROBE.format(module=module)]
+    result = subprocess.run(command, cwd=ROOT, env=import_env(), capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    seconds = next(float(line.split()[1]) for line in result.stdout.splitlines() if line.startswith(MARKER))
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((int(self_us), int(cumulative_us), depth, name.strip()))
+
+    if not modules:
+        return seconds, modules
+
+    # importtime prints children before their parent: keep only the module's own subtree (not site's)
+    end = max(i for i, entry in enumerate(modules) if entry[2] == 0 and entry[3] == module)
+    start = max((i + 1 for i, entry in enumerate(modules[:end]) if entry[2] == 0), default=0)
+    return seconds, modules[start:end + 1]
+
+
+def report(module, runs, top):
+    timings = [profile_import(module, importtime=False)[0] for _ in range(runs)]
+    _, modules = profile_import(module)
+    median = statistics.median(timings)
+
+    print(f"\n🚀 import {module}: median {median * 1000:.0f} ms "
+          f"(min {min(timings) * 1000:.0f}, max {max(timings) * 1000:.0f}, {runs} runs)")
+
+    # Depth 1 entries are the app's own imports; their cumulative time is what it pays for each
+    direct = defaultdict(int)
+    for self_us, cumulative_us, depth, name in modules:
+        if depth == 1:
+            direct[name] += cumulative_us
+    print("   Top imports by cumulative time:")
+    for name, cumulative_us in sorted(direct.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"   {cumulative_us / 1000:>9.1f} ms  {name}")
+
+    print("   Top modules by self time:")
+    for self_us, _, _, name in sorted(modules, reverse=True)[:top]:
+        print(f"   {self_us / 1000:>9.1f} ms  {name}")
+
+    heavy = [name for name in ('pandas', 'numpy') if any(entry[3] == name for entry in modules)]
+    if heavy:
+        print(f"   ⚠️  Imported at startup: {', '.join(heavy)}")
+    return median
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--app', nargs='+', default=['app', 'app_aws'], choices=['app', 'app_aws'])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--budget', type=float, help='fail if a median import takes longer (seconds)')
+    args = parser.parse_args()
+
+    over = []
+    for module in args.app:
+        median = report(module, args.runs, args.top)
+        if args.budget and median > args.budget:
+            over.append(f"{module} ({median:.2f}s > {args.budget:.2f}s)")
+
+    if over:
+        print(f"\n❌ Over the import budget: {', '.join(over)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
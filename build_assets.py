@@ -0,0 +1,18 @@
+"""
+Build fingerprinted static assets.
+Minifies static/style.css and the catalog/main scripts, writes content-hashed
+copies plus .gz/.br siblings to static/dist/, and updates static/dist/manifest.json
+which the asset_url() template helper reads.
+
+Usage: python build_assets.py
+"""
+import os
+
+from utils.assets import build
+
+STATIC_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+if __name__ == '__main__':
+    print("Building static assets...")
+    manifest = build(STATIC_FOLDER)
+    print(f"✅ {len(manifest)} assets written to static/dist/")
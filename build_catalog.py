@@ -0,0 +1,116 @@
+"""
+Build the binary catalog snapshot.
+Writes the memory-mappable catalog file served by app_aws.py when
+CATALOG_SNAPSHOT is set (see utils/catalog_snapshot.py) from data/books.csv,
+the SQLite database or the DynamoDB Books table. The file is replaced
+atomically, so running workers swap to it within a second.
+
+Usage:
+    python build_catalog.py --csv data/books.csv
+    python build_catalog.py --sqlite instance/bookstore.db --output instance/catalog.snapshot
+    python build_catalog.py --dynamodb          # AWS_ENDPOINT_URL for DynamoDB Local
+"""
+import argparse
+import csv
+import os
+import random
+import sqlite3
+import time
+
+from import_data import calculate_price
+from utils.book import Book, BOOK_COLUMNS
+from utils.catalog_snapshot import CatalogSnapshot, reset_stock_journal
+
+DEFAULT_STOCK = 10  # What import_data.py gives every CSV book
+
+
+def number(value):
+    return float(value) if value not in (None, '') else None
+
+
+def books_from_csv(path):
+    """Books as import_data.py would load them into SQLite (its calculate_price(), default stock and fill-ins)."""
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            pages = number(row.get('num_pages'))
+            yield Book(
+                isbn13=row['isbn13'], isbn10=row.get('isbn10'), title=row.get('title'),
+                subtitle=row.get('subtitle'), authors=row.get('authors') or 'Unknown Author',
+                categories=row.get('categories') or 'General', thumbnail=row.get('thumbnail'),
+                description=row.get('description') or 'No description available.', published_year=number(row.get('published_year')),
+                average_rating=number(row.get('average_rating')), num_pages=pages,
+                ratings_count=number(row.get('ratings_count')),
+                price=calculate_price(pages), stock=DEFAULT_STOCK
+            )
+
+
+def books_from_sqlite(path):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    try:
+        for row in conn.execute(f"SELECT {', '.join(BOOK_COLUMNS)} FROM books"):
+            yield Book.from_row(row)
+    finally:
+        conn.close()
+
+
+def books_from_dynamodb():
+    from batch_migrate import get_dynamodb_resource
+
+    table = get_dynamodb_resource().Table('Books')
+    kwargs = {}
+    while True:
+        response = table.scan(**kwargs)
+        for item in response.get('Items', []):
+            yield Book.from_item(item)
+        if 'LastEvaluatedKey' not in response:
+            return
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--csv', metavar='PATH')
+    source.add_argument('--sqlite', metavar='PATH')
+    source.add_argument('--dynamodb', action='store_true')
+    parser.add_argument('--output', default=os.environ.get('CATALOG_SNAPSHOT', 'instance/catalog.snapshot'))
+    args = parser.parse_args()
+
+    if args.csv:
+        books, label = books_from_csv(args.csv), args.csv
+    elif args.sqlite:
+        if not os.path.exists(args.sqlite):
+            parser.error(f"{args.sqlite} does not exist")
+        books, label = books_from_sqlite(args.sqlite), args.sqlite
+    else:
+        books, label = books_from_dynamodb(), 'DynamoDB Books'
+
+    print(f"📚 Reading {label}...")
+    reset_stock_journal(args.output)  # Orders journaled so far are in what we read (or superseded by it)
+    start = time.perf_counter()
+    books = list(books)
+    read_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if os.path.dirname(args.output):
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    CatalogSnapshot.from_books(books).write(args.output)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    snapshot = CatalogSnapshot.load(args.output)
+    open_ms = (time.perf_counter() - start) * 1000
+
+    sample = [book.isbn13 for book in random.Random(0).sample(books, min(1000, len(books)))]
+    start = time.perf_counter()
+    found = sum(snapshot.find(isbn13) >= 0 for isbn13 in sample)
+    lookup_us = (time.perf_counter() - start) / max(len(sample), 1) * 1e6
+
+    print(f"✅ {args.output}: {len(snapshot)} books, {os.path.getsize(args.output) / 1e6:.1f} MB "
+          f"(read {read_seconds:.2f}s, built {build_seconds:.2f}s)")
+    print(f"   Opens in {open_ms:.2f} ms; ISBN lookup {lookup_us:.1f} µs ({found}/{len(sample)} found)")
+
+
+if __name__ == '__main__':
+    main()
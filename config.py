@@ -6,6 +6,7 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     SQLALCHEMY_DATABASE_URI = 'sqlite:///instance/bookstore.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    DATABASE_PATH = os.environ.get('DATABASE_PATH', 'instance/bookstore.db')  # SQLite file used by app.py
     
     # Local development settings
     DEBUG = True
@@ -14,6 +15,41 @@ class Config:
     # Session settings
     SESSION_COOKIE_SECURE = False  # True in production with HTTPS
     PERMANENT_SESSION_LIFETIME = 1800  # 30 minutes
+    
+    # Response compression (gzip, plus brotli when installed)
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 500))  # bytes
+    COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))  # 1-9
+    COMPRESS_BROTLI_LEVEL = int(os.environ.get('COMPRESS_BROTLI_LEVEL', 5))  # 0-11
+    COMPRESS_CACHE_ENTRIES = 1024  # Precompressed bodies kept in memory
+    
+    # Book cover thumbnails (defaults to instance/thumbnails)
+    THUMBNAIL_CACHE_DIR = os.environ.get('THUMBNAIL_CACHE_DIR')
+    
+    # Jinja bytecode cache (defaults to instance/jinja_cache) and startup compilation
+    TEMPLATE_BYTECODE_DIR = os.environ.get('TEMPLATE_BYTECODE_DIR')
+    TEMPLATE_PRELOAD = os.environ.get('TEMPLATE_PRELOAD', '1') != '0'
+    
+    # /metrics is open to logged-in admins, and to scrapers sending this bearer token
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    
+    # X-DynamoDB-Capacity response header outside debug mode (app_aws.py)
+    DYNAMODB_CAPACITY_HEADER = os.environ.get('DYNAMODB_CAPACITY_HEADER', '0') == '1'
+    
+    # SQLite statements slower than this are logged with their query plan (app.py)
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '50'))
+    SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG')  # Defaults to instance/slow_queries.jsonl
+    
+    # Catalog snapshot file shared by all workers (app_aws.py); unset serves listings from live scans
+    CATALOG_SNAPSHOT = os.environ.get('CATALOG_SNAPSHOT')
+    CATALOG_SNAPSHOT_MAX_AGE = float(os.environ.get('CATALOG_SNAPSHOT_MAX_AGE', '300'))
+    
+    # Homepage/related/listing caches: served as-is until the soft TTL, then stale while a
+    # background refresh runs; past the hard TTL (or after a catalog write) loaded inline
+    CATALOG_CACHE_SOFT_TTL = float(os.environ.get('CATALOG_CACHE_SOFT_TTL', '30'))
+    CATALOG_CACHE_HARD_TTL = float(os.environ.get('CATALOG_CACHE_HARD_TTL', '600'))
+    
+    # Rate/concurrency limits per endpoint class (ADMISSION_CLASSES in utils/admission.py)
+    ADMISSION_CONTROL = os.environ.get('ADMISSION_CONTROL', '1') != '0'
 
 class AWSConfig(Config):
     """AWS deployment configuration (Stage 2)."""
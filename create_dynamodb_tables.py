@@ -55,6 +55,13 @@ def create_table(dynamodb, schema: dict):
     table.wait_until_exists()
     print(f"Table created successfully: {table_name}")
 
+    if "TimeToLiveSpecification" in schema:
+        dynamodb.meta.client.update_time_to_live(
+            TableName=table_name,
+            TimeToLiveSpecification=schema["TimeToLiveSpecification"],
+        )
+        print(f"TTL enabled on {table_name}.{schema['TimeToLiveSpecification']['AttributeName']}")
+
 
 def main():
     schema_file = "dynamo_schema.json"
@@ -31,7 +31,7 @@ def export_books():
         
         # Write data
         count = 0
-        for row in cursor.fetchall():
+        for row in cursor:  # Stepped row by row, not loaded whole
             writer.writerow([
                 row['isbn13'],
                 row['isbn10'] or '',
@@ -68,7 +68,7 @@ def export_users():
         ])
         
         count = 0
-        for row in cursor.fetchall():
+        for row in cursor:  # Stepped row by row, not loaded whole
             writer.writerow([
                 row['username'],
                 row['email'],
@@ -98,7 +98,7 @@ def export_admins():
         ])
         
         count = 0
-        for row in cursor.fetchall():
+        for row in cursor:  # Stepped row by row, not loaded whole
             writer.writerow([
                 int(row['id']),
                 row['username'],
@@ -129,7 +129,7 @@ def export_orders():
         ])
         
         count = 0
-        for row in cursor.fetchall():
+        for row in cursor:  # Stepped row by row, not loaded whole
             writer.writerow([
                 int(row['id']),
                 row['order_id'],
@@ -166,7 +166,7 @@ def export_order_items():
         ])
         
         count = 0
-        for row in cursor.fetchall():
+        for row in cursor:  # Stepped row by row, not loaded whole
             writer.writerow([
                 int(row['id']),
                 row['order_id'],
@@ -197,7 +197,7 @@ def export_delivery_addresses():
         ])
         
         count = 0
-        for row in cursor.fetchall():
+        for row in cursor:  # Stepped row by row, not loaded whole
             writer.writerow([
                 int(row['id']),
                 row['order_id'],
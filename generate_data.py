@@ -0,0 +1,368 @@
+"""
+Synthetic catalog and order-history generator.
+Builds a large, realistic dataset for load and scaling tests: books whose
+categories, authors, description lengths, ratings, page counts and years are
+drawn from the distributions in data/books.csv, plus users, orders, order
+items and delivery addresses with skewed (power-law) book and customer
+popularity. Every row is derived from --seed and its own index, so the same
+arguments always produce the same data.
+
+Usage:
+    python generate_data.py --sqlite instance/synthetic.db           # fresh SQLite file
+    python generate_data.py --dynamodb                               # DynamoDB tables (AWS_ENDPOINT_URL for local)
+    python generate_data.py --books 1000000 --users 200000 --orders 2000000 --seed 7 --sqlite big.db
+"""
+import argparse
+import csv
+import hashlib
+import itertools
+import os
+import random
+import sqlite3
+import time
+from collections import Counter
+from functools import lru_cache
+from datetime import datetime, timedelta
+
+from utils.pricing import compute_totals, COUPONS
+
+BATCH_SIZE = 10000  # Rows per executemany() call
+
+BOOK_FIELDS = (
+    'isbn13', 'isbn10', 'title', 'subtitle', 'authors', 'categories', 'thumbnail', 'description',
+    'published_year', 'average_rating', 'num_pages', 'ratings_count', 'price', 'stock', 'created_at'
+)
+USER_FIELDS = ('id', 'username', 'email', 'password_hash', 'full_name', 'role', 'created_at', 'last_login')
+ORDER_FIELDS = (
+    'order_id', 'user_id', 'guest_email', 'guest_name', 'guest_phone', 'subtotal', 'discount',
+    'shipping', 'tax', 'total', 'coupon_code', 'status', 'created_at'
+)
+ORDER_ITEM_FIELDS = ('order_id', 'isbn13', 'title', 'author', 'price', 'quantity', 'subtotal')
+ADDRESS_FIELDS = (
+    'order_id', 'full_name', 'phone', 'address_line1', 'address_line2', 'city', 'state', 'pincode', 'landmark'
+)
+
+FIRST_NAMES = (
+    'Aarav', 'Vivaan', 'Aditya', 'Arjun', 'Sai', 'Reyansh', 'Ishaan', 'Kabir', 'Rohan', 'Karan',
+    'Ananya', 'Diya', 'Saanvi', 'Aadhya', 'Meera', 'Priya', 'Kavya', 'Riya', 'Neha', 'Pooja',
+    'Amit', 'Rahul', 'Sneha', 'Shayan', 'Farah', 'Imran', 'Zoya', 'Vikram', 'Anjali', 'Nikhil'
+)
+LAST_NAMES = (
+    'Sharma', 'Verma', 'Patel', 'Gupta', 'Singh', 'Kumar', 'Reddy', 'Iyer', 'Nair', 'Menon',
+    'Joshi', 'Desai', 'Mehta', 'Shah', 'Khan', 'Ahmad', 'Das', 'Bose', 'Chatterjee', 'Rao'
+)
+CITIES = (
+    ('Mumbai', 'Maharashtra', '400'), ('Pune', 'Maharashtra', '411'), ('Delhi', 'Delhi', '110'),
+    ('Bengaluru', 'Karnataka', '560'), ('Chennai', 'Tamil Nadu', '600'), ('Hyderabad', 'Telangana', '500'),
+    ('Kolkata', 'West Bengal', '700'), ('Ahmedabad', 'Gujarat', '380'), ('Jaipur', 'Rajasthan', '302'),
+    ('Lucknow', 'Uttar Pradesh', '226'), ('Kochi', 'Kerala', '682'), ('Bhopal', 'Madhya Pradesh', '462')
+)
+CITY_WEIGHTS = (30, 12, 22, 20, 12, 12, 10, 6, 4, 4, 3, 3)  # Metro-heavy
+STREETS = ('MG Road', 'Station Road', 'Park Street', 'Link Road', 'Church Street', 'Main Road', 'Hill Road')
+LANDMARKS = ('', '', '', 'Near City Mall', 'Opposite Post Office', 'Behind Metro Station', 'Near Temple')
+
+STATUSES = ('Pending', 'Confirmed', 'Shipped', 'Delivered', 'Cancelled')
+STATUS_WEIGHTS = (5, 5, 10, 75, 5)
+COUPON_RATE = 0.15  # Share of orders that used a coupon
+HISTORY_DAYS = 3 * 365
+START_DATE = datetime(2023, 1, 1)
+
+# Every synthetic user shares one password; hashing per row would dominate generation
+PASSWORD = 'password123'
+
+
+class CatalogProfile:
+    """Empirical distributions of the real catalog that synthetic books are drawn from."""
+
+    def __init__(self, csv_path):
+        categories = Counter()
+        self.authors = []
+        self.title_words = []
+        self.description_words = []
+        self.description_lengths = []
+        self.ratings = []
+        self.ratings_counts = []
+        self.pages = []
+        self.years = []
+        self.thumbnails = []
+
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                categories[row['categories'] or 'General'] += 1
+                self.authors.append(row['authors'] or 'Unknown Author')
+                self.title_words.extend(row['title'].split())
+                words = row['description'].split()
+                self.description_words.extend(words)
+                self.description_lengths.append(len(words))
+                self.ratings.append(float(row['average_rating'] or 0))
+                self.ratings_counts.append(int(float(row['ratings_count'] or 0)))
+                self.pages.append(int(float(row['num_pages'] or 0)))
+                self.years.append(int(float(row['published_year'] or 0)))
+                if row['thumbnail']:
+                    self.thumbnails.append(row['thumbnail'])
+
+        self.categories = list(categories)
+        self.category_weights = list(itertools.accumulate(categories.values()))
+
+
+def isbn13_for(index):
+    """Unique, checksum-valid 979- ISBN for a synthetic book (no real ISBN uses this block)."""
+    body = f"979{index:09d}"
+    check = (10 - sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(body)) % 10) % 10
+    return f"{body}{check}"
+
+
+def skewed_index(rng, n, skew=2.0):
+    """Index in [0, n) with a power-law bias towards 0 (popular books, frequent customers)."""
+    return min(n - 1, int(n * rng.random() ** (1 + skew)))
+
+
+def seeded_password_hash(password, seed, iterations=600000):
+    """A werkzeug pbkdf2 hash whose salt comes from the seed (generate_password_hash() salts randomly)."""
+    salt = f"synthetic{seed}"
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), iterations).hex()
+    return f"pbkdf2:sha256:{iterations}${salt}${digest}"
+
+
+class SyntheticDataset:
+    """Deterministic generator; books and users can be rebuilt from their index alone."""
+
+    def __init__(self, profile, books, users, orders, seed=42):
+        self.profile = profile
+        self.book_count = books
+        self.user_count = users
+        self.order_count = orders
+        self.seed = seed
+        self.password_hash = seeded_password_hash(PASSWORD, seed)
+        # Order lines only need a few fields, and popular books repeat across orders
+        self.order_line_book = lru_cache(maxsize=65536)(self.book)
+
+    def _rng(self, stream, index):
+        return random.Random((self.seed * 8 + stream) * 10 ** 10 + index)
+
+    def book(self, index):
+        p = self.profile
+        rng = self._rng(1, index)
+
+        words = rng.choices(p.title_words, k=rng.choice((1, 2, 2, 3, 3, 4, 5)))
+        pages = rng.choice(p.pages)
+        price = round(299 + pages * 0.5, 2) if pages else 399.0
+        description_length = rng.choice(p.description_lengths)
+
+        return {
+            'isbn13': isbn13_for(index),
+            'isbn10': '',
+            'title': ' '.join(words).title(),
+            'subtitle': ' '.join(rng.choices(p.title_words, k=3)).capitalize() if rng.random() < 0.35 else '',
+            'authors': rng.choice(p.authors),
+            'categories': rng.choices(p.categories, cum_weights=p.category_weights)[0],
+            'thumbnail': rng.choice(p.thumbnails) if rng.random() < 0.95 else '',
+            'description': ' '.join(rng.choices(p.description_words, k=description_length)),
+            'published_year': rng.choice(p.years) or None,
+            'average_rating': rng.choice(p.ratings),
+            'num_pages': pages or None,
+            'ratings_count': rng.choice(p.ratings_counts),
+            'price': price,
+            'stock': 0 if rng.random() < 0.05 else rng.randint(1, 50),
+            # Written explicitly: the schema's CURRENT_TIMESTAMP default would differ per run
+            'created_at': str(START_DATE + timedelta(seconds=rng.randrange(HISTORY_DAYS * 86400))),
+        }
+
+    def user(self, index):
+        rng = self._rng(2, index)
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        user_id = index + 1
+        return {
+            'id': user_id,
+            'username': f"{first.lower()}{user_id}",
+            'email': f"{first.lower()}.{last.lower()}{user_id}@example.com",
+            'password_hash': self.password_hash,
+            'full_name': f"{first} {last}",
+            'role': 'customer',
+            'created_at': str(START_DATE + timedelta(seconds=rng.randrange(HISTORY_DAYS * 86400))),
+            'last_login': '',
+        }
+
+    def books(self):
+        return (self.book(i) for i in range(self.book_count))
+
+    def users(self):
+        return (self.user(i) for i in range(self.user_count))
+
+    def orders(self):
+        """(order, items, address) per order; book choice and customer are both skewed."""
+        for index in range(self.order_count):
+            rng = self._rng(3, index)
+            user = self.user(skewed_index(rng, self.user_count, skew=1.0))
+            created = datetime.fromisoformat(user['created_at']) + timedelta(seconds=rng.randrange(90 * 86400))
+            order_id = f"ORD-{created.year}-{index:08X}"
+
+            lines = {}
+            for _ in range(min(6, 1 + int(rng.expovariate(0.8)))):
+                lines.setdefault(skewed_index(rng, self.book_count), 1 if rng.random() < 0.85 else 2)
+
+            items = []
+            for book_index, quantity in lines.items():
+                book = self.order_line_book(book_index)
+                items.append({
+                    'order_id': order_id,
+                    'isbn13': book['isbn13'],
+                    'title': book['title'],
+                    'author': book['authors'],
+                    'price': book['price'],
+                    'quantity': quantity,
+                    'subtotal': round(book['price'] * quantity, 2),
+                })
+
+            coupon_code = rng.choice(tuple(COUPONS)) if rng.random() < COUPON_RATE else ''
+            totals = compute_totals(items, COUPONS.get(coupon_code))
+            phone = f"9{rng.randrange(10 ** 9):09d}"
+            order = {
+                'order_id': order_id,
+                'user_id': user['id'],
+                'guest_email': user['email'],
+                'guest_name': user['full_name'],
+                'guest_phone': phone,
+                **{key: float(value) for key, value in totals.items()},
+                'coupon_code': coupon_code,
+                'status': rng.choices(STATUSES, weights=STATUS_WEIGHTS)[0],
+                'created_at': str(created.replace(microsecond=0)),
+            }
+
+            city, state, pin_prefix = rng.choices(CITIES, weights=CITY_WEIGHTS)[0]
+            address = {
+                'order_id': order_id,
+                'full_name': user['full_name'],
+                'phone': phone,
+                'address_line1': f"{rng.randint(1, 999)}, {rng.choice(STREETS)}",
+                'address_line2': f"Flat {rng.randint(1, 40)}{rng.choice('ABCD')}" if rng.random() < 0.4 else '',
+                'city': city,
+                'state': state,
+                'pincode': f"{pin_prefix}{rng.randrange(1000):03d}",
+                'landmark': rng.choice(LANDMARKS),
+            }
+            yield order, items, address
+
+
+def chunked(iterable, size=BATCH_SIZE):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# === LOADERS ===
+
+def load_sqlite(db_path, dataset):
+    """Create a fresh database from schema.sql and bulk-insert the dataset."""
+    conn = sqlite3.connect(db_path)
+    with open('schema.sql') as f:
+        conn.executescript(f.read())
+    conn.execute('PRAGMA journal_mode = OFF')
+    conn.execute('PRAGMA synchronous = OFF')
+
+    def insert(table, fields, rows):
+        sql = f"INSERT INTO {table} ({', '.join(fields)}) VALUES ({', '.join('?' * len(fields))})"
+        count = 0
+        for chunk in chunked(rows):
+            conn.executemany(sql, [tuple(row[f] for f in fields) for row in chunk])
+            count += len(chunk)
+        conn.commit()
+        return count
+
+    counts = {
+        'books': insert('books', BOOK_FIELDS, dataset.books()),
+        'users': insert('users', USER_FIELDS, dataset.users()),
+    }
+
+    orders, items, addresses = [], [], []
+    counts.update(orders=0, order_items=0, delivery_addresses=0)
+    for chunk in chunked(dataset.orders()):
+        for order, order_items, address in chunk:
+            orders.append(order)
+            items.extend(order_items)
+            addresses.append(address)
+        counts['orders'] += insert('orders', ORDER_FIELDS, orders)
+        counts['order_items'] += insert('order_items', ORDER_ITEM_FIELDS, items)
+        counts['delivery_addresses'] += insert('delivery_addresses', ADDRESS_FIELDS, addresses)
+        orders, items, addresses = [], [], []
+
+    conn.execute('ANALYZE')
+    conn.close()
+    return counts
+
+
+def load_dynamodb(dynamodb, dataset):
+    """Write the dataset through batch writers (tables must already exist)."""
+    from batch_migrate import convert_float_to_decimal
+
+    def without_empty(item):
+        return {k: v for k, v in item.items() if v is not None and v != ''}
+
+    def write(table_name, rows):
+        count = 0
+        with dynamodb.Table(table_name).batch_writer() as batch:
+            for row in rows:
+                batch.put_item(Item=convert_float_to_decimal(row))
+                count += 1
+        return count
+
+    counts = {
+        'books': write('Books', (without_empty(book) for book in dataset.books())),
+        'users': write('Users', dataset.users()),
+    }
+
+    counts.update(orders=0, order_items=0, delivery_addresses=0)
+    orders, items, addresses = (dynamodb.Table(name).batch_writer() for name in ('Orders', 'OrderItems', 'DeliveryAddresses'))
+    with orders, items, addresses:
+        for order, order_items, address in dataset.orders():
+            orders.put_item(Item=convert_float_to_decimal(order))
+            for item in order_items:
+                items.put_item(Item=convert_float_to_decimal(item))
+            addresses.put_item(Item=address)
+            counts['orders'] += 1
+            counts['order_items'] += len(order_items)
+            counts['delivery_addresses'] += 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--csv', default='data/books.csv', help='real catalog to draw distributions from')
+    parser.add_argument('--books', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--orders', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--sqlite', metavar='PATH', help='write a fresh SQLite database here')
+    parser.add_argument('--dynamodb', action='store_true', help='write to the DynamoDB tables')
+    args = parser.parse_args()
+
+    if not args.sqlite and not args.dynamodb:
+        parser.error('choose a target: --sqlite PATH and/or --dynamodb')
+    if args.sqlite and os.path.exists(args.sqlite):
+        parser.error(f"{args.sqlite} already exists; pick a new path")
+    if args.books < 1 or args.users < 1:
+        parser.error('--books and --users must be at least 1')
+
+    dataset = SyntheticDataset(CatalogProfile(args.csv), args.books, args.users, args.orders, args.seed)
+    print(f"🧪 Generating {args.books} books, {args.users} users, {args.orders} orders (seed {args.seed})")
+
+    if args.sqlite:
+        if os.path.dirname(args.sqlite):
+            os.makedirs(os.path.dirname(args.sqlite), exist_ok=True)
+        start = time.perf_counter()
+        counts = load_sqlite(args.sqlite, dataset)
+        print(f"✅ SQLite {args.sqlite}: {counts} in {time.perf_counter() - start:.1f}s")
+
+    if args.dynamodb:
+        from batch_migrate import get_dynamodb_resource
+
+        start = time.perf_counter()
+        counts = load_dynamodb(get_dynamodb_resource(), dataset)
+        print(f"✅ DynamoDB: {counts} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""
+Gunicorn settings for multi-process deployments.
+The app is imported once in the master (preload_app), and the catalog snapshot
+is memory-mapped and indexed there before any worker forks. The file's pages
+sit in the OS page cache, shared by every worker, as is each file a worker
+swaps to later, bitmap index sort orders included; a swap only copies the
+file's bitmaps into each worker (see utils/catalog_snapshot.py).
+gc.freeze() moves everything allocated so far out of the garbage collector's
+reach; otherwise each worker's first collection would write to (and so copy)
+every shared object's page.
+Building the snapshot in the master resolves the app's boto3 clients there;
+post_fork() drops them so no two workers share a client or its connections.
+
+Usage: CATALOG_SNAPSHOT=instance/catalog.snapshot gunicorn app_aws:app
+"""
+import gc
+import multiprocessing
+import os
+
+from utils.lazy import reset_all
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+threads = int(os.environ.get('GUNICORN_THREADS', '12'))  # Above utils/admission.py's browse + admin limits
+preload_app = True
+
+
+def when_ready(server):
+    """Master, app loaded, no workers yet: build or load the shared catalog snapshot."""
+    catalog = server.app.wsgi().extensions.get('catalog_snapshot')
+    if catalog is not None and catalog.enabled:
+        catalog.preload()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """Worker, just forked: build its own AWS clients instead of using the master's."""
+    reset_all()
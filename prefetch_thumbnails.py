@@ -0,0 +1,66 @@
+"""
+Bulk thumbnail prefetch.
+Downloads every book's cover once and writes the resized WebP/JPEG variants
+into the thumbnail cache, so /img/<isbn13>/<size> never waits on Google Books.
+
+Usage:
+    python prefetch_thumbnails.py                 # books from instance/bookstore.db
+    python prefetch_thumbnails.py --dynamodb      # books from the DynamoDB Books table
+    python prefetch_thumbnails.py --sizes sm md --workers 16 --limit 500
+"""
+import argparse
+import os
+import sqlite3
+import time
+
+from utils.thumbnails import ThumbnailCache, SIZES, FORMATS
+
+SQLITE_DB_PATH = os.path.join('instance', 'bookstore.db')
+DEFAULT_CACHE_DIR = os.path.join('instance', 'thumbnails')
+
+
+def books_from_sqlite(db_path):
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT isbn13, thumbnail FROM books WHERE thumbnail LIKE 'http%'").fetchall()
+    conn.close()
+    return rows
+
+
+def books_from_dynamodb():
+    import boto3
+
+    table = boto3.resource('dynamodb', region_name=os.getenv('AWS_DEFAULT_REGION', 'us-east-1')).Table('Books')
+    kwargs = {'ProjectionExpression': 'isbn13, thumbnail'}
+    books = []
+    while True:
+        response = table.scan(**kwargs)
+        books.extend(
+            (item['isbn13'], item['thumbnail']) for item in response.get('Items', [])
+            if str(item.get('thumbnail', '')).startswith('http')
+        )
+        if 'LastEvaluatedKey' not in response:
+            return books
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Prefetch and resize book cover thumbnails.')
+    parser.add_argument('--dynamodb', action='store_true', help='read books from DynamoDB instead of SQLite')
+    parser.add_argument('--db', default=SQLITE_DB_PATH, help='SQLite database path')
+    parser.add_argument('--cache-dir', default=os.environ.get('THUMBNAIL_CACHE_DIR') or DEFAULT_CACHE_DIR)
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=list(SIZES))
+    parser.add_argument('--formats', nargs='+', choices=list(FORMATS), default=list(FORMATS))
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--limit', type=int, help='only the first N books')
+    args = parser.parse_args()
+
+    books = books_from_dynamodb() if args.dynamodb else books_from_sqlite(args.db)
+    if args.limit:
+        books = books[:args.limit]
+
+    print(f"Prefetching {len(books)} covers ({', '.join(args.sizes)} x {', '.join(args.formats)}) into {args.cache_dir}...")
+    start = time.time()
+    ready, unavailable = ThumbnailCache(args.cache_dir).prefetch(
+        books, sizes=args.sizes, formats=args.formats, workers=args.workers
+    )
+    print(f"✅ {ready} ready, {unavailable} unavailable in {time.time() - start:.1f}s")
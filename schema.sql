@@ -34,7 +34,6 @@ CREATE TABLE IF NOT EXISTS users (
 -- Create indexes for faster lookups
 CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
-CREATE INDEX IF NOT EXISTS idx_admins_username ON admins(username);
 
 
 CREATE INDEX idx_books_isbn13 ON books(isbn13);
@@ -64,6 +63,7 @@ CREATE TABLE admins (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     last_login TIMESTAMP
 );
+CREATE INDEX IF NOT EXISTS idx_admins_username ON admins(username);
 
 -- Checkout System Tables
 CREATE TABLE IF NOT EXISTS orders (
@@ -110,3 +110,25 @@ CREATE TABLE IF NOT EXISTS delivery_addresses (
     landmark TEXT,
     FOREIGN KEY (order_id) REFERENCES orders(order_id)
 );
+
+-- Server-side carts (the session cookie only carries cart_id)
+CREATE TABLE IF NOT EXISTS carts (
+    cart_id TEXT PRIMARY KEY,
+    coupon TEXT,
+    updated_at INTEGER DEFAULT 0,
+    expires_at INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS cart_items (
+    cart_id TEXT NOT NULL,
+    isbn13 TEXT NOT NULL,
+    title TEXT,
+    price REAL,
+    image TEXT,
+    quantity INTEGER NOT NULL,
+    updated_at INTEGER NOT NULL,
+    expires_at INTEGER NOT NULL,
+    PRIMARY KEY (cart_id, isbn13)
+);
+
+CREATE INDEX IF NOT EXISTS idx_cart_items_expires ON cart_items(expires_at);
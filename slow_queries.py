@@ -0,0 +1,75 @@
+"""
+Slow SQLite query report.
+Aggregates the slow-query log written by app.py (see utils/query_log.py) by
+normalized statement and prints the top offenders with their query plans,
+full-table-scan / temp B-tree warnings and the endpoints that ran them.
+
+Usage:
+    python slow_queries.py                                   # instance/slow_queries.jsonl, top 10 by total time
+    python slow_queries.py --sort max --top 5
+    python slow_queries.py --log /tmp/slow.jsonl --endpoint api_books
+"""
+import argparse
+import json
+import os
+from collections import Counter
+
+SORT_KEYS = {'total': 'total_ms', 'count': 'count', 'max': 'max_ms', 'mean': 'mean_ms'}
+
+
+def load(path, endpoint=None):
+    statements = {}
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # Partially written line
+            if endpoint and record.get('endpoint') != endpoint:
+                continue
+            entry = statements.setdefault(record['sql'], {
+                'sql': record['sql'], 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                'plan': record.get('plan', []), 'warnings': record.get('warnings', []),
+                'endpoints': Counter()
+            })
+            entry['count'] += 1
+            entry['total_ms'] += record['ms']
+            entry['max_ms'] = max(entry['max_ms'], record['ms'])
+            entry['endpoints'][record.get('endpoint') or '(no request)'] += 1
+
+    for entry in statements.values():
+        entry['mean_ms'] = entry['total_ms'] / entry['count']
+    return list(statements.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--log', default=os.environ.get('SLOW_QUERY_LOG', 'instance/slow_queries.jsonl'))
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--sort', choices=sorted(SORT_KEYS), default='total')
+    parser.add_argument('--endpoint', help='only statements run by this Flask endpoint')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.log):
+        print(f"No slow-query log at {args.log} (run app.py and exceed SLOW_QUERY_MS first)")
+        return
+
+    statements = load(args.log, args.endpoint)
+    statements.sort(key=lambda entry: entry[SORT_KEYS[args.sort]], reverse=True)
+    print(f"🐢 {len(statements)} slow statements in {args.log}, top {args.top} by {args.sort}\n")
+
+    for rank, entry in enumerate(statements[:args.top], 1):
+        print(f"{rank:>2}. {entry['count']}x  total {entry['total_ms']:.1f} ms  "
+              f"mean {entry['mean_ms']:.1f} ms  max {entry['max_ms']:.1f} ms")
+        print(f"    {entry['sql']}")
+        endpoints = ', '.join(f"{name} ({count})" for name, count in entry['endpoints'].most_common())
+        print(f"    endpoints: {endpoints}")
+        for line in entry['plan']:
+            print(f"      {line}")
+        for warning in entry['warnings']:
+            print(f"    ⚠️  {warning}")
+        print()
+
+
+if __name__ == '__main__':
+    main()
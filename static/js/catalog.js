@@ -15,6 +15,8 @@ document.addEventListener('DOMContentLoaded', function () {
     const categorySelect = document.getElementById('categorySelect');
     const authorInput = document.getElementById('authorInput');
     const stockCheck = document.getElementById('stockCheck');
+    const stockCount = document.getElementById('stockCount');
+    const priceFacets = document.getElementById('priceFacets');
     const sortSelect = document.getElementById('sortSelect');
     const applyBtn = document.getElementById('applyFiltersBtn');
     const clearFiltersBtn = document.getElementById('clearFiltersBtn');
@@ -91,34 +93,48 @@ document.addEventListener('DOMContentLoaded', function () {
 
         updateViewToggle(currentState.view);
 
-        // Fetch Data
-        fetchCategories();
-        fetchBooks();
-        fetchFeatured();
+        // Fetch Data: categories, the default first page and the featured list in one request
+        fetchBootstrap();
     }
 
     // --- Data Fetching ---
 
-    async function fetchCategories() {
-        // Get categories from the select element that was populated by Flask template
-        // If no options exist, add some defaults
-        if (categorySelect.options.length <= 1) {
-            const defaultCategories = [
-                'Fiction', 'Non-Fiction', 'Science Fiction', 'Fantasy',
-                'Romance', 'Mystery', 'Thriller', 'Biography',
-                'History', 'Children\'s', 'Academic', 'Science'
-            ];
-
-            defaultCategories.forEach(cat => {
-                const option = document.createElement('option');
-                option.value = cat;
-                option.textContent = cat;
-                categorySelect.appendChild(option);
-            });
+    function isDefaultView() {
+        return !currentState.q && currentState.category === 'All' && !currentState.author &&
+            !currentState.in_stock && currentState.price_max === 2000 &&
+            currentState.sort === 'rating' && currentState.page === 1;
+    }
+
+    async function fetchBootstrap() {
+        // A URL with filters still needs its own page; the rest comes from the bootstrap
+        const defaultView = isDefaultView();
+        if (defaultView) {
+            showLoader();
+            updateURL();
+            renderActiveFilters();
+        } else {
+            fetchBooks();
         }
 
-        // Set current selection
-        categorySelect.value = currentState.category;
+        try {
+            const response = await fetch('/api/catalog/bootstrap');
+            if (!response.ok) throw new Error('Network response was not ok');
+            const data = await response.json();
+
+            renderFeatured(data.featured);
+            // Otherwise fetchBooks() asked for facets, whose category counts match the filters
+            if (defaultView) {
+                renderCategories(data.categories);
+                renderPage(data.books);
+                hideLoader();
+            }
+        } catch (error) {
+            console.error('Error:', error);
+            if (sidebarFeatured) {
+                sidebarFeatured.innerHTML = '<small class="text-muted">Could not load featured books.</small>';
+            }
+            if (defaultView) fetchBooks();
+        }
     }
 
     async function fetchBooks() {
@@ -133,26 +149,16 @@ document.addEventListener('DOMContentLoaded', function () {
             author: currentState.author,
             in_stock: currentState.in_stock,
             sort: currentState.sort,
-            page: currentState.page
+            page: currentState.page,
+            facets: true
         });
 
         try {
             const response = await fetch(`/api/books?${params}`);
             if (!response.ok) throw new Error('Network response was not ok');
             const data = await response.json();
-
-            // Update UI
-            if (totalBooksHeader) {
-                totalBooksHeader.textContent = data.total;
-            }
-
-            const startNum = (data.page - 1) * data.per_page + 1;
-            const endNum = Math.min(data.page * data.per_page, data.total);
-            resultsCount.textContent = `Showing ${startNum}-${endNum} of ${data.total} books`;
-
-            renderBooks(data.books);
-            renderPagination(data.page, data.pages);
-
+            renderPage(data);
+            if (data.facets) renderFacets(data.facets);
         } catch (error) {
             console.error('Error:', error);
             bookContainer.innerHTML = '<div class="col-12 text-center text-danger py-5">Failed to load books. Please try again later.</div>';
@@ -161,43 +167,75 @@ document.addEventListener('DOMContentLoaded', function () {
         }
     }
 
-    async function fetchFeatured() {
-        try {
-            const response = await fetch(`/api/books?sort=rating&page=1`);
-            const data = await response.json();
-            const top3 = data.books.slice(0, 3);
+    // --- Rendering ---
 
-            if (sidebarFeatured) {
-                sidebarFeatured.innerHTML = top3.map(book => `
-                    <div class="d-flex align-items-center gap-3 mb-3">
-                        <img src="${book.image}" 
-                             alt="${book.title}" 
-                             class="rounded shadow-sm" 
-                             style="width: 45px; height: 60px; object-fit: cover;"
-                             onerror="this.src='/static/images/book-placeholder.jpg'">
-                        <div style="flex: 1; min-width: 0;">
-                            <a href="/book/${book.isbn}" 
-                               class="text-decoration-none text-dark fw-bold small d-block text-truncate" 
-                               title="${book.title}">
-                                ${book.title}
-                            </a>
-                            <div class="text-warning" style="font-size: 0.7rem;">
-                                ${renderStars(book.rating)}
-                            </div>
-                            <span class="text-primary fw-bold small">₹${book.price}</span>
-                        </div>
-                    </div>
-                `).join('');
-            }
-        } catch (e) {
-            console.error('Failed to load featured books:', e);
-            if (sidebarFeatured) {
-                sidebarFeatured.innerHTML = '<small class="text-muted">Could not load featured books.</small>';
+    function renderPage(data) {
+        if (totalBooksHeader) {
+            totalBooksHeader.textContent = data.total;
+        }
+
+        const startNum = (data.page - 1) * data.per_page + 1;
+        const endNum = Math.min(data.page * data.per_page, data.total);
+        resultsCount.textContent = `Showing ${startNum}-${endNum} of ${data.total} books`;
+
+        renderBooks(data.books);
+        renderPagination(data.page, data.pages);
+    }
+
+    function renderCategories(categories) {
+        // Options come from the Flask template; add counts (and any category it lacks)
+        categories.forEach(cat => {
+            let option = Array.from(categorySelect.options).find(o => o.value === cat.name);
+            if (!option) {
+                option = document.createElement('option');
+                option.value = cat.name;
+                categorySelect.appendChild(option);
             }
+            option.textContent = `${cat.name} (${cat.count})`;
+        });
+
+        // Set current selection
+        categorySelect.value = currentState.category;
+    }
+
+    function renderFacets(facets) {
+        // Counts for the current filters, each facet ignoring its own filter
+        renderCategories(facets.category);
+        if (stockCount) stockCount.textContent = `(${facets.in_stock})`;
+        if (priceFacets) {
+            priceFacets.innerHTML = facets.price.filter(bucket => bucket.count).map(bucket => `
+                <div class="d-flex justify-content-between">
+                    <span>${bucket.max === null ? `₹${bucket.min}+` : `₹${bucket.min}–${bucket.max}`}</span>
+                    <span>${bucket.count}</span>
+                </div>
+            `).join('');
         }
     }
 
-    // --- Rendering ---
+    function renderFeatured(books) {
+        if (!sidebarFeatured) return;
+
+        sidebarFeatured.innerHTML = books.map(book => `
+            <div class="d-flex align-items-center gap-3 mb-3">
+                <img src="${book.image}" 
+                     alt="${book.title}" 
+                     class="rounded shadow-sm" 
+                     style="width: 45px; height: 60px; object-fit: cover;"
+                     onerror="this.src='/static/images/book-placeholder.jpg'">
+                <div style="flex: 1; min-width: 0;">
+                    <a href="/book/${book.isbn}" 
+                       class="text-decoration-none text-dark fw-bold small d-block text-truncate" 
+                       title="${book.title}">
+                        ${book.title}
+                    </a>
+                    <div class="text-warning" style="font-size: 0.7rem;">
+                        ${renderStars(book.rating)}
+                    </div>
+                    <span class="text-primary fw-bold small">₹${book.price}</span>
+                </div>
+            </div>
+        `).join('');
+    }
 
     function renderBooks(books) {
         if (!books || books.length === 0) {
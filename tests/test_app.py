@@ -0,0 +1,149 @@
+import pytest
+import json
+import sqlite3
+import time
+
+# isbn13, title, authors, categories, price, stock, average_rating, ratings_count, created_at
+BOOKS = [
+    ('9780000000001', 'Alpha', 'Ann Author', 'Fiction', 350, 5, 4.6, 120, '2024-01-10 09:00:00'),
+    ('9780000000002', 'Bravo', 'Bob Writer', 'Fiction', 600, 0, 3.2, 40, '2024-02-10 09:00:00'),
+    ('9780000000003', 'Charlie', 'Ann Author', 'History', 450, 2, 4.1, 80, '2024-03-10 09:00:00'),
+    ('9780000000004', 'Delta', 'Dee Scribe', 'History', 1200, 1, None, 0, '2024-04-10 09:00:00'),
+]
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Flask test client for app.py over a fresh SQLite database built from schema.sql."""
+    from app import app, book_fragments, query_log
+
+    path = str(tmp_path / 'bookstore.db')
+    db = sqlite3.connect(path)
+    with open('schema.sql') as f:
+        db.executescript(f.read())
+    db.executemany(
+        '''INSERT INTO books (isbn13, title, authors, categories, price, stock, average_rating, ratings_count,
+                              created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+        BOOKS
+    )
+    db.commit()
+    db.close()
+
+    monkeypatch.setitem(app.config, 'TESTING', True)
+    monkeypatch.setitem(app.config, 'DATABASE_PATH', path)
+    monkeypatch.setattr(query_log, 'path', str(tmp_path / 'slow_queries.jsonl'))
+    book_fragments.invalidate()  # Fresh database: catalog caches kept by the module are out of date
+
+    with app.test_client() as client:
+        yield client
+
+
+def test_sqlite_cart_store(client):
+    """Cart lines live in SQLite: badge counts come from COUNT queries, expired lines drop out."""
+    from app import app, cart_store
+
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+    assert client.post('/api/cart/add', json={'isbn13': '9780000000001'}).get_json()['cart_count'] == 1
+    assert client.post('/api/cart/add', json={'isbn13': '9780000000001', 'quantity': 2}).get_json()['cart_count'] == 1
+    assert client.post('/api/cart/add', json={'isbn13': '9780000000003'}).get_json()['cart_count'] == 2
+    assert client.post('/api/cart/apply-coupon', json={'code': 'book20'}).get_json()['success']
+
+    with client.session_transaction() as sess:
+        cart_id = sess['cart_id']
+    with app.app_context():
+        cart = cart_store.load(cart_id)
+        assert [(i['isbn13'], i['quantity'], i['price']) for i in cart.items] == [
+            ('9780000000001', 3, 350), ('9780000000003', 1, 450)
+        ]
+        assert cart.coupon['code'] == 'BOOK20' and cart_store.count(cart_id) == 2
+
+        # Expired lines are neither counted nor loaded
+        db = cart_store.get_connection()
+        db.execute('UPDATE cart_items SET expires_at = ? WHERE isbn13 = ?', (int(time.time()) - 1, '9780000000003'))
+        db.commit()
+        assert cart_store.count(cart_id) == 1
+        assert [i['isbn13'] for i in cart_store.load(cart_id).items] == ['9780000000001']
+
+    assert client.post('/api/cart/remove', json={'isbn13': '9780000000001'}).get_json()['cart_count'] == 0
+    with app.app_context():
+        assert cart_store.load(cart_id).coupon is None  # Dropped with the last line
+
+
+def test_books_facet_counts(client):
+    """/api/books?facets=true counts each facet from one grouped query, every other filter applied."""
+    data = client.get('/api/books?facets=true&in_stock=true&price_max=1000').get_json()
+    assert [b['title'] for b in data['books']] == ['Alpha', 'Charlie']
+
+    facets = data['facets']
+    categories = {c['name']: c['count'] for c in facets['category']}
+    assert (categories['Fiction'], categories['History']) == (1, 1)
+    assert facets['in_stock'] == 2  # Stock facet ignores the stock filter (Bravo has none), not the price
+    assert [p['count'] for p in facets['price']] == [1, 1, 0, 0, 1]  # Price facet ignores the price ceiling
+
+    data = client.get('/api/books?facets=true&category=History&author=ann').get_json()
+    assert [b['title'] for b in data['books']] == ['Charlie']
+    categories = {c['name']: c['count'] for c in data['facets']['category']}
+    assert (categories['Fiction'], categories['History']) == (1, 1)  # Author scopes every facet
+
+
+def test_catalog_bootstrap(client):
+    """/api/catalog/bootstrap has category counts, the default first page and the featured books."""
+    data = client.get('/api/catalog/bootstrap').get_json()
+
+    categories = {c['name']: c['count'] for c in data['categories']}
+    assert (categories['Fiction'], categories['History']) == (2, 2)
+    assert data['books']['total'] == 4
+    assert [b['title'] for b in data['books']['books']] == ['Alpha', 'Charlie', 'Bravo', 'Delta']
+    assert data['books'] == client.get('/api/books').get_json()  # Same page as the catalog's first request
+    assert data['featured'] == data['books']['books'][:len(data['featured'])]
+
+
+def test_slow_query_log(client, monkeypatch):
+    """Statements over SLOW_QUERY_MS are logged with their plan and ranked at /admin/slow-queries."""
+    from app import query_log
+
+    monkeypatch.setattr(query_log, 'threshold_ms', 0)
+    client.get('/api/books?q=alpha')
+
+    with open(query_log.path) as f:
+        logged = [json.loads(line) for line in f]
+    listing = next(r for r in logged if r['sql'].startswith('SELECT * FROM books WHERE ?=? AND (LOWER(title) LIKE ?'))
+    assert listing['endpoint'] == 'get_books'
+    assert listing['plan'] and any('temp b-tree' in warning for warning in listing['warnings'])
+
+    assert client.get('/admin/slow-queries').status_code == 302
+    with client.session_transaction() as sess:
+        sess['admin_id'] = 1
+    statements = client.get('/admin/slow-queries?sort=slow&n=1000').get_json()['statements']
+    top = {s['sql']: s for s in statements}[listing['sql']]
+    assert top['count'] >= 1 and top['slow'] >= 1 and top['plan']
+
+
+def test_streaming_exports(client):
+    """sqlite_rows streams the catalog and orders in id order, optionally since a date."""
+    import csv
+    import io
+
+    with client.session_transaction() as sess:
+        sess['admin_id'] = 1
+    with client.get('/admin/export/books') as response:
+        assert [json.loads(line)['title'] for line in response.data.splitlines()] == [b[1] for b in BOOKS]
+    with client.get('/admin/export/books?since=2024-03-01') as response:
+        assert [json.loads(line)['title'] for line in response.data.splitlines()] == ['Charlie', 'Delta']
+
+    from app import app
+    db = sqlite3.connect(app.config['DATABASE_PATH'])
+    for order_id, created_at in (('ORD-OLD', '2023-12-31 23:00:00'), ('ORD-NEW', '2024-06-01 10:00:00')):
+        db.execute('INSERT INTO orders (order_id, subtotal, tax, total, created_at) VALUES (?, 10, 0, 10, ?)',
+                   (order_id, created_at))
+        db.execute('''INSERT INTO order_items (order_id, isbn13, title, price, quantity, subtotal)
+                      VALUES (?, '9780000000001', 'Alpha', 10, 1, 10)''', (order_id,))
+    db.commit()
+    db.close()
+
+    with client.get('/admin/export/orders?format=csv&since=2024-01-01T00:00:00Z') as response:
+        rows = list(csv.DictReader(io.StringIO(response.data.decode())))
+    assert [(row['order_id'], row['total']) for row in rows] == [('ORD-NEW', '10.0')]
+    with client.get('/admin/export/order_items') as response:
+        assert [json.loads(line)['order_id'] for line in response.data.splitlines()] == ['ORD-OLD', 'ORD-NEW']
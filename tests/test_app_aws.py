@@ -1,6 +1,7 @@
 import pytest
 import boto3
 import os
+from decimal import Decimal
 from moto import mock_aws
 
 # Set dummy AWS credentials for moto
@@ -75,6 +76,20 @@ def client(mock_aws_services):
                 AttributeDefinitions=[{'AttributeName': 'order_id', 'AttributeType': 'S'}],
                 ProvisionedThroughput={'ReadCapacityUnits': 5, 'WriteCapacityUnits': 5}
             )
+            
+            # Carts Table
+            dynamodb.create_table(
+                TableName='Carts',
+                KeySchema=[
+                    {'AttributeName': 'cart_id', 'KeyType': 'HASH'},
+                    {'AttributeName': 'isbn13', 'KeyType': 'RANGE'}
+                ],
+                AttributeDefinitions=[
+                    {'AttributeName': 'cart_id', 'AttributeType': 'S'},
+                    {'AttributeName': 'isbn13', 'AttributeType': 'S'}
+                ],
+                ProvisionedThroughput={'ReadCapacityUnits': 5, 'WriteCapacityUnits': 5}
+            )
 
             # Setup SNS
             sns = boto3.client('sns', region_name='us-east-1')
@@ -91,6 +106,10 @@ def client(mock_aws_services):
                 'thumbnail': 'test.jpg' 
             })
             
+            # Fresh tables: catalog caches kept by the module from earlier tests are out of date
+            from app_aws import book_fragments
+            book_fragments.invalidate()
+            
             yield client
 
 def test_index(client):
@@ -99,6 +118,14 @@ def test_index(client):
     assert response.status_code == 200
     assert b'Featured Books' in response.data
 
+def test_templates_preloaded_at_startup(client):
+    """Every template is compiled at import time, before the first request."""
+    from app_aws import app
+    
+    report = app.extensions['template_preload']
+    assert report['templates'] == len(app.jinja_env.list_templates())
+    assert 'catalog.html' in {key[1] for key in app.jinja_env.cache.keys()}
+
 def test_catalog_and_search(client):
     """Test catalog and search functionality."""
     # Test Catalog
@@ -111,6 +138,26 @@ def test_catalog_and_search(client):
     data = response.get_json()
     assert len(data['books']) > 0
     assert data['books'][0]['title'] == 'Test Book'
+    assert data['books'][0]['price'] == 29.99
+    assert data['books'][0]['stock'] == 10
+    assert set(data['books'][0]) == {
+        'image', 'title', 'isbn', 'rating', 'price', 'stock', 'category', 'ratings_count', 'author'
+    }
+
+def test_product_details_filtered_scan(client):
+    """get_item and filtered scans decode low-level items straight to books."""
+    books = boto3.resource('dynamodb', region_name='us-east-1').Table('Books')
+    books.put_item(Item={
+        'isbn13': '978-0000000002', 'title': 'Related Book', 'categories': 'Fiction',
+        'price': 15, 'stock': 2, 'average_rating': Decimal('4.5')
+    })
+    
+    response = client.get('/book/978-0123456789')
+    assert response.status_code == 200
+    assert b'Test Book' in response.data
+    assert b'Related Book' in response.data
+    
+    assert client.get('/book/978-9999999999').status_code == 404
 
 def test_contact_form_sns(client):
     """Test contact form submission and SNS notification."""
@@ -131,13 +178,10 @@ def test_checkout_flow_and_sns(client):
     """Test adding to cart and placing an order."""
     # 1. Add to Cart
     with client.session_transaction() as sess:
-        sess['cart'] = [{
-            'isbn13': '978-0123456789',
-            'title': 'Test Book',
-            'price': 29.99,
-            'quantity': 1,
-            'image': 'test.jpg'
-        }]
+        sess['user_id'] = 1
+    
+    response = client.post('/api/cart/add', json={'isbn13': '978-0123456789', 'quantity': 1})
+    assert response.get_json()['cart_count'] == 1
     
     # 2. Place Order
     order_data = {
@@ -172,3 +216,682 @@ def test_checkout_flow_and_sns(client):
     books = dynamodb.Table('Books')
     book = books.get_item(Key={'isbn13': '978-0123456789'}).get('Item')
     assert int(book['stock']) == 9  # 10 - 1
+
+def test_cart_is_stored_server_side(client):
+    """The session only carries a cart ID; lines are single rows in the Carts table."""
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+    
+    client.post('/api/cart/add', json={'isbn13': '978-0123456789', 'quantity': 1})
+    client.post('/api/cart/add', json={'isbn13': '978-0123456789', 'quantity': 2})
+    client.post('/api/cart/apply-coupon', json={'code': 'BOOK20'})
+    
+    with client.session_transaction() as sess:
+        assert 'cart' not in sess
+        cart_id = sess['cart_id']
+        assert sess['cart_count'] == 1
+    
+    carts = boto3.resource('dynamodb', region_name='us-east-1').Table('Carts')
+    line = carts.get_item(Key={'cart_id': cart_id, 'isbn13': '978-0123456789'})['Item']
+    assert int(line['quantity']) == 3
+    from app_aws import cart_store
+    assert cart_store.count(cart_id) == 1  # The coupon row isn't a line
+    
+    response = client.get('/cart')
+    assert response.status_code == 200
+    assert b'BOOK20' in response.data
+    
+    response = client.post('/api/cart/remove', json={'isbn13': '978-0123456789'})
+    assert response.get_json()['cart_count'] == 0
+    assert 'Item' not in carts.get_item(Key={'cart_id': cart_id, 'isbn13': '#meta'})
+    
+    # The badge count follows the store, not the session's own tally
+    client.post('/api/cart/add', json={'isbn13': '978-0123456789', 'quantity': 1})
+    carts.delete_item(Key={'cart_id': cart_id, 'isbn13': '978-0123456789'})
+    from flask import g
+    g.pop('cart', None)  # The fixture's app context outlives requests
+    client.get('/cart')
+    with client.session_transaction() as sess:
+        assert sess['cart_count'] == 0
+
+def test_order_totals_are_exact_decimals(client):
+    """Checkout reprices against the catalog and stores exact Decimal totals."""
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+    
+    client.post('/api/cart/add', json={'isbn13': '978-0123456789', 'quantity': 3})
+    
+    # Price changes after the book was added; the order must use the new price
+    books = boto3.resource('dynamodb', region_name='us-east-1').Table('Books')
+    books.update_item(
+        Key={'isbn13': '978-0123456789'},
+        UpdateExpression='SET price = :p',
+        ExpressionAttributeValues={':p': Decimal('10.10')}
+    )
+    
+    response = client.post('/checkout/place-order', json={
+        'full_name': 'Test User', 'email': 'test@example.com', 'phone': '9999999999',
+        'address1': '1 Main St', 'city': 'Pune', 'state': 'MH', 'pincode': '411001'
+    })
+    assert response.get_json()['success']
+    
+    orders = boto3.resource('dynamodb', region_name='us-east-1').Table('Orders')
+    order = orders.get_item(Key={'order_id': response.get_json()['order_id']})['Item']
+    assert order['subtotal'] == Decimal('30.30')
+    assert order['tax'] == Decimal('5.45')
+    assert order['total'] == Decimal('85.75')
+
+def test_reprice_uses_book_default_price(client):
+    """A book whose price is cleared reprices to the Book model's default, stored in one transaction."""
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+    
+    client.post('/api/cart/add', json={'isbn13': '978-0123456789', 'quantity': 1})
+    dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
+    dynamodb.Table('Books').update_item(
+        Key={'isbn13': '978-0123456789'},
+        UpdateExpression='SET price = :p',
+        ExpressionAttributeValues={':p': Decimal('0')}
+    )
+    
+    assert client.get('/checkout').status_code == 200
+    with client.session_transaction() as sess:
+        cart_id = sess['cart_id']
+    line = dynamodb.Table('Carts').get_item(Key={'cart_id': cart_id, 'isbn13': '978-0123456789'})['Item']
+    assert line['price'] == Decimal('399')
+
+def test_order_stock_refreshes_in_background(client):
+    """An order's stock change doesn't force a synchronous rescan: the listing refreshes behind a stale read."""
+    from app_aws import book_fragments
+    from utils.swr_cache import refresh_executor
+    
+    assert client.get('/api/books').get_json()['books'][0]['stock'] == 10
+    assert client.get('/api/books').get_json()['books'][0]['stock'] == 10
+    
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+    client.post('/api/cart/add', json={'isbn13': '978-0123456789', 'quantity': 3})
+    response = client.post('/checkout/place-order', json={
+        'full_name': 'Test User', 'email': 'test@example.com', 'phone': '9999999999',
+        'address1': '1 Main St', 'city': 'Pune', 'state': 'MH', 'pincode': '411001'
+    })
+    assert response.get_json()['success']
+    
+    version = book_fragments.catalog_version
+    assert client.get('/api/books').get_json()['books'][0]['stock'] == 10  # Served while the scan reruns
+    refresh_executor().submit(lambda: None).result()  # Wait out the queued refresh
+    assert client.get('/api/books').get_json()['books'][0]['stock'] == 7
+    assert book_fragments.catalog_version == version
+
+def test_book_fragments_follow_row_content(client):
+    """A fragment is reused only for the row it was rendered from, even without invalidate()."""
+    from utils.book import Book
+    from utils.book_fragments import BookFragmentCache
+    
+    cache = BookFragmentCache()
+    book = Book(isbn13='978-0123456789', title='Test Book', price=29.99, stock=10)
+    assert cache.fragments([book]) == cache.fragments([book])
+    assert cache.hits == 1
+    
+    # Another worker (or a direct DB write) sold a copy; this process never heard of it
+    book.stock = 9
+    assert b'"stock":9' in cache.fragments([book])[0]
+    assert cache.misses == 2
+    
+    # Bounded: the least recently used fragment goes first
+    cache.max_entries = 1
+    cache.fragments([Book(isbn13='978-0000000002', title='Other')])
+    cache.fragments([book])
+    assert cache.misses == 4
+
+def test_catalog_bootstrap_follows_catalog_cache(client):
+    """One document carries the catalog page's first load, rebuilt after writes or once its soft TTL passes."""
+    from app_aws import book_fragments, catalog_bootstrap, catalog_cache
+    from utils.swr_cache import refresh_executor
+    book_fragments.invalidate()
+    
+    data = client.get('/api/catalog/bootstrap').get_json()
+    assert data['books'] == client.get('/api/books').get_json()
+    assert {'count': 1, 'name': 'Fiction'} in data['categories']
+    assert [book['title'] for book in data['featured']] == ['Test Book']
+    
+    hits = catalog_bootstrap.hits
+    assert client.get('/api/catalog/bootstrap').get_json() == data
+    assert catalog_bootstrap.hits == hits + 1
+    
+    # Written behind this worker's back: the soft TTL bounds how long the document lags
+    books = boto3.resource('dynamodb', region_name='us-east-1').Table('Books')
+    books.update_item(Key={'isbn13': '978-0123456789'}, UpdateExpression='SET title = :t',
+                      ExpressionAttributeValues={':t': 'Renamed'})
+    catalog_cache.expire()
+    client.get('/api/books')  # Queues the scan's refresh
+    assert client.get('/api/catalog/bootstrap').get_json() == data  # Stale; its rebuild queues behind the scan
+    refresh_executor().submit(lambda: None).result()
+    assert client.get('/api/catalog/bootstrap').get_json()['featured'][0]['title'] == 'Renamed'
+    
+    with client.session_transaction() as sess:
+        sess['admin_id'] = 1
+    client.post('/admin/books/delete/978-0123456789')
+    data = client.get('/api/catalog/bootstrap').get_json()
+    assert data['books']['total'] == 0 and data['featured'] == []
+
+def test_streaming_exports(client):
+    """Admins stream the catalog and orders as NDJSON or gzipped CSV, optionally since a date."""
+    import csv
+    import gzip
+    import io
+    import json
+    
+    assert client.get('/admin/export/books').status_code == 302
+    with client.session_transaction() as sess:
+        sess['admin_id'] = 1
+    
+    # Streamed exports hold an admin admission slot until closed, as a WSGI server would
+    with client.get('/admin/export/books') as response:
+        assert response.mimetype == 'application/x-ndjson'
+        assert [json.loads(line)['title'] for line in response.data.splitlines()] == ['Test Book']
+    
+    dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
+    for order_id, created_at in (('ORD-OLD', '2023-12-31T23:00:00'), ('ORD-NEW', '2024-06-01T10:00:00')):
+        dynamodb.Table('Orders').put_item(Item={'order_id': order_id, 'total': 10, 'created_at': created_at})
+        dynamodb.Table('OrderItems').put_item(Item={'order_id': order_id, 'isbn13': '978-0123456789', 'quantity': 1})
+    
+    with client.get('/admin/export/orders?format=csv&since=2024-01-01',
+                    headers={'Accept-Encoding': 'gzip'}) as response:
+        assert response.headers['Content-Encoding'] == 'gzip'
+        rows = list(csv.DictReader(io.StringIO(gzip.decompress(response.data).decode())))
+    assert [(row['order_id'], row['total']) for row in rows] == [('ORD-NEW', '10.0')]
+    
+    with client.get('/admin/export/order_items?since=2024-01-01') as response:
+        assert [json.loads(line)['order_id'] for line in response.data.splitlines()] == ['ORD-NEW']
+    assert client.get('/admin/export/orders?since=soon').status_code == 400
+
+def test_concurrent_identical_reads_are_coalesced(client, monkeypatch):
+    """Identical /api/books requests in flight together share one scan."""
+    import threading
+    import time
+    import app_aws
+    
+    scans = []
+    real_scan = app_aws._scan_books
+    def slow_scan(*args):
+        scans.append(1)
+        time.sleep(0.3)
+        return real_scan(*args)
+    monkeypatch.setattr(app_aws, '_scan_books', slow_scan)
+    monkeypatch.setitem(app_aws.app.config, 'ADMISSION_CONTROL', False)  # Let all five in at once
+    
+    coalesced = app_aws.flights.coalesced['books_page']
+    results = []
+    def fetch():
+        with app_aws.app.test_client() as c:
+            results.append(c.get('/api/books?q=test&sort=az').get_json())
+    threads = [threading.Thread(target=fetch) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(scans) == 1
+    assert app_aws.flights.coalesced['books_page'] == coalesced + 4
+    assert all(r['books'][0]['title'] == 'Test Book' for r in results)
+
+def test_response_compression(client):
+    """HTML and JSON are gzip-encoded when accepted; repeat pages come from the cache."""
+    import gzip
+    from app_aws import compressor
+    
+    plain = client.get('/')
+    assert 'Content-Encoding' not in plain.headers
+    assert 'Accept-Encoding' in plain.headers['Vary']
+    
+    first = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    second = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert first.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(second.data) == plain.data
+    assert compressor.hits >= 1
+    
+    # Below COMPRESS_MIN_SIZE the body is sent as-is
+    small = client.get('/api/books?q=no-such-book', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in small.headers
+    assert small.get_json()['total'] == 0
+
+def test_metrics_endpoint(client):
+    """/metrics is admin-only and reports route latency, DynamoDB calls and cache stats."""
+    assert client.get('/metrics').status_code == 403
+    client.get('/api/books')
+
+    with client.session_transaction() as sess:
+        sess['admin_id'] = 1
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+
+    body = response.get_data(as_text=True)
+    assert 'bookstore_http_request_duration_seconds_count{endpoint="get_books",method="GET"}' in body
+    assert 'bookstore_http_responses_total{endpoint="metrics",method="GET",status="403"} 1' in body
+    assert 'bookstore_backend_calls_total{backend="dynamodb",operation="Scan"}' in body
+    assert 'bookstore_backend_calls_per_request_bucket{backend="dynamodb",le="+Inf"}' in body
+    assert 'bookstore_cache_hit_ratio{cache="book_fragments"}' in body
+
+def test_admission_control_sheds_browse_not_cart(client, monkeypatch):
+    """Browse spikes get 429/503 with Retry-After while cart routes keep being served."""
+    from app_aws import admission
+    from utils.admission import AdmissionClass
+    
+    browse = AdmissionClass('browse', ('get_books', 'search'), concurrency=1, queue=0, rate=1000, burst=1)
+    monkeypatch.setitem(admission.classes, 'browse', browse)
+    for endpoint in browse.endpoints:
+        monkeypatch.setitem(admission.by_endpoint, endpoint, browse)
+    
+    assert client.get('/api/books').status_code == 200
+    browse.bucket.rate = 0.001  # Burst spent and not refilling
+    response = client.get('/api/books')
+    assert response.status_code == 429 and response.headers['Retry-After']
+    
+    browse.bucket.tokens = browse.bucket.rate = 1000
+    browse.slots.acquire()  # A slow scan holds the only slot
+    try:
+        assert client.get('/api/books?q=test').status_code == 503
+        assert client.get('/cart').status_code == 200
+    finally:
+        browse.slots.release()
+    assert client.get('/api/books?q=test').status_code == 200
+    
+    with client.session_transaction() as sess:
+        sess['admin_id'] = 1
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'bookstore_admission_rejected_total{class="browse",reason="rate"} 1' in body
+    assert 'bookstore_admission_rejected_total{class="browse",reason="queue_full"} 1' in body
+    assert 'bookstore_admission_admitted_total{class="browse"} 2' in body
+    
+    # A streamed admin export keeps its slot until the stream is closed
+    admin = admission.classes['admin']
+    response = client.get('/admin/export/books')
+    assert b'Test Book' in response.get_data()
+    assert admin.in_flight == 1
+    assert client.get('/admin/books').status_code == 503
+    response.close()
+    assert admin.in_flight == 0
+    assert client.get('/admin/books').status_code == 200
+
+def test_dynamodb_capacity_accounting(client, monkeypatch):
+    """Consumed units, pages and scanned/returned items are attributed to the route and table."""
+    from app_aws import app
+    monkeypatch.setitem(app.config, 'DYNAMODB_CAPACITY_HEADER', True)
+    
+    response = client.get('/api/books')
+    header = response.headers['X-DynamoDB-Capacity']
+    assert 'pages=1' in header and 'scanned=1' in header and 'rcu=0;' not in header
+    
+    assert client.get('/admin/capacity').status_code == 302
+    with client.session_transaction() as sess:
+        sess['admin_id'] = 1
+    report = client.get('/admin/capacity').get_json()['endpoints']
+    books = next(e for e in report if e['endpoint'] == 'get_books')
+    assert books['tables']['Books']['pages'] >= 1
+    assert books['scanned'] >= books['returned'] >= 1
+    assert books['read_units'] > 0 and books['units_per_request'] > 0
+
+def test_catalog_snapshot_shared_across_workers(client, tmp_path, monkeypatch):
+    """With CATALOG_SNAPSHOT, listings come from the snapshot file and follow it when another worker republishes."""
+    import mmap
+    import os
+    from app_aws import catalog_snapshot
+    from utils.book import Book
+    from utils.catalog_snapshot import CatalogSnapshot
+    
+    path = str(tmp_path / 'catalog.snapshot')
+    for name, value in (('path', path), ('snapshot', None), ('_identity', None), ('_next_check', 0.0)):
+        monkeypatch.setattr(catalog_snapshot, name, value)
+    with open(path, 'wb') as f:
+        f.write(b'BKSNAP02' + bytes(64))  # Left by an older build: replaced, not served
+    
+    assert client.get('/api/books').get_json()['books'][0]['title'] == 'Test Book'
+    assert os.path.exists(path) and catalog_snapshot.rebuilds == 1
+    assert isinstance(catalog_snapshot.current().data, mmap.mmap)  # Mapped, not read into this worker
+    books = boto3.resource('dynamodb', region_name='us-east-1').Table('Books')
+    books.update_item(Key={'isbn13': '978-0123456789'}, UpdateExpression='SET title = :t',
+                      ExpressionAttributeValues={':t': 'Renamed'})
+    assert client.get('/api/books').get_json()['books'][0]['title'] == 'Test Book'  # No scan
+    
+    # Another worker publishes a new file; this one swaps on its next check
+    CatalogSnapshot.from_books([Book('978-0123456789', title='Published Elsewhere', price=10)]).write(path)
+    catalog_snapshot._next_check = 0.0
+    assert client.get('/api/books').get_json()['books'][0]['title'] == 'Published Elsewhere'
+    assert catalog_snapshot.current().get('978-0123456789').price == 10
+    assert catalog_snapshot.current().find('978-0000000000') == -1
+    
+    with client.session_transaction() as sess:
+        sess['admin_id'] = 1
+    stats = client.post('/admin/catalog/snapshot').get_json()
+    assert stats['books'] == 1 and stats['rebuilds'] == 2
+    assert client.get('/api/books').get_json()['books'][0]['title'] == 'Renamed'
+
+def test_catalog_snapshot_follows_order_stock(client, tmp_path, monkeypatch):
+    """Orders overlay stock on the snapshot's rows and in-stock bitmap, here at once and in other workers via the journal."""
+    import os
+    from app_aws import catalog_snapshot
+    from utils.catalog_snapshot import SnapshotManager, STOCK_JOURNAL
+    
+    path = str(tmp_path / 'catalog.snapshot')
+    for name, value in (('path', path), ('snapshot', None), ('_identity', None), ('_next_check', 0.0)):
+        monkeypatch.setattr(catalog_snapshot, name, value)
+    assert client.get('/api/books?in_stock=true').get_json()['total'] == 1
+    
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+    client.post('/api/cart/add', json={'isbn13': '978-0123456789', 'quantity': 10})
+    assert client.post('/checkout/place-order', json={
+        'full_name': 'Test User', 'email': 'test@example.com', 'phone': '9999999999',
+        'address1': '1 Main St', 'city': 'Pune', 'state': 'MH', 'pincode': '411001'
+    }).get_json()['success']
+    
+    assert client.get('/api/books?in_stock=true').get_json()['total'] == 0
+    assert client.get('/api/books').get_json()['books'][0]['stock'] == 0
+    
+    # Another worker maps the same file and replays the journal on its check
+    other = SnapshotManager(build=catalog_snapshot.build)
+    other.path, other.max_age = path, 300
+    assert other.current().get('978-0123456789').stock == 0
+    assert other.current().match(in_stock=True) == 0
+    
+    # A rebuild reads the new stock from DynamoDB and starts an empty journal
+    with client.session_transaction() as sess:
+        sess['admin_id'] = 1
+    client.post('/admin/catalog/snapshot')
+    assert not os.path.exists(STOCK_JOURNAL.format(path))
+    assert catalog_snapshot.current().get('978-0123456789').stock == 0
+
+def test_catalog_snapshot_expiry_rebuilds_in_background(client, tmp_path, monkeypatch):
+    """An expired snapshot keeps serving while one rebuild runs off the request thread, then every request swaps."""
+    import threading
+    from app_aws import catalog_snapshot
+    from utils.swr_cache import refresh_executor
+    
+    path = str(tmp_path / 'catalog.snapshot')
+    for name, value in (('path', path), ('snapshot', None), ('_identity', None), ('_next_check', 0.0)):
+        monkeypatch.setattr(catalog_snapshot, name, value)
+    assert client.get('/api/books').get_json()['books'][0]['title'] == 'Test Book'
+    
+    books = boto3.resource('dynamodb', region_name='us-east-1').Table('Books')
+    books.update_item(Key={'isbn13': '978-0123456789'}, UpdateExpression='SET title = :t',
+                      ExpressionAttributeValues={':t': 'Renamed'})
+    monkeypatch.setattr(catalog_snapshot, 'max_age', 1e-9)  # Expired from here on
+    release = threading.Event()
+    build = catalog_snapshot.build
+    monkeypatch.setattr(catalog_snapshot, 'build', lambda: release.wait(5) and build())
+    rebuilds = catalog_snapshot.rebuilds
+    
+    for _ in range(3):  # The rebuild is blocked; requests still answer from the mapped snapshot
+        catalog_snapshot._next_check = 0.0
+        assert client.get('/api/books').get_json()['books'][0]['title'] == 'Test Book'
+    release.set()
+    refresh_executor().submit(lambda: None).result()
+    
+    monkeypatch.setattr(catalog_snapshot, 'max_age', 300)
+    assert client.get('/api/books').get_json()['books'][0]['title'] == 'Renamed'
+    assert catalog_snapshot.rebuilds == rebuilds + 1
+
+def test_catalog_snapshot_built_from_csv(tmp_path):
+    """build_catalog.py's CSV source maps into a snapshot whose ISBN index finds every book."""
+    from build_catalog import books_from_csv
+    from utils.book import Book
+    from utils.catalog_snapshot import CatalogSnapshot
+    
+    books = list(books_from_csv('data/books.csv'))
+    # Same key digits, different ISBN strings: the index verifies the string
+    books += [Book('978-0123456789', title='Hyphenated'), Book('9780123456789', title='Plain')]
+    path = str(tmp_path / 'catalog.snapshot')
+    CatalogSnapshot.from_books(books).write(path)
+    snapshot = CatalogSnapshot.load(path)
+    
+    assert len(snapshot) == len(books)
+    for book in books[::250]:
+        assert snapshot.get(book.isbn13).to_json() == book.to_json()
+    assert snapshot.get('978-0123456789').title == 'Hyphenated'
+    assert snapshot.get('9780123456789').title == 'Plain'
+    assert snapshot.find('0000000000000') == -1
+    
+    # Prices as import_data.py gives them, page count missing or not
+    csv_path = tmp_path / 'books.csv'
+    csv_path.write_text('isbn13,title,num_pages\n1,No Pages,\n2,Zero Pages,0\n3,Long,600\n')
+    assert [book.price for book in books_from_csv(str(csv_path))] == [399, 299, 599]
+
+def test_fingerprinted_assets(tmp_path):
+    """build() writes hashed, precompressed assets served with immutable headers."""
+    import gzip
+    import shutil
+    from flask import Flask, render_template_string
+    from utils.assets import build, init_assets
+    
+    static = tmp_path / 'static'
+    (static / 'js').mkdir(parents=True)
+    shutil.copy('static/style.css', static / 'style.css')
+    shutil.copy('static/js/main.js', static / 'js' / 'main.js')
+    manifest = build(str(static), assets=('style.css', 'js/main.js'))
+    
+    app = Flask(__name__, static_folder=str(static))
+    init_assets(app)
+    client = app.test_client()
+    
+    with app.test_request_context():
+        url = render_template_string("{{ asset_url('style.css') }}")
+        assert url == '/static/dist/' + manifest['style.css']
+        assert render_template_string("{{ asset_url('missing.css') }}") == '/static/missing.css'
+    
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'immutable' in response.headers['Cache-Control']
+    assert 'max-age=31536000' in response.headers['Cache-Control']
+    assert response.mimetype == 'text/css'
+    assert b'--primary-color:#2C3E50' in gzip.decompress(response.data)
+    response.close()
+
+@pytest.fixture
+def cover_server():
+    """Local HTTP stand-in for Google Books cover URLs."""
+    import io
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from PIL import Image
+    
+    buf = io.BytesIO()
+    Image.new('RGB', (600, 900), (200, 80, 40)).save(buf, 'JPEG')
+    cover = buf.getvalue()
+    hits = []
+    
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.append(self.path)
+            if self.path != '/cover.jpg':
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/jpeg')
+            self.send_header('Content-Length', str(len(cover)))
+            self.end_headers()
+            self.wfile.write(cover)
+        
+        def log_message(self, *args):
+            pass
+    
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}", hits
+    server.shutdown()
+
+def test_thumbnails_are_fetched_once_and_resized(client, cover_server, tmp_path, monkeypatch):
+    """/img/<isbn13>/<size> serves cached, resized covers from a single remote fetch."""
+    import io
+    import app_aws
+    from PIL import Image
+    from utils.thumbnails import ThumbnailCache
+    
+    base_url, hits = cover_server
+    monkeypatch.setattr(app_aws, 'thumbnails', ThumbnailCache(str(tmp_path)))
+    books = boto3.resource('dynamodb', region_name='us-east-1').Table('Books')
+    books.update_item(
+        Key={'isbn13': '978-0123456789'},
+        UpdateExpression='SET thumbnail = :t',
+        ExpressionAttributeValues={':t': f"{base_url}/cover.jpg"}
+    )
+    app_aws.book_fragments.invalidate()  # Written behind the app's back
+    
+    assert client.get('/api/books').get_json()['books'][0]['image'] == '/img/978-0123456789/md'
+    
+    webp = client.get('/img/978-0123456789/md', headers={'Accept': 'image/avif,image/webp,*/*'})
+    assert webp.status_code == 200
+    assert webp.mimetype == 'image/webp'
+    assert 'max-age=2592000' in webp.headers['Cache-Control']
+    assert max(Image.open(io.BytesIO(webp.data)).size) <= 384
+    webp.close()
+    
+    jpeg = client.get('/img/978-0123456789/sm', headers={'Accept': '*/*'})
+    assert jpeg.mimetype == 'image/jpeg'
+    assert Image.open(io.BytesIO(jpeg.data)).size == (96, 144)
+    jpeg.close()
+    assert hits == ['/cover.jpg']
+    
+    assert client.get('/img/978-0123456789/huge').status_code == 404
+    
+    # With a catalog snapshot the cover URL comes from its ISBN index (this book isn't in DynamoDB)
+    from utils.book import Book
+    from utils.catalog_snapshot import CatalogSnapshot
+    path = str(tmp_path / 'catalog.snapshot')
+    CatalogSnapshot.from_books([Book('9780000000003', thumbnail=f"{base_url}/cover.jpg")]).write(path)
+    for name, value in (('path', path), ('snapshot', None), ('_identity', None), ('_next_check', 0.0)):
+        monkeypatch.setattr(app_aws.catalog_snapshot, name, value)
+    cover = client.get('/img/9780000000003/sm', headers={'Accept': '*/*'})
+    assert cover.mimetype == 'image/jpeg'
+    cover.close()
+    assert hits == ['/cover.jpg', '/cover.jpg']
+    
+    # Unavailable covers fall back to the placeholder; prefetch reports them
+    ready, unavailable = ThumbnailCache(str(tmp_path / 'bulk')).prefetch(
+        [('9780000000001', f"{base_url}/cover.jpg"), ('9780000000002', f"{base_url}/gone.jpg")],
+        sizes=('sm',)
+    )
+    assert (ready, unavailable) == (1, 1)
+
+
+def test_forked_workers_build_their_own_clients(client):
+    """post_fork's reset_all() drops clients resolved in the gunicorn master; the next use builds new ones."""
+    import app_aws
+    from utils.lazy import reset_all
+    
+    master_client = app_aws.dynamodb_client.resolve()
+    master_table = app_aws.books_table.resolve()
+    reset_all()
+    
+    assert not app_aws.dynamodb_client.resolved and not app_aws.books_table.resolved
+    assert app_aws.dynamodb_client.resolve() is not master_client
+    assert app_aws.books_table.resolve() is not master_table
+    assert client.get('/api/books').status_code == 200
+
+
+@pytest.mark.parametrize('module', ['app', 'app_aws'])
+def test_import_time_budget(module):
+    """Apps import within IMPORT_BUDGET_SECONDS without pulling pandas into the request path."""
+    from benchmarks.startup import profile_import
+    
+    budget = float(os.environ.get('IMPORT_BUDGET_SECONDS', '1.0'))
+    seconds = min(profile_import(module, importtime=False)[0] for _ in range(3))
+    _, modules = profile_import(module)
+    
+    assert seconds < budget, f"import {module} took {seconds:.2f}s (budget {budget:.2f}s)"
+    assert 'pandas' not in {name for _, _, _, name in modules}
+
+def test_catalog_cache_stale_while_revalidate(client, monkeypatch):
+    """Past the soft TTL the old listing is served while one background refresh runs; a failing backend serves it stale."""
+    import app_aws
+    from app_aws import catalog_cache, catalog_books, books_table
+    from utils.swr_cache import refresh_executor
+    
+    monkeypatch.setattr(catalog_cache, 'soft_ttl', 0)
+    assert catalog_books()[0].title == 'Test Book'
+    books_table.update_item(
+        Key={'isbn13': '978-0123456789'},
+        UpdateExpression='SET title = :t',
+        ExpressionAttributeValues={':t': 'Revised Title'}
+    )
+    
+    stale_hits = catalog_cache.stale_hits
+    assert catalog_books()[0].title == 'Test Book'
+    assert catalog_cache.stale_hits == stale_hits + 1
+    
+    # Entries stored from here on are past their hard TTL at once, so reads load inline
+    monkeypatch.setattr(catalog_cache, 'hard_ttl', 0)
+    refresh_executor().submit(lambda: None).result()  # Wait for the queued refresh
+    assert catalog_cache._entries[('all_books',)].value[0].title == 'Revised Title'
+    assert catalog_books()[0].title == 'Revised Title'
+    
+    # If the backend is down the last value is still served
+    def unavailable(scan_kwargs, limit):
+        raise RuntimeError('DynamoDB unavailable')
+    monkeypatch.setattr(app_aws, '_scan_books', unavailable)
+    fallbacks = catalog_cache.fallbacks
+    assert catalog_books()[0].title == 'Revised Title'
+    assert catalog_cache.fallbacks == fallbacks + 1
+
+def test_books_facet_counts(client):
+    """?facets=true adds counts per category, price bucket, stock and rating; each facet ignores its own filter."""
+    from app_aws import books_table, book_fragments
+    books_table.put_item(Item={
+        'isbn13': '978-0000000002', 'title': 'Second Book', 'authors': 'Other Author',
+        'price': '850', 'stock': 0, 'categories': 'History', 'average_rating': '4.6'
+    })
+    book_fragments.invalidate()
+    
+    data = client.get('/api/books?facets=true&category=Fiction').get_json()
+    assert data['total'] == 1
+    facets = data['facets']
+    categories = {c['name']: c['count'] for c in facets['category']}
+    assert categories['Fiction'] == 1 and categories['History'] == 1
+    assert [b['count'] for b in facets['price']] == [1, 0, 0, 0, 0]
+    assert facets['in_stock'] == 1
+    
+    facets = client.get('/api/books?facets=true&in_stock=true').get_json()['facets']
+    assert {c['name']: c['count'] for c in facets['category']}['History'] == 0
+    assert facets['in_stock'] == 1
+    facets = client.get('/api/books?facets=true').get_json()['facets']
+    assert [b['count'] for b in facets['price']] == [1, 0, 0, 1, 0]
+    assert [b['count'] for b in facets['rating']] == [1, 0, 0, 0, 1]
+    assert 'facets' not in client.get('/api/books').get_json()
+
+def test_snapshot_bitmap_filters_match_row_filters():
+    """ANDed bitmap indexes select, rank and facet-count the same rows as filtering book by book."""
+    import itertools
+    from utils.book import Book
+    from utils.bitmap_index import BitmapIndex
+    from utils.catalog_snapshot import CatalogSnapshot, SORTS
+    from utils.facets import book_rows, count_facets
+    
+    books = [
+        Book(f'978-{i:010d}', '', f'Title {i % 7}', '', f'Author {i % 3}', ('Fiction', 'History', 'Cooking')[i % 3],
+             '', '', 1990 + i % 20, (i % 11) / 2, 100, i % 13, 300 + 37 * i % 900, i % 4)
+        for i in range(200)
+    ]
+    snapshot = CatalogSnapshot.from_books(books)
+    rows = [snapshot.book(i) for i in range(len(snapshot))]
+    
+    # The index stored in the file is the one the columns build
+    stored, built = snapshot.bitmaps, BitmapIndex(snapshot, SORTS)
+    assert isinstance(stored.rank('rating'), memoryview)
+    assert stored.sections() == built.sections()
+    
+    for category, price_max, author, in_stock in itertools.product(
+            ('', 'Fiction', 'History'), (None, 450, 451.5, 2000), ('', 'author 1'), (False, True)):
+        expected = [
+            i for i, b in enumerate(rows)
+            if (not category or b.category == category) and (price_max is None or b.price <= price_max)
+            and (not author or author in b.authors.lower()) and (not in_stock or b.stock > 0)
+        ]
+        expected.sort(key=lambda i: (rows[i].rating, rows[i].ratings_count), reverse=True)
+        assert snapshot.select(None, category, price_max, author, in_stock, 'rating') == expected
+        assert snapshot.select(None, category, price_max, author, in_stock, 'rating', limit=5) == expected[:5]
+        
+        base = [(b.category, b.price, b.stock, b.rating) for b in rows if not author or author in b.authors.lower()]
+        assert (snapshot.bitmaps.facets(snapshot.match(author=author), category, price_max, in_stock) ==
+                count_facets(book_rows(base, price_max), category, price_max, in_stock))
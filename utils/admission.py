@@ -0,0 +1,195 @@
+"""
+Admission Control
+Sheds load before it reaches the scan-heavy routes. Endpoints are grouped
+into classes (browse, admin, cart/checkout); each class can have:
+
+- a token bucket (`rate` requests/second, `burst`): over it -> 429
+- a concurrency limit (`concurrency`): further requests wait up to `wait`
+  seconds for a slot, at most `queue` of them at a time; a full queue or a
+  missed deadline -> 503
+
+Both carry Retry-After. A streamed response (e.g. an admin export) holds its
+slot until the stream is closed, not just until the view returns. Classes are
+isolated from each other, so a browse or search spike can hold at most its own
+slots. Queued requests also hold a thread, so while the limited classes'
+concurrency + queue stays below the worker's thread count (10 of
+gunicorn.conf.py's 12 by default), cart and checkout, which have no limits,
+always find a thread. Admissions, rejections, in-flight and queued requests
+per class are exported at /metrics.
+
+A bucket is per worker and shared by every client, so it caps the worker's
+throughput, not any one client's. Browse is bounded by its concurrency limit,
+which tracks what a worker can actually serve; its rate is opt-in.
+"""
+import math
+import threading
+import time
+from collections import defaultdict
+
+from flask import g, jsonify, request
+
+CART_CHECKOUT = (
+    'cart', 'add_to_cart', 'update_cart_item', 'remove_from_cart', 'clear_cart',
+    'apply_coupon', 'checkout', 'place_order', 'order_confirmation'
+)
+
+DEFAULTS = {
+    'ADMISSION_CONTROL': True,
+    # class -> endpoints and limits; a limit left out (or None) is not enforced
+    'ADMISSION_CLASSES': {
+        'cart_checkout': {'endpoints': CART_CHECKOUT},
+        'browse': {
+            'endpoints': ('index', 'get_books', 'search', 'catalog_bootstrap_document'),
+            'concurrency': 4, 'queue': 4, 'wait': 0.5,
+        },
+        'admin': {
+            'endpoints': ('admin_dashboard', 'admin_books', 'admin_export'),
+            'concurrency': 1, 'queue': 1, 'wait': 1.0, 'rate': 5, 'burst': 10,
+        },
+    },
+}
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self):
+        """Take a token; returns 0 if there was one, else seconds until the next."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+
+class AdmissionClass:
+    def __init__(self, name, endpoints=(), concurrency=None, queue=0, wait=0, rate=None, burst=None):
+        self.name = name
+        self.endpoints = tuple(endpoints)
+        self.slots = threading.BoundedSemaphore(concurrency) if concurrency else None
+        self.queue = queue
+        self.wait = wait
+        self.bucket = TokenBucket(rate, burst or rate) if rate else None
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = defaultdict(int)  # reason -> count
+
+
+class AdmissionControl:
+    """Flask extension; `app.extensions['admission']`."""
+
+    def __init__(self, app=None):
+        self.classes = {}
+        self.by_endpoint = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        for key, value in DEFAULTS.items():
+            app.config.setdefault(key, value)
+        self.app = app
+        for name, settings in app.config['ADMISSION_CLASSES'].items():
+            cls = self.classes[name] = AdmissionClass(name, **settings)
+            for endpoint in cls.endpoints:
+                self.by_endpoint[endpoint] = cls
+        app.before_request(self._admit)
+        app.after_request(self._hold_while_streaming)
+        app.teardown_request(self._release)
+        app.extensions['admission'] = self
+
+    def _admit(self):
+        if not self.app.config['ADMISSION_CONTROL']:
+            return None
+        cls = self.by_endpoint.get(request.endpoint)
+        if cls is None:
+            return None
+
+        if cls.bucket is not None:
+            retry_after = cls.bucket.take()
+            if retry_after:
+                return self._reject(cls, 'rate', 429, retry_after)
+
+        if cls.slots is not None and not cls.slots.acquire(blocking=False):
+            with self._lock:
+                if cls.waiting >= cls.queue:
+                    full = True
+                else:
+                    full = False
+                    cls.waiting += 1
+            if full:
+                return self._reject(cls, 'queue_full', 503, cls.wait)
+            try:
+                acquired = cls.slots.acquire(timeout=cls.wait)
+            finally:
+                with self._lock:
+                    cls.waiting -= 1
+            if not acquired:
+                return self._reject(cls, 'deadline', 503, cls.wait)
+
+        g._admission = cls
+        with self._lock:
+            cls.in_flight += 1
+            cls.admitted += 1
+        return None
+
+    def _reject(self, cls, reason, status, retry_after):
+        with self._lock:
+            cls.rejected[reason] += 1
+        response = jsonify({'error': 'Server busy, please retry shortly', 'reason': reason})
+        response.status_code = status
+        response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return response
+
+    def _hold_while_streaming(self, response):
+        if response.is_streamed and '_admission' in g:
+            cls = g.pop('_admission')
+            response.call_on_close(lambda: self._free(cls))
+        return response
+
+    def _release(self, exc=None):
+        cls = g.pop('_admission', None)
+        if cls is not None:
+            self._free(cls)
+
+    def _free(self, cls):
+        with self._lock:
+            cls.in_flight -= 1
+        if cls.slots is not None:
+            cls.slots.release()
+
+    def metric_lines(self):
+        """Prometheus lines for Metrics.add_collector()."""
+        out = [
+            '# HELP bookstore_admission_admitted_total Requests admitted per endpoint class.',
+            '# TYPE bookstore_admission_admitted_total counter',
+        ]
+        with self._lock:
+            classes = sorted(self.classes.items())
+            out += [f'bookstore_admission_admitted_total{{class="{name}"}} {cls.admitted}' for name, cls in classes]
+            out += [
+                '# HELP bookstore_admission_rejected_total Requests shed per endpoint class and reason.',
+                '# TYPE bookstore_admission_rejected_total counter',
+            ]
+            out += [f'bookstore_admission_rejected_total{{class="{name}",reason="{reason}"}} {count}'
+                    for name, cls in classes for reason, count in sorted(cls.rejected.items())]
+            out += [
+                '# HELP bookstore_admission_in_flight Admitted requests being handled per endpoint class.',
+                '# TYPE bookstore_admission_in_flight gauge',
+            ]
+            out += [f'bookstore_admission_in_flight{{class="{name}"}} {cls.in_flight}' for name, cls in classes]
+            out += [
+                '# HELP bookstore_admission_waiting Requests queued for a slot per endpoint class.',
+                '# TYPE bookstore_admission_waiting gauge',
+            ]
+            out += [f'bookstore_admission_waiting{{class="{name}"}} {cls.waiting}' for name, cls in classes]
+        return out
@@ -0,0 +1,213 @@
+"""
+Static Asset Pipeline
+build() minifies the site's CSS/JS, fingerprints each file with a content hash
+and writes .gz/.br siblings into static/dist/ along with a manifest.json.
+init_assets() adds the `asset_url()` template helper, which emits the hashed
+URLs, and a /static/dist/ route that serves the precompressed variant with
+immutable far-future cache headers. Without a build, asset_url() falls back
+to the plain static URL.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+from flask import request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # Optional dependency
+    brotli = None
+
+# Source files under static/ that pages load
+ASSETS = ('style.css', 'js/main.js', 'js/catalog.js', 'catalog.js')
+
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+ONE_YEAR = 365 * 24 * 3600
+ENCODED_SUFFIXES = (('br', '.br'), ('gzip', '.gz'))
+
+# Characters after which a '/' starts a regex literal rather than a division
+_REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^\n')
+
+
+def minify_js(source):
+    """
+    Conservative JS minifier: drops comments, indentation and blank lines and
+    collapses runs of spaces. Strings, template literals and regex literals are
+    copied verbatim, and line breaks are kept so automatic semicolons still hold.
+    """
+    out = []
+    i, n = 0, len(source)
+
+    def last_significant():
+        for chunk in reversed(out):
+            stripped = chunk.rstrip(' \t')
+            if stripped:
+                return stripped[-1]
+        return '\n'
+
+    while i < n:
+        c = source[i]
+
+        if c in '\'"`':
+            j = i + 1
+            while j < n and source[j] != c:
+                j += 2 if source[j] == '\\' else 1
+            out.append(source[i:j + 1])
+            i = j + 1
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = n if end < 0 else end + 2
+        elif source.startswith('//', i):
+            end = source.find('\n', i)
+            i = n if end < 0 else end
+        elif c == '/' and last_significant() in _REGEX_PRECEDERS:
+            j, in_class = i + 1, False
+            while j < n and (in_class or source[j] != '/') and source[j] != '\n':
+                if source[j] == '\\':
+                    j += 1
+                elif source[j] == '[':
+                    in_class = True
+                elif source[j] == ']':
+                    in_class = False
+                j += 1
+            out.append(source[i:j + 1])
+            i = j + 1
+        elif c == '\n':
+            while out and out[-1] in (' ', '\t'):
+                out.pop()
+            if out and out[-1] != '\n':
+                out.append('\n')
+            i += 1
+            while i < n and source[i] in ' \t\r':
+                i += 1
+        elif c in ' \t\r':
+            if out and out[-1] not in (' ', '\n'):
+                out.append(' ')
+            i += 1
+        else:
+            out.append(c)
+            i += 1
+
+    return ''.join(out).strip() + '\n'
+
+
+_CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+
+
+def minify_css(source):
+    """Drop comments, collapse whitespace and trim it around punctuation (strings untouched)."""
+    parts = []
+    for chunk in re.split(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')', re.sub(r'/\*.*?\*/', '', source, flags=re.S)):
+        if chunk[:1] in ('"', "'"):
+            parts.append(chunk)
+            continue
+        chunk = re.sub(r'\s+', ' ', chunk)
+        chunk = _CSS_PUNCTUATION.sub(r'\1', chunk)
+        chunk = re.sub(r':\s+', ':', chunk)
+        parts.append(chunk.replace(';}', '}'))
+    return ''.join(parts).strip() + '\n'
+
+
+MINIFIERS = {'.js': minify_js, '.css': minify_css}
+
+
+def fingerprint(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def build(static_folder, assets=ASSETS, gzip_level=9, brotli_level=11):
+    """Minify, fingerprint and precompress `assets`. Returns the manifest written."""
+    dist = os.path.join(static_folder, DIST_DIR)
+    manifest = {}
+
+    for name in assets:
+        with open(os.path.join(static_folder, name), encoding='utf-8') as f:
+            source = f.read()
+
+        root, ext = os.path.splitext(name)
+        data = MINIFIERS.get(ext, lambda s: s)(source).encode('utf-8')
+        hashed = f"{root}.{fingerprint(data)}{ext}"
+        target = os.path.join(dist, hashed)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+
+        with open(target, 'wb') as f:
+            f.write(data)
+        with open(target + '.gz', 'wb') as f:
+            f.write(gzip.compress(data, compresslevel=gzip_level, mtime=0))
+        if brotli:
+            with open(target + '.br', 'wb') as f:
+                f.write(brotli.compress(data, quality=brotli_level))
+
+        manifest[name] = hashed
+        print(f"  {name}: {len(source.encode('utf-8'))} -> {len(data)} bytes -> {DIST_DIR}/{hashed}")
+
+    with open(os.path.join(dist, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    if not brotli:
+        print("  (brotli not installed, .br files skipped)")
+    return manifest
+
+
+class AssetManifest:
+    """Maps logical static paths to fingerprinted ones; reloaded in debug when rebuilt."""
+
+    def __init__(self, static_folder, reload=False):
+        self.path = os.path.join(static_folder, DIST_DIR, MANIFEST)
+        self.reload = reload
+        self._mtime = None
+        self._entries = {}
+        self._load()
+
+    def _load(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            self._entries, self._mtime = {}, None
+            return
+        if mtime != self._mtime:
+            with open(self.path) as f:
+                self._entries = json.load(f)
+            self._mtime = mtime
+
+    def get(self, name):
+        if self.reload:
+            self._load()
+        return self._entries.get(name)
+
+
+def init_assets(app):
+    """Register asset_url() for templates and the immutable /static/dist/ route."""
+    dist = os.path.join(app.static_folder, DIST_DIR)
+    manifest = AssetManifest(app.static_folder, reload=app.debug)
+
+    def asset_url(filename):
+        hashed = manifest.get(filename)
+        if hashed:
+            return url_for('static_asset', filename=hashed)
+        return url_for('static', filename=filename)
+
+    def static_asset(filename):
+        available = [enc for enc, suffix in ENCODED_SUFFIXES if os.path.exists(os.path.join(dist, filename + suffix))]
+        encoding = request.accept_encodings.best_match(available) if available else None
+        suffix = dict(ENCODED_SUFFIXES).get(encoding, '')
+
+        response = send_from_directory(
+            dist, filename + suffix,
+            mimetype=mimetypes.guess_type(filename)[0],
+            max_age=ONE_YEAR
+        )
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    app.add_url_rule(f"{app.static_url_path}/{DIST_DIR}/<path:filename>", 'static_asset', static_asset)
+    app.add_template_global(asset_url)
+    app.extensions['asset_manifest'] = manifest
@@ -0,0 +1,228 @@
+"""
+Catalog Bitmap Indexes
+One bitmap per filterable value of a CatalogSnapshot (display category, in
+stock, price bucket, rating bucket), held as a Python int with bit i set for
+row i. get_books()'s filters are always ANDed, so any combination of them is a
+few C-level `&`s over rows/8 bytes and a count is a popcount; only the search
+and author substring filters still look at rows, and only at those left.
+Arbitrary price ceilings use the rows in price order: a checkpoint bitmap every
+1/PRICE_CHECKPOINTS of them, plus the few rows past the nearest checkpoint.
+
+Pages are picked from a filtered bitmap by rank: for each sort every row has a
+rank (its position in that order), so a page is the `limit` lowest ranks
+among the set bits instead of a sort of every match. When most rows match,
+walking the sort order until the page is full is cheaper still.
+
+An index is built once, when its snapshot file is written, and stored in the
+file (sections()): a worker that maps the file reads the orders and ranks in
+place from the shared pages and only copies the bitmaps into ints, rows/8
+bytes each. An index belongs to one snapshot and only changes with it, with
+one exception: orders set and clear in_stock bits in place (through
+CatalogSnapshot.set_stock()), so the in-stock filter and its facet counts
+follow stock within a check interval instead of waiting for a rebuild.
+These indexes exist only with CATALOG_SNAPSHOT; without one, get_books() in
+app_aws.py, like app.py's SQL listing, filters the catalog row by row.
+"""
+import heapq
+from array import array
+from bisect import bisect_right
+from collections import defaultdict
+
+from utils.category_mapper import get_display_categories
+from utils.facets import PRICE_BOUNDS, RATING_BOUNDS, render_facets
+
+PRICE_CHECKPOINTS = 64
+
+try:
+    popcount = int.bit_count  # Python 3.10+
+except AttributeError:
+    def popcount(mask):
+        return bin(mask).count('1')
+
+_BYTE_BITS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+
+
+def bitmap(rows, size):
+    """Bitmap of `size` rows with `rows` set."""
+    bits = bytearray((size + 7) // 8)
+    for row in rows:
+        bits[row >> 3] |= 1 << (row & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def rows_of(mask):
+    """The rows set in a bitmap, ascending."""
+    rows = []
+    for offset, byte in enumerate(mask.to_bytes((mask.bit_length() + 7) // 8, 'little')):
+        if byte:
+            base = offset << 3
+            rows.extend([base + bit for bit in _BYTE_BITS[byte]])
+    return rows
+
+
+def section_names(sorts):
+    """Names of the sections an index over `sorts` is stored as, in file order."""
+    return ('category_names', 'bitmaps', 'price_order', 'sorted_prices') + tuple(
+        f"{kind}_{sort}" for sort in sorts for kind in ('order', 'rank')
+    )
+
+
+class BitmapIndex:
+    """
+    Bitmaps and sort ranks over one snapshot's rows; `sorts` is its SORTS table.
+    `stored` is the sections() a snapshot file carries, as buffers; without it
+    the index is built from the snapshot's columns.
+    """
+
+    def __init__(self, snapshot, sorts, stored=None):
+        size = self.size = len(snapshot)
+        self.all = (1 << size) - 1
+        self.columns = snapshot.columns
+        self.sorts = sorts
+        self._orders = {}  # sort -> rows in that order
+        self._ranks = {}  # sort -> each row's position in that order
+        self.step = max(1, -(-size // PRICE_CHECKPOINTS))
+        if stored is None:
+            self._build(snapshot)
+        else:
+            self._read(stored)
+
+    def _build(self, snapshot):
+        size = self.size
+        price, stock, rating = self.columns['price'], self.columns['stock'], self.columns['rating']
+
+        categories = defaultdict(list)
+        prices = [[] for _ in range(len(PRICE_BOUNDS) + 1)]
+        ratings = [[] for _ in range(len(RATING_BOUNDS) + 1)]
+        stocked = []
+        for i in range(size):
+            categories[snapshot.category(i)].append(i)
+            prices[bisect_right(PRICE_BOUNDS, price[i])].append(i)
+            ratings[bisect_right(RATING_BOUNDS, rating[i])].append(i)
+            if stock[i] > 0:
+                stocked.append(i)
+        self.categories = {name: bitmap(rows, size) for name, rows in categories.items()}
+        self.in_stock = bitmap(stocked, size)
+        self.price_buckets = [bitmap(rows, size) for rows in prices]
+        self.rating_buckets = [bitmap(rows, size) for rows in ratings]
+
+        # price_prefixes[k]: the first k * step rows in price order
+        self.price_order = array('L', sorted(range(size), key=price.__getitem__))
+        self.sorted_prices = array('d', (price[i] for i in self.price_order))
+        self.price_prefixes = [0]
+        bits = bytearray((size + 7) // 8)
+        for start in range(0, size, self.step):
+            for row in self.price_order[start:start + self.step]:
+                bits[row >> 3] |= 1 << (row & 7)
+            self.price_prefixes.append(int.from_bytes(bits, 'little'))
+
+    def sections(self):
+        """This index as named byte strings (section_names() order) for a snapshot file."""
+        self.prepare()
+        names = list(self.categories)
+        bitmaps = [self.in_stock, *self.price_buckets, *self.rating_buckets,
+                   *(self.categories[name] for name in names), *self.price_prefixes]
+        width = (self.size + 7) // 8
+        out = {
+            'category_names': b''.join(name.encode() + b'\0' for name in names),
+            'bitmaps': b''.join(mask.to_bytes(width, 'little') for mask in bitmaps),
+            'price_order': bytes(self.price_order),
+            'sorted_prices': bytes(self.sorted_prices),
+        }
+        for sort in self.sorts:
+            out[f"order_{sort}"] = bytes(self.order(sort))
+            out[f"rank_{sort}"] = bytes(self.rank(sort))
+        return out
+
+    def _read(self, stored):
+        """Views over a file's sections: orders and ranks stay in the mapping, bitmaps become ints."""
+        names = str(stored['category_names'], 'utf-8').split('\0')[:-1]
+        counts = (1, len(PRICE_BOUNDS) + 1, len(RATING_BOUNDS) + 1, len(names), 1 + -(-self.size // self.step))
+        width = (self.size + 7) // 8
+        data = stored['bitmaps']
+        masks = [int.from_bytes(data[i * width:(i + 1) * width], 'little') for i in range(sum(counts))]
+        groups = []
+        for count in counts:
+            groups.append(masks[:count])
+            masks = masks[count:]
+        (self.in_stock,), self.price_buckets, self.rating_buckets, category_masks, self.price_prefixes = groups
+        self.categories = dict(zip(names, category_masks))
+        self.price_order = stored['price_order'].cast('L')
+        self.sorted_prices = stored['sorted_prices'].cast('d')
+        for sort in self.sorts:
+            self._orders[sort] = stored[f"order_{sort}"].cast('L')
+            self._ranks[sort] = stored[f"rank_{sort}"].cast('L')
+
+    def price_at_most(self, price_max):
+        """Bitmap of rows priced at or below `price_max`."""
+        count = bisect_right(self.sorted_prices, price_max)
+        if count >= self.size:
+            return self.all
+        checkpoint = count // self.step
+        prefix = self.price_prefixes[checkpoint]
+        rest = self.price_order[checkpoint * self.step:count]
+        return prefix | bitmap(rest, self.size) if rest else prefix
+
+    def order(self, sort):
+        """Every row in a SORTS order (unknown sorts keep row order), as select() has always sorted."""
+        order = self._orders.get(sort)
+        if order is None:
+            rows = list(range(self.size))
+            sort_columns, reverse = self.sorts.get(sort, ((), False))
+            for name in reversed(sort_columns):
+                rows.sort(key=self.columns[name].__getitem__, reverse=reverse)
+            order = self._orders[sort] = array('L', rows)
+        return order
+
+    def rank(self, sort):
+        rank = self._ranks.get(sort)
+        if rank is None:
+            rank = array('L', bytes(self.size * array('L').itemsize))
+            for position, row in enumerate(self.order(sort)):
+                rank[row] = position
+            self._ranks[sort] = rank
+        return rank
+
+    def prepare(self):
+        """Build every sort order now (a no-op for an index read from its file)."""
+        for sort in self.sorts:
+            self.rank(sort)
+
+    def ranked(self, mask, sort, limit=None):
+        """The rows set in `mask` in `sort` order; only the first `limit` when given."""
+        if mask == self.all:
+            return list(self.order(sort)[:limit])
+        if limit is not None and limit * self.size < popcount(mask) ** 2:
+            # Dense result, short page: walking the sort order finds it in ~limit * size / matches steps
+            bits = mask.to_bytes((self.size + 7) // 8, 'little')
+            rows = []
+            for row in self.order(sort):
+                if bits[row >> 3] >> (row & 7) & 1:
+                    rows.append(row)
+                    if len(rows) == limit:
+                        break
+            return rows
+        rows = rows_of(mask)
+        if sort not in self.sorts:
+            return rows[:limit]
+        rank = self.rank(sort)
+        if limit is not None and limit < len(rows):
+            return heapq.nsmallest(limit, rows, key=rank.__getitem__)
+        rows.sort(key=rank.__getitem__)
+        return rows
+
+    def facets(self, base, category=None, price_max=None, in_stock=False):
+        """utils/facets.py's document for the rows in `base`, each facet a popcount of ANDed bitmaps."""
+        in_category = self.categories.get(category, 0) if category else self.all
+        in_price = self.price_at_most(price_max) if price_max is not None else self.all
+        in_stock_filter = self.in_stock if in_stock else self.all
+
+        others = base & in_price & in_stock_filter
+        categories = {name: popcount(others & self.categories.get(name, 0)) for name in get_display_categories()}
+        others = base & in_category & in_stock_filter
+        prices = [popcount(others & bucket) for bucket in self.price_buckets]
+        others = base & in_category & in_price
+        stocked_books = popcount(others & self.in_stock)
+        others &= in_stock_filter
+        ratings = [popcount(others & bucket) for bucket in self.rating_buckets]
+        return render_facets(categories, prices, stocked_books, ratings)
@@ -0,0 +1,143 @@
+"""
+Book Model
+Compact per-book object shared by both apps. Raw catalog columns are stored
+once in __slots__; display fields (category, author, image, pub_date, ...)
+are derived on access, and repeated category/author strings are interned.
+"""
+import sys
+from functools import lru_cache
+
+from utils.category_mapper import get_normalized_category
+
+PLACEHOLDER_IMAGE = '/static/images/book-placeholder.jpg'
+THUMBNAIL_URL = '/img/{}/{}'  # Served from the local thumbnail cache
+UNKNOWN_AUTHOR = 'Unknown Author'
+NO_DESCRIPTION = 'No description available.'
+DEFAULT_PRICE = 399.0  # Books without a price are sold at this one
+
+# Columns of the books table / attributes of the Books DynamoDB table
+BOOK_COLUMNS = (
+    'isbn13', 'isbn10', 'title', 'subtitle', 'authors', 'categories', 'thumbnail',
+    'description', 'published_year', 'average_rating', 'num_pages', 'ratings_count',
+    'price', 'stock'
+)
+
+_intern = sys.intern
+
+
+def list_price(price):
+    """The price a book sells at: its stored price, or DEFAULT_PRICE when that is missing or zero."""
+    return price if price else DEFAULT_PRICE
+
+
+@lru_cache(maxsize=None)
+def normalized_category(raw_category):
+    """get_normalized_category() memoized; the catalog has a few hundred raw categories."""
+    return get_normalized_category(raw_category)
+
+
+class Book:
+    """A catalog book. Attribute names match what the templates and catalog.js read."""
+
+    __slots__ = (
+        'isbn13', 'isbn10', 'title', 'subtitle', 'authors', 'categories', 'thumbnail',
+        'description', 'published_year', 'rating', 'num_pages', 'ratings_count', 'price', 'stock'
+    )
+
+    publisher = "Unknown Publisher"  # Not in CSV schema
+    language = "English"  # Default language
+    reviews = ()  # Placeholder for future review feature
+
+    def __init__(self, isbn13='', isbn10=None, title=None, subtitle=None, authors=None,
+                 categories=None, thumbnail=None, description=None, published_year=None,
+                 average_rating=None, num_pages=None, ratings_count=None, price=None, stock=None):
+        self.isbn13 = isbn13 or ''
+        self.isbn10 = isbn10 or ''
+        self.title = title or 'Untitled'
+        self.subtitle = subtitle or ''
+        self.authors = _intern(authors) if authors else ''
+        self.categories = _intern(categories) if categories else ''
+        self.thumbnail = thumbnail or ''
+        self.description = description or NO_DESCRIPTION
+        self.published_year = float(published_year) if published_year else 0.0
+        self.rating = float(average_rating) if average_rating else 0.0
+        self.num_pages = int(num_pages) if num_pages else 0
+        self.ratings_count = int(ratings_count) if ratings_count else 0
+        self.price = float(list_price(price))
+        self.stock = int(stock) if stock else 0
+
+    @classmethod
+    def from_row(cls, row):
+        """Build from a sqlite3.Row of the books table (None passes through)."""
+        if not row:
+            return None
+        return cls(*[row[column] for column in BOOK_COLUMNS])
+
+    @classmethod
+    def from_item(cls, item):
+        """Build from a Books item as returned by the boto3 resource API (None passes through)."""
+        if not item:
+            return None
+        return cls(**{k: v for k, v in item.items() if k in _COLUMN_SET})
+
+    # Display fields, derived on access
+
+    @property
+    def id(self):
+        return self.isbn13
+
+    @property
+    def isbn(self):
+        return self.isbn13
+
+    @property
+    def author(self):
+        return self.authors or UNKNOWN_AUTHOR
+
+    @property
+    def category(self):
+        return normalized_category(self.categories)
+
+    @property
+    def image(self):
+        return self.image_url('md')
+
+    def image_url(self, size='md'):
+        """Same-origin cover URL for a thumbnail size ('sm', 'md', 'lg')."""
+        if not self.thumbnail:
+            return PLACEHOLDER_IMAGE
+        if not self.thumbnail.startswith(('http://', 'https://')):
+            return self.thumbnail  # Already a local path
+        return THUMBNAIL_URL.format(self.isbn13, size)
+
+    @property
+    def average_rating(self):
+        return self.rating
+
+    @property
+    def pages(self):
+        return self.num_pages
+
+    @property
+    def pub_date(self):
+        return str(int(self.published_year)) if self.published_year else "Unknown"
+
+    def to_json(self):
+        """Only the fields the catalog frontend renders."""
+        return {
+            'image': self.image_url('md'),
+            'title': self.title,
+            'isbn': self.isbn13,
+            'rating': self.rating,
+            'price': self.price,
+            'stock': self.stock,
+            'category': normalized_category(self.categories),
+            'ratings_count': self.ratings_count,
+            'author': self.authors or UNKNOWN_AUTHOR
+        }
+
+    def __repr__(self):
+        return f"Book({self.isbn13!r}, {self.title!r})"
+
+
+_COLUMN_SET = frozenset(BOOK_COLUMNS)
@@ -0,0 +1,104 @@
+"""
+Book JSON Fragment Cache
+Keeps each book's /api/books JSON fragment as ready-made bytes, keyed by
+isbn13 and a digest of the row it was rendered from. A page response is
+spliced together from cached fragments and a small envelope instead of
+re-running jsonify() over the same books.
+
+A fragment is reused only while the book's row (price, stock, every column)
+hashes the same, so rows read after a write in another worker or straight to
+the database render fresh. At most `max_entries` fragments are kept, least
+recently used first out. invalidate() only frees fragments and bumps
+catalog_version for the caches keyed on it.
+"""
+import json
+import threading
+from collections import OrderedDict
+from operator import attrgetter
+
+from utils.book import Book
+
+ENVELOPE = b'],"page":%d,"pages":%d,"per_page":%d,"total":%d}\n'
+MAX_FRAGMENTS = 10000  # ~1-2 KB each, descriptions included
+book_values = attrgetter(*Book.__slots__)
+
+
+def encode_fragment(book):
+    """Encode one Book exactly as jsonify() would inside the books list."""
+    return json.dumps(book.to_json(), sort_keys=True, separators=(',', ':')).encode()
+
+
+class BookFragmentCache:
+    """Per-book JSON fragments in a bounded LRU, reused while the book's row is unchanged."""
+
+    def __init__(self, max_entries=MAX_FRAGMENTS):
+        self.max_entries = max_entries
+        self._fragments = OrderedDict()  # isbn13 -> (row digest, bytes)
+        self._lock = threading.Lock()
+        self.catalog_version = 0  # Bumped on any catalog write
+        self.hits = 0
+        self.misses = 0
+
+    def begin_read(self):
+        """Call before reading catalog rows for a cache keyed on catalog_version."""
+        return self.catalog_version
+
+    def fragments(self, items, to_book=None):
+        """
+        Return JSON fragments for Books (or for DB rows, converted with `to_book`
+        only on a miss). A cached fragment is used only if it was rendered from
+        a row with the same digest as the item given.
+        """
+        if to_book:
+            keys = [(item['isbn13'], hash(tuple(item))) for item in items]
+        else:
+            keys = [(item.isbn13, hash(book_values(item))) for item in items]
+
+        out = []
+        cached = self._fragments
+        with self._lock:
+            for isbn13, digest in keys:
+                entry = cached.get(isbn13)
+                if entry is not None and entry[0] == digest:
+                    cached.move_to_end(isbn13)
+                    out.append(entry[1])
+                else:
+                    out.append(None)
+
+        fresh = []
+        for i, item in enumerate(items):
+            if out[i] is None:
+                out[i] = encode_fragment(to_book(item) if to_book else item)
+                fresh.append((keys[i], out[i]))
+
+        with self._lock:
+            self.hits += len(out) - len(fresh)
+            self.misses += len(fresh)
+            for (isbn13, digest), fragment in fresh:
+                cached[isbn13] = (digest, fragment)
+                cached.move_to_end(isbn13)
+            while len(cached) > self.max_entries:
+                cached.popitem(last=False)
+
+        return out
+
+    def invalidate(self, *isbns):
+        """Note a catalog write: bump catalog_version and free the written books' fragments (all if none given)."""
+        with self._lock:
+            self.catalog_version += 1
+            if not isbns:
+                self._fragments.clear()
+                return
+            for isbn13 in isbns:
+                self._fragments.pop(isbn13, None)
+
+
+def render_books_page(fragments, total, page, pages, per_page, facets=None):
+    """
+    Splice fragments into the /api/books body (same bytes jsonify() produces),
+    with a rendered facets document (utils/facets.py) when given.
+    """
+    envelope = ENVELOPE % (page, pages, per_page, total)
+    if facets is not None:
+        envelope = b'],"facets":' + facets + b',' + envelope[2:]
+    return b'{"books":[' + b','.join(fragments) + envelope
@@ -0,0 +1,150 @@
+"""
+DynamoDB Capacity Accounting
+Makes every DynamoDB call of the instrumented clients request
+ReturnConsumedCapacity, then attributes the read/write units, items scanned
+versus returned and Scan/Query page counts to the Flask endpoint and table
+that caused them.
+
+The totals are served as JSON at /admin/capacity, sorted by units consumed.
+In debug mode (or with DYNAMODB_CAPACITY_HEADER) each response also carries
+an X-DynamoDB-Capacity header with that request's usage.
+"""
+import threading
+from collections import defaultdict
+
+from flask import g, has_request_context, jsonify, redirect, request, session, url_for
+
+# Operations that accept ReturnConsumedCapacity
+READ_OPERATIONS = frozenset(('GetItem', 'BatchGetItem', 'Query', 'Scan', 'TransactGetItems'))
+WRITE_OPERATIONS = frozenset(('PutItem', 'UpdateItem', 'DeleteItem', 'BatchWriteItem', 'TransactWriteItems'))
+PAGED_OPERATIONS = frozenset(('Query', 'Scan'))
+
+HEADER = 'X-DynamoDB-Capacity'
+FIELDS = ('calls', 'pages', 'read_units', 'write_units', 'scanned', 'returned')
+
+
+def _new_usage():
+    return dict.fromkeys(FIELDS, 0)
+
+
+def _returned_items(operation, parsed):
+    if operation in PAGED_OPERATIONS:
+        return parsed.get('Count', 0)
+    if operation == 'GetItem':
+        return 1 if parsed.get('Item') else 0
+    if operation == 'BatchGetItem':
+        return sum(len(items) for items in parsed.get('Responses', {}).values())
+    if operation == 'TransactGetItems':
+        return sum(1 for response in parsed.get('Responses', []) if response.get('Item'))
+    return 0
+
+
+def _table_names(params):
+    if 'TableName' in params:
+        return [params['TableName']]
+    if 'RequestItems' in params:
+        return list(params['RequestItems'])
+    return ['(transaction)']
+
+
+class CapacityTracker:
+    """Per-(endpoint, table) consumed capacity; `app.extensions['dynamodb_capacity']`."""
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self.usage = defaultdict(_new_usage)  # (endpoint, table) -> totals
+        self.requests = defaultdict(int)  # endpoint -> requests that touched DynamoDB
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('DYNAMODB_CAPACITY_HEADER', False)
+        self.app = app
+        app.after_request(self._after_request)
+        app.add_url_rule('/admin/capacity', 'admin_capacity', self.report_view)
+        app.extensions['dynamodb_capacity'] = self
+
+    def instrument(self, *clients):
+        """Hook low-level DynamoDB clients (use `resource.meta.client` for resources)."""
+        for client in clients:
+            events = client.meta.events
+            events.register('provide-client-params.dynamodb', self._request_capacity,
+                            unique_id='bookstore-capacity-params')
+            events.register('after-call.dynamodb', self._record, unique_id='bookstore-capacity-record')
+
+    def _request_capacity(self, params, model, context=None, **kwargs):
+        if model.name in READ_OPERATIONS or model.name in WRITE_OPERATIONS:
+            params.setdefault('ReturnConsumedCapacity', 'TOTAL')
+            if context is not None:
+                context['capacity_tables'] = _table_names(params)
+
+    def _record(self, parsed, model, context=None, **kwargs):
+        operation = model.name
+        if operation not in READ_OPERATIONS and operation not in WRITE_OPERATIONS:
+            return
+
+        units_field = 'read_units' if operation in READ_OPERATIONS else 'write_units'
+        consumed = parsed.get('ConsumedCapacity') or []
+        if isinstance(consumed, dict):
+            consumed = [consumed]
+        units = {entry.get('TableName'): entry.get('CapacityUnits', 0) for entry in consumed}
+        tables = list(units) or (context or {}).get('capacity_tables') or ['(unknown)']
+
+        scanned = parsed.get('ScannedCount', 0)
+        returned = _returned_items(operation, parsed)
+        pages = 1 if operation in PAGED_OPERATIONS else 0
+
+        endpoint = (request.endpoint or 'unmatched') if has_request_context() else '(no request)'
+        per_request = g.setdefault('_dynamodb_capacity', _new_usage()) if has_request_context() else None
+
+        with self._lock:
+            for index, table in enumerate(tables):
+                totals = self.usage[endpoint, table]
+                totals['calls'] += 1
+                totals[units_field] += units.get(table, 0)
+                if index == 0:  # Item counts are per call, not per table
+                    totals['pages'] += pages
+                    totals['scanned'] += scanned
+                    totals['returned'] += returned
+        if per_request is not None:
+            per_request['calls'] += 1
+            per_request[units_field] += sum(units.values())
+            per_request['pages'] += pages
+            per_request['scanned'] += scanned
+            per_request['returned'] += returned
+
+    def _after_request(self, response):
+        usage = g.pop('_dynamodb_capacity', None)
+        if usage is None:
+            return response
+        with self._lock:
+            self.requests[request.endpoint or 'unmatched'] += 1
+        if self.app.debug or self.app.config['DYNAMODB_CAPACITY_HEADER']:
+            response.headers[HEADER] = (
+                f"rcu={usage['read_units']:g}; wcu={usage['write_units']:g}; calls={usage['calls']}; "
+                f"pages={usage['pages']}; scanned={usage['scanned']}; returned={usage['returned']}"
+            )
+        return response
+
+    def report(self):
+        """Endpoints ordered by total units, each with per-table totals and per-request averages."""
+        with self._lock:
+            endpoints = {}
+            for (endpoint, table), totals in self.usage.items():
+                entry = endpoints.setdefault(endpoint, {
+                    'endpoint': endpoint, 'requests': self.requests.get(endpoint, 0),
+                    'tables': {}, **_new_usage()
+                })
+                entry['tables'][table] = dict(totals)
+                for field in FIELDS:
+                    entry[field] += totals[field]
+
+        for entry in endpoints.values():
+            units = entry['read_units'] + entry['write_units']
+            entry['units_per_request'] = round(units / entry['requests'], 2) if entry['requests'] else None
+        return sorted(endpoints.values(), key=lambda e: e['read_units'] + e['write_units'], reverse=True)
+
+    def report_view(self):
+        if 'admin_id' not in session:
+            return redirect(url_for('admin_login'))
+        return jsonify({'endpoints': self.report()})
@@ -0,0 +1,374 @@
+"""
+Server-side cart storage.
+The session cookie only carries a cart ID; cart lines live in SQLite or DynamoDB,
+one row per (cart_id, isbn13), so every cart mutation is a single-row write.
+
+Every write stamps its row with a nanosecond `updated_at`, so a loaded cart
+carries a version (line count + stamp sum) without a separate counter row.
+"""
+import json
+import secrets
+import time
+from collections import namedtuple
+from decimal import Decimal
+
+CART_TTL_SECONDS = 7 * 24 * 3600  # Abandoned carts expire after a week
+META_KEY = '#meta'  # Sort key of the DynamoDB row holding the coupon
+TRANSACT_LIMIT = 100  # Items per DynamoDB TransactWriteItems call
+
+Cart = namedtuple('Cart', ['items', 'coupon', 'version'])
+EMPTY_CART = Cart((), None, None)
+
+SQLITE_CART_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS carts (
+    cart_id TEXT PRIMARY KEY,
+    coupon TEXT,
+    updated_at INTEGER DEFAULT 0,
+    expires_at INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cart_items (
+    cart_id TEXT NOT NULL,
+    isbn13 TEXT NOT NULL,
+    title TEXT,
+    price REAL,
+    image TEXT,
+    quantity INTEGER NOT NULL,
+    updated_at INTEGER NOT NULL,
+    expires_at INTEGER NOT NULL,
+    PRIMARY KEY (cart_id, isbn13)
+);
+CREATE INDEX IF NOT EXISTS idx_cart_items_expires ON cart_items(expires_at);
+'''
+
+
+def new_cart_id():
+    """Generate an unguessable cart ID for the session cookie."""
+    return secrets.token_urlsafe(16)
+
+
+def _stamp():
+    return time.time_ns()
+
+
+def cart_version(stamps, coupon_stamp):
+    """
+    Version of a cart from its row stamps. Rewritten rows get fresh stamps and
+    removed rows never come back, so (count, stamp sum) changes on every mutation.
+    """
+    return (len(stamps), sum(stamps), coupon_stamp or 0)
+
+
+class SQLiteCartStore:
+    """Cart store backed by the app's SQLite database."""
+
+    def __init__(self, get_connection, ttl=CART_TTL_SECONDS):
+        self._get_connection = get_connection
+        self.ttl = ttl
+        self._schema_ready = False
+
+    def get_connection(self):
+        db = self._get_connection()
+        if not self._schema_ready:
+            self._ensure_schema(db)
+        return db
+
+    def _ensure_schema(self, db):
+        """Create the cart tables, adding `updated_at` to tables from before versioning."""
+        db.executescript(SQLITE_CART_SCHEMA)
+        for table, default in (('carts', '0'), ('cart_items', '0 NOT NULL')):
+            columns = {row[1] for row in db.execute(f'PRAGMA table_info({table})')}
+            if 'updated_at' not in columns:
+                db.execute(f'ALTER TABLE {table} ADD COLUMN updated_at INTEGER DEFAULT {default}')
+        db.commit()
+        self._schema_ready = True
+
+    def _expiry(self):
+        return int(time.time()) + self.ttl
+
+    def _commit_touched(self, db, cart_id):
+        """Extend the cart row (and so its coupon) along with the line just written, then commit."""
+        db.execute('UPDATE carts SET expires_at = ? WHERE cart_id = ?', (self._expiry(), cart_id))
+        db.commit()
+
+    def create_cart(self):
+        """Create an empty cart and purge expired ones. Returns the new cart ID."""
+        db = self.get_connection()
+        now = int(time.time())
+        db.execute('DELETE FROM cart_items WHERE expires_at < ?', (now,))
+        db.execute('DELETE FROM carts WHERE expires_at < ?', (now,))
+
+        cart_id = new_cart_id()
+        db.execute('INSERT INTO carts (cart_id, coupon, expires_at) VALUES (?, NULL, ?)',
+                   (cart_id, self._expiry()))
+        db.commit()
+        return cart_id
+
+    def load(self, cart_id):
+        """Return the Cart (items, coupon, version); expired rows are ignored."""
+        db = self.get_connection()
+        now = int(time.time())
+        rows = db.execute(
+            '''SELECT isbn13, title, price, image, quantity, updated_at FROM cart_items
+               WHERE cart_id = ? AND expires_at >= ? ORDER BY rowid''',
+            (cart_id, now)
+        ).fetchall()
+        meta = db.execute(
+            'SELECT coupon, updated_at FROM carts WHERE cart_id = ? AND expires_at >= ?',
+            (cart_id, now)
+        ).fetchone()
+
+        items = [
+            {'isbn13': r['isbn13'], 'title': r['title'], 'price': r['price'],
+             'image': r['image'], 'quantity': r['quantity']}
+            for r in rows
+        ]
+        coupon = json.loads(meta['coupon']) if meta and meta['coupon'] else None
+        version = cart_version([r['updated_at'] for r in rows], meta['updated_at'] if meta else 0)
+        return Cart(items, coupon, version)
+
+    def count(self, cart_id):
+        """Number of lines in the cart, without loading them."""
+        return self.get_connection().execute(
+            'SELECT COUNT(*) FROM cart_items WHERE cart_id = ? AND expires_at >= ?',
+            (cart_id, int(time.time()))
+        ).fetchone()[0]
+
+    def increment(self, cart_id, isbn13, quantity):
+        """Add to an existing line. Returns False if the book isn't in the cart yet."""
+        db = self.get_connection()
+        cur = db.execute(
+            '''UPDATE cart_items SET quantity = quantity + ?, updated_at = ?, expires_at = ?
+               WHERE cart_id = ? AND isbn13 = ?''',
+            (quantity, _stamp(), self._expiry(), cart_id, isbn13)
+        )
+        self._commit_touched(db, cart_id)
+        return cur.rowcount > 0
+
+    def add_line(self, cart_id, isbn13, title, price, image, quantity):
+        """Insert a new cart line (or add to it if a concurrent request beat us)."""
+        db = self.get_connection()
+        db.execute(
+            '''INSERT INTO cart_items (cart_id, isbn13, title, price, image, quantity, updated_at, expires_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(cart_id, isbn13) DO UPDATE SET
+                   quantity = quantity + excluded.quantity, updated_at = excluded.updated_at,
+                   expires_at = excluded.expires_at''',
+            (cart_id, isbn13, title, float(price), image, quantity, _stamp(), self._expiry())
+        )
+        self._commit_touched(db, cart_id)
+
+    def set_quantity(self, cart_id, isbn13, quantity):
+        db = self.get_connection()
+        db.execute(
+            'UPDATE cart_items SET quantity = ?, updated_at = ?, expires_at = ? WHERE cart_id = ? AND isbn13 = ?',
+            (quantity, _stamp(), self._expiry(), cart_id, isbn13)
+        )
+        self._commit_touched(db, cart_id)
+
+    def set_prices(self, cart_id, prices):
+        """Store repriced line prices ({isbn13: price}) after a catalog change."""
+        db = self.get_connection()
+        db.executemany(
+            'UPDATE cart_items SET price = ?, updated_at = ?, expires_at = ? WHERE cart_id = ? AND isbn13 = ?',
+            [(float(price), _stamp(), self._expiry(), cart_id, isbn13) for isbn13, price in prices.items()]
+        )
+        self._commit_touched(db, cart_id)
+
+    def remove(self, cart_id, isbn13):
+        """Remove a line. Returns True if it existed."""
+        db = self.get_connection()
+        cur = db.execute('DELETE FROM cart_items WHERE cart_id = ? AND isbn13 = ?', (cart_id, isbn13))
+        self._commit_touched(db, cart_id)
+        return cur.rowcount > 0
+
+    def clear(self, cart_id):
+        """Remove every line and the coupon."""
+        db = self.get_connection()
+        db.execute('DELETE FROM cart_items WHERE cart_id = ?', (cart_id,))
+        db.execute('UPDATE carts SET coupon = NULL, updated_at = ? WHERE cart_id = ?', (_stamp(), cart_id))
+        db.commit()
+
+    def set_coupon(self, cart_id, coupon):
+        db = self.get_connection()
+        db.execute(
+            '''INSERT INTO carts (cart_id, coupon, updated_at, expires_at) VALUES (?, ?, ?, ?)
+               ON CONFLICT(cart_id) DO UPDATE SET
+                   coupon = excluded.coupon, updated_at = excluded.updated_at, expires_at = excluded.expires_at''',
+            (cart_id, json.dumps(coupon) if coupon else None, _stamp(), self._expiry())
+        )
+        db.commit()
+
+
+class DynamoCartStore:
+    """
+    Cart store backed by a DynamoDB table keyed on (cart_id, isbn13).
+    Rows carry an `expires_at` epoch attribute used as the table's TTL.
+    """
+
+    def __init__(self, table, ttl=CART_TTL_SECONDS):
+        self.table = table
+        self.ttl = ttl
+
+    def _expiry(self):
+        return int(time.time()) + self.ttl
+
+    def create_cart(self):
+        # No row is written until the first line or coupon arrives
+        return new_cart_id()
+
+    def load(self, cart_id):
+        """Return the Cart (items, coupon, version) with a single query."""
+        from boto3.dynamodb.conditions import Key
+
+        now = int(time.time())
+        kwargs = {'KeyConditionExpression': Key('cart_id').eq(cart_id)}
+        items, coupon = [], None
+        stamps, coupon_stamp = [], 0
+
+        while True:
+            response = self.table.query(**kwargs)
+            for row in response.get('Items', []):
+                if int(row.get('expires_at', 0)) < now:
+                    continue  # TTL deletion is lazy, skip expired rows
+                if row['isbn13'] == META_KEY:
+                    coupon = row.get('coupon') or None
+                    coupon_stamp = int(row.get('updated_at', 0))
+                    continue
+                # Prices stay Decimal end to end for the pricing engine
+                items.append({
+                    'isbn13': row['isbn13'],
+                    'title': row.get('title', ''),
+                    'price': row.get('price', Decimal('0')),
+                    'image': row.get('image', ''),
+                    'quantity': int(row.get('quantity', 0))
+                })
+                stamps.append(int(row.get('updated_at', 0)))
+            if 'LastEvaluatedKey' not in response:
+                break
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+        return Cart(items, coupon, cart_version(stamps, coupon_stamp))
+
+    def count(self, cart_id):
+        """Number of lines in the cart: a Select=COUNT query, no items returned."""
+        from boto3.dynamodb.conditions import Attr, Key
+
+        kwargs = {
+            'KeyConditionExpression': Key('cart_id').eq(cart_id),
+            # Lines have a quantity, the coupon row doesn't; expired rows await TTL deletion
+            'FilterExpression': Attr('quantity').exists() & Attr('expires_at').gte(int(time.time())),
+            'Select': 'COUNT'
+        }
+        count = 0
+        while True:
+            response = self.table.query(**kwargs)
+            count += response['Count']
+            if 'LastEvaluatedKey' not in response:
+                return count
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def increment(self, cart_id, isbn13, quantity):
+        """Add to an existing line. Returns False if the book isn't in the cart yet."""
+        from botocore.exceptions import ClientError
+
+        try:
+            self.table.update_item(
+                Key={'cart_id': cart_id, 'isbn13': isbn13},
+                UpdateExpression='ADD quantity :qty SET updated_at = :now, expires_at = :exp',
+                ConditionExpression='attribute_exists(isbn13)',
+                ExpressionAttributeValues={':qty': quantity, ':now': _stamp(), ':exp': self._expiry()}
+            )
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise
+
+    def add_line(self, cart_id, isbn13, title, price, image, quantity):
+        """Insert a new cart line (or add to it if a concurrent request beat us)."""
+        self.table.update_item(
+            Key={'cart_id': cart_id, 'isbn13': isbn13},
+            UpdateExpression=(
+                'ADD quantity :qty '
+                'SET title = :title, price = :price, image = :image, updated_at = :now, expires_at = :exp'
+            ),
+            ExpressionAttributeValues={
+                ':qty': quantity,
+                ':title': title,
+                ':price': price if isinstance(price, Decimal) else Decimal(str(price)),
+                ':image': image,
+                ':now': _stamp(),
+                ':exp': self._expiry()
+            }
+        )
+
+    def set_quantity(self, cart_id, isbn13, quantity):
+        from botocore.exceptions import ClientError
+
+        try:
+            self.table.update_item(
+                Key={'cart_id': cart_id, 'isbn13': isbn13},
+                UpdateExpression='SET quantity = :qty, updated_at = :now, expires_at = :exp',
+                ConditionExpression='attribute_exists(isbn13)',
+                ExpressionAttributeValues={':qty': quantity, ':now': _stamp(), ':exp': self._expiry()}
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+
+    def set_prices(self, cart_id, prices):
+        """
+        Store repriced line prices ({isbn13: Decimal}) after a catalog change,
+        as one TransactWriteItems call per TRANSACT_LIMIT lines.
+        """
+        # The resource's client takes plain Python values, like the Table API
+        updates = [
+            {'Update': {
+                'TableName': self.table.name,
+                'Key': {'cart_id': cart_id, 'isbn13': isbn13},
+                'UpdateExpression': 'SET price = :price, updated_at = :now',
+                'ExpressionAttributeValues': {':price': price, ':now': _stamp()}
+            }}
+            for isbn13, price in prices.items()
+        ]
+        for start in range(0, len(updates), TRANSACT_LIMIT):
+            self.table.meta.client.transact_write_items(TransactItems=updates[start:start + TRANSACT_LIMIT])
+
+    def remove(self, cart_id, isbn13):
+        """Remove a line. Returns True if it existed."""
+        response = self.table.delete_item(
+            Key={'cart_id': cart_id, 'isbn13': isbn13},
+            ReturnValues='ALL_OLD'
+        )
+        return 'Attributes' in response
+
+    def clear(self, cart_id):
+        """Remove every line and the coupon."""
+        from boto3.dynamodb.conditions import Key
+
+        kwargs = {
+            'KeyConditionExpression': Key('cart_id').eq(cart_id),
+            'ProjectionExpression': 'cart_id, isbn13'
+        }
+        with self.table.batch_writer() as batch:
+            while True:
+                response = self.table.query(**kwargs)
+                for row in response.get('Items', []):
+                    batch.delete_item(Key={'cart_id': row['cart_id'], 'isbn13': row['isbn13']})
+                if 'LastEvaluatedKey' not in response:
+                    break
+                kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def set_coupon(self, cart_id, coupon):
+        if not coupon:
+            self.table.delete_item(Key={'cart_id': cart_id, 'isbn13': META_KEY})
+            return
+
+        stored = {k: Decimal(str(v)) if isinstance(v, (int, float)) else v for k, v in coupon.items()}
+        self.table.put_item(Item={
+            'cart_id': cart_id,
+            'isbn13': META_KEY,
+            'coupon': stored,
+            'updated_at': _stamp(),
+            'expires_at': self._expiry()
+        })
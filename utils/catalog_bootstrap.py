@@ -0,0 +1,61 @@
+"""
+Catalog Bootstrap Document
+Everything catalog.js needs on first load in one response: display categories
+with book counts, the first /api/books page for the default filters and the
+featured sidebar. The document is one entry of the app's stale-while-
+revalidate catalog cache (utils/swr_cache.py), served as ready-made bytes: it
+follows the cache's soft/hard TTLs like the listing data it is built from, so
+writes from other workers or straight to the database show up within the soft
+TTL, and admin edits at once.
+"""
+import json
+import threading
+
+from utils.book_fragments import render_books_page
+
+# What catalog.js requests when the URL carries no filters
+DEFAULT_PRICE_MAX = 2000
+DEFAULT_SORT = 'rating'
+PER_PAGE = 12
+FEATURED = 3
+CACHE_KEY = ('catalog_bootstrap',)
+
+
+class BootstrapCache:
+    """The bootstrap document, kept in `catalog_cache` (an SWRCache); counts its own hits and builds."""
+
+    def __init__(self, catalog_cache):
+        self.catalog_cache = catalog_cache
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, build):
+        """Return the document, calling build() on a miss (or in the background once stale)."""
+        built = []
+
+        def load():
+            built.append(True)
+            return build()
+
+        body = self.catalog_cache.get(CACHE_KEY, load)
+        with self._lock:
+            if built:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return body
+
+
+def render_bootstrap(categories, page_fragments, total, featured_fragments):
+    """
+    Splice the document: `categories` is [(name, count)], the fragments are
+    cached /api/books fragments for the first page and the featured books.
+    """
+    pages = -(-total // PER_PAGE) or 1
+    books = render_books_page(page_fragments, total, 1, pages, PER_PAGE).rstrip(b'\n')
+    counts = json.dumps(
+        [{'count': count, 'name': name} for name, count in categories], separators=(',', ':')
+    ).encode()
+    return (b'{"books":' + books + b',"categories":' + counts +
+            b',"featured":[' + b','.join(featured_fragments) + b']}\n')
@@ -0,0 +1,599 @@
+"""
+Shared Catalog Snapshot
+The whole catalog packed into one immutable, memory-mapped file: fixed-width
+numeric columns, per-column string offsets into a single UTF-8 string heap,
+and a sorted ISBN key index for binary search. Mapped once in the master
+process (gunicorn preload_app), it is a handful of Python objects instead of
+one dict or Book per row, so forked workers keep sharing its pages: reading it
+never touches per-row refcounts, and memory stays flat as workers are added.
+Opening one is an mmap() and a header parse, however large the catalog.
+Listing filters run on bitmap indexes over its columns (utils/bitmap_index.py),
+built once when the file is written and stored in it: the per-sort orders and
+ranks, the bulk of them, are read in place from the shared pages, so a worker
+that swaps to a new file only copies the bitmaps themselves (rows/8 bytes
+each, about 2 MB and a few milliseconds per 100k books).
+
+Every worker follows the snapshot *file*: at most once per CHECK_INTERVAL it
+stats the file and swaps to a new one when it changed. A reload (admin POST,
+or CATALOG_SNAPSHOT_MAX_AGE expiry) rebuilds the file from the backend under
+an exclusive lock and atomically renames it into place, so all workers move
+to the new catalog without a restart. An expired file is rebuilt on a
+background thread while requests keep reading the mapped one; only a worker
+with no snapshot at all waits for a build.
+
+Orders don't rebuild the file. The worker taking an order appends the new
+stock level to a journal next to it (`<path>.stock`), and every worker
+replays the journal on its once-per-CHECK_INTERVAL check, overlaying those
+levels on its snapshot's stock column and in-stock bitmap: listing stock lags
+an order by about a second. A rebuild starts a new journal before it scans
+the backend, so a new file plus its journal is always the current stock.
+Bitmaps, and so this overlay, exist only with CATALOG_SNAPSHOT; without one
+app_aws.py (like app.py's SQL listing) filters the catalog row by row.
+`python build_catalog.py` writes the same file from data/books.csv, SQLite or
+DynamoDB.
+
+Layout (native byte order; built and read on the same host), all sections
+8-byte aligned:
+    header      magic, row count, build time
+    directory   (offset, length) of every section below
+    numeric     one fixed-width array per NUMERIC_COLUMNS entry, in row order
+    isbn index  isbn_keys (sorted isbn_key() values) and isbn_rows (their rows)
+    strings     one offsets array (rows + 1 entries) per STRING_COLUMNS entry
+    heap        the UTF-8 bytes every string offset points into
+    bitmaps     the BitmapIndex, as BITMAP_SECTIONS (bitmap_index.section_names())
+"""
+import array
+import bisect
+import heapq
+import mmap
+import os
+import struct
+import threading
+import time
+
+from flask import jsonify, redirect, request, session, url_for
+
+from utils.bitmap_index import BitmapIndex, bitmap, rows_of, section_names
+from utils.book import Book, normalized_category
+from utils.swr_cache import refresh_executor
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, single-process dev server
+    fcntl = None
+
+MAGIC = b'BKSNAP03'
+HEADER = struct.Struct('<8sQq')  # magic, rows, built_at (ns since epoch)
+SECTION = struct.Struct('<QQ')  # offset, length
+ALIGN = 8
+CHECK_INTERVAL = 1.0  # Seconds between stat() calls on the snapshot file
+STOCK_JOURNAL = '{}.stock'  # Order stock levels since the snapshot file's build, one "isbn13\tstock" per line
+
+# Book attribute -> array typecode
+NUMERIC_COLUMNS = (
+    ('published_year', 'd'), ('rating', 'd'), ('num_pages', 'q'),
+    ('ratings_count', 'q'), ('price', 'd'), ('stock', 'q'), ('flags', 'B'), ('title_rank', 'L')
+)
+STRING_COLUMNS = (
+    'isbn13', 'isbn10', 'title', 'subtitle', 'authors', 'categories', 'thumbnail', 'description',
+    'search'  # Lowercased "title NUL authors NUL description", for get_books()'s `q` filter
+)
+INDEX_SECTIONS = (('isbn_keys', 'Q'), ('isbn_rows', 'L'))
+
+# Optional attributes that are set (nonzero), for DynamoDB-style `exists()` filters
+HAS_RATING = 1
+HAS_YEAR = 2
+REQUIRE_FLAGS = {'average_rating': HAS_RATING, 'published_year': HAS_YEAR}
+
+# get_books() sort names -> (sort columns, most significant first; descending)
+SORTS = {
+    'price_low': (('price',), False),
+    'price_high': (('price',), True),
+    'az': (('title_rank',), False),
+    'za': (('title_rank',), True),
+    'newest': (('published_year',), True),
+    'oldest': (('published_year',), False),
+    'rating': (('rating', 'ratings_count'), True),
+    'popular': (('ratings_count',), True),
+}
+
+BITMAP_SECTIONS = section_names(SORTS)
+SECTIONS = (tuple(name for name, _ in NUMERIC_COLUMNS + INDEX_SECTIONS) + STRING_COLUMNS + ('heap',)
+            + BITMAP_SECTIONS)
+
+DEFAULTS = {
+    'CATALOG_SNAPSHOT': None,  # Snapshot file path; disabled when unset
+    'CATALOG_SNAPSHOT_MAX_AGE': 300,  # Seconds before a worker rebuilds the file; 0 leaves it to build_catalog.py
+}
+
+
+def reset_stock_journal(path):
+    """Start the stock journal of the snapshot at `path` afresh, before reading the backend for a new file."""
+    try:
+        os.remove(STOCK_JOURNAL.format(path))
+    except FileNotFoundError:
+        pass
+
+
+def isbn_key(isbn):
+    """Fixed-width search key for an ISBN: its digits as a 64-bit integer (not unique; matches are verified)."""
+    digits = ''.join(filter(str.isdigit, isbn))
+    return int(digits) % 2 ** 64 if digits else 0
+
+
+def encode(books, built_at=None):
+    """Pack Books into snapshot bytes, bitmap index included."""
+    rows = sorted(books, key=lambda book: book.isbn13)
+    built_at = built_at or time.time_ns()
+    count = len(rows)
+
+    sections = {}
+    for name, code in NUMERIC_COLUMNS:
+        if name == 'flags':
+            values = ((HAS_RATING if b.rating else 0) | (HAS_YEAR if b.published_year else 0) for b in rows)
+        elif name == 'title_rank':  # Dense rank in A-Z title order, so sorting by title needs no strings
+            ranks = {title: rank for rank, title in enumerate(sorted({b.title for b in rows}))}
+            values = (ranks[b.title] for b in rows)
+        else:
+            values = (getattr(b, name) for b in rows)
+        sections[name] = array.array(code, values).tobytes()
+
+    index = sorted((isbn_key(book.isbn13), i) for i, book in enumerate(rows))
+    sections['isbn_keys'] = array.array('Q', (key for key, _ in index)).tobytes()
+    sections['isbn_rows'] = array.array('L', (row for _, row in index)).tobytes()
+
+    heap = bytearray()
+    for name in STRING_COLUMNS:
+        offsets = array.array('Q', [0] * (count + 1))
+        for i, book in enumerate(rows):
+            offsets[i] = len(heap)
+            if name == 'search':
+                heap += '\0'.join((book.title, book.authors, book.description)).lower().encode()
+            else:
+                heap += getattr(book, name).encode()
+        offsets[count] = len(heap)
+        sections[name] = offsets.tobytes()
+    sections['heap'] = bytes(heap)
+
+    columns = CatalogSnapshot(pack(sections, count, built_at), indexed=False)
+    sections.update(BitmapIndex(columns, SORTS).sections())
+    return pack(sections, count, built_at)
+
+
+def pack(sections, count, built_at):
+    """Lay named sections out as a snapshot file (absent ones empty)."""
+    position = HEADER.size + SECTION.size * len(SECTIONS)
+    directory = []
+    for name in SECTIONS:
+        position += -position % ALIGN
+        directory.append((position, len(sections.get(name, b''))))
+        position += directory[-1][1]
+
+    out = bytearray(HEADER.pack(MAGIC, count, built_at))
+    for entry in directory:
+        out += SECTION.pack(*entry)
+    for name, (offset, _) in zip(SECTIONS, directory):
+        out += b'\0' * (offset - len(out))
+        out += sections.get(name, b'')
+    return bytes(out)
+
+
+class CatalogSnapshot:
+    """
+    Read-only view over snapshot bytes (or an mmap); rows are indexed 0..len-1
+    in ISBN order. set_stock() overlays newer stock levels in this process only.
+    """
+
+    _index_codes = dict(INDEX_SECTIONS)
+
+    def __init__(self, data, path=None, indexed=True):
+        magic, self.rows, self.built_at = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError(f"{path or 'buffer'} is not a catalog snapshot")
+        self.data = data
+        self.path = path
+        self._categories = {}  # raw categories bytes -> normalized category
+        self._stock = {}  # row -> stock level set since the file was built
+        self._bitmaps = None
+        self._bitmaps_lock = threading.Lock()
+        view = memoryview(data)
+
+        self.columns = {}
+        self.index = {}
+        self._stored_bitmaps = {} if indexed else None  # Section views for BitmapIndex
+        for position, name in enumerate(SECTIONS):
+            offset, length = SECTION.unpack_from(data, HEADER.size + position * SECTION.size)
+            section = view[offset:offset + length]
+            if name == 'heap':
+                self._heap = section
+                self._heap_start = offset
+            elif name in STRING_COLUMNS:
+                self.columns[name] = section.cast('Q')
+            elif name in self._index_codes:
+                self.index[name] = section.cast(self._index_codes[name])
+            elif name in BITMAP_SECTIONS:
+                if indexed:
+                    self._stored_bitmaps[name] = section
+            else:
+                self.columns[name] = section.cast(dict(NUMERIC_COLUMNS)[name])
+
+    @classmethod
+    def from_books(cls, books):
+        return cls(encode(books))
+
+    @classmethod
+    def load(cls, path):
+        """Map the file read-only: its pages live in the OS page cache, shared by every process."""
+        with open(path, 'rb') as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), path)
+
+    def write(self, path):
+        """Atomically replace `path` with this snapshot."""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(self.data[:])
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def __len__(self):
+        return self.rows
+
+    def string(self, column, index):
+        offsets = self.columns[column]
+        return str(self._heap[offsets[index]:offsets[index + 1]], 'utf-8')
+
+    def book(self, index):
+        columns = self.columns
+        string = self.string
+        return Book(
+            string('isbn13', index), string('isbn10', index), string('title', index),
+            string('subtitle', index), string('authors', index), string('categories', index),
+            string('thumbnail', index), string('description', index),
+            columns['published_year'][index], columns['rating'][index], columns['num_pages'][index],
+            columns['ratings_count'][index], columns['price'][index], self._stock.get(index, columns['stock'][index])
+        )
+
+    def books(self, require=None):
+        """Every book as a Book, optionally only those with `require` (a REQUIRE_FLAGS key) set."""
+        if require is None:
+            return [self.book(i) for i in range(self.rows)]
+        flag = REQUIRE_FLAGS[require]
+        flags = self.columns['flags']
+        return [self.book(i) for i in range(self.rows) if flags[i] & flag]
+
+    @property
+    def bitmaps(self):
+        """This snapshot's BitmapIndex, read from its file on first use."""
+        if self._bitmaps is None:
+            with self._bitmaps_lock:
+                if self._bitmaps is None:
+                    self._bitmaps = BitmapIndex(self, SORTS, self._stored_bitmaps)
+        return self._bitmaps
+
+    def set_stock(self, isbn13, stock):
+        """Overlay a book's current stock level (from an order) on its row and the in-stock bitmap."""
+        row = self.find(isbn13)
+        if row < 0:
+            return False  # Added since the file was built
+        index = self.bitmaps
+        with self._bitmaps_lock:
+            self._stock[row] = stock
+            if stock > 0:
+                index.in_stock |= 1 << row
+            else:
+                index.in_stock &= ~(1 << row)
+        return True
+
+    def match(self, query=None, category=None, price_max=None, author=None, in_stock=False):
+        """
+        Bitmap of the rows passing get_books()'s filters: the column filters are
+        ANDed bitmaps, and only the rows left are checked for the author.
+        """
+        index = self.bitmaps
+        mask = index.all
+        if in_stock:
+            mask &= index.in_stock
+        if price_max is not None:
+            mask &= index.price_at_most(price_max)
+        if category:
+            mask &= index.categories.get(category, 0)
+        if query and mask:
+            mask &= bitmap(self.containing('search', query), self.rows)
+        if author and mask:
+            mask = bitmap((i for i in rows_of(mask) if author in self.string('authors', i).lower()), self.rows)
+        return mask
+
+    def select(self, query=None, category=None, price_max=None, author=None, in_stock=False, sort=None,
+               limit=None):
+        """Row indices passing get_books()'s filters in its sort order (the first `limit` of them)."""
+        return self.bitmaps.ranked(self.match(query, category, price_max, author, in_stock), sort, limit)
+
+    def containing(self, column, text):
+        """Rows whose `column` contains `text`: one find() sweep over the column's part of the heap."""
+        needle = text.encode()
+        offsets = self.columns[column]
+        data, base = self.data, self._heap_start
+        end = base + offsets[self.rows]
+        rows = []
+        position = data.find(needle, base + offsets[0], end)
+        while position != -1:
+            row = bisect.bisect_right(offsets, position - base) - 1
+            if position - base + len(needle) <= offsets[row + 1]:  # Not straddling into the next row
+                rows.append(row)
+                position = data.find(needle, base + offsets[row + 1], end)
+            else:
+                position = data.find(needle, position + 1, end)
+        return rows
+
+    def top(self, n, sort, require=None):
+        """The first `n` Books in a SORTS order, optionally only those with `require` set."""
+        rows = range(self.rows)
+        if require is not None:
+            flag, flags = REQUIRE_FLAGS[require], self.columns['flags']
+            rows = [i for i in rows if flags[i] & flag]
+        sort_columns, reverse = SORTS[sort]
+        keys = [self.columns[name] for name in sort_columns]
+        pick = heapq.nlargest if reverse else heapq.nsmallest
+        return [self.book(i) for i in pick(n, rows, key=lambda i: [key[i] for key in keys])]
+
+    def mean(self, column, require=None):
+        """Average of a numeric column (over rows with `require` set); 0 for none."""
+        values = self.columns[column]
+        if require is None:
+            return sum(values) / self.rows if self.rows else 0
+        flag, flags = REQUIRE_FLAGS[require], self.columns['flags']
+        picked = [values[i] for i in range(self.rows) if flags[i] & flag]
+        return sum(picked) / len(picked) if picked else 0
+
+    def category(self, index):
+        """Normalized display category of a row (raw categories decoded once per distinct value)."""
+        offsets = self.columns['categories']
+        raw = self._heap[offsets[index]:offsets[index + 1]].tobytes()
+        category = self._categories.get(raw)
+        if category is None:
+            category = self._categories[raw] = normalized_category(raw.decode())
+        return category
+
+    def find(self, isbn13):
+        """Row index of an ISBN, or -1: a C bisect over the fixed-width key index, no string decoding."""
+        keys, rows = self.index['isbn_keys'], self.index['isbn_rows']
+        key = isbn_key(isbn13)
+        position = bisect.bisect_left(keys, key)
+        if position < self.rows and keys[position] == key:
+            target = isbn13.encode()
+            offsets, heap = self.columns['isbn13'], self._heap
+            while position < self.rows and keys[position] == key:
+                row = rows[position]
+                if heap[offsets[row]:offsets[row + 1]] == target:
+                    return row
+                position += 1
+        return -1
+
+    def get(self, isbn13):
+        index = self.find(isbn13)
+        return self.book(index) if index >= 0 else None
+
+
+class SnapshotManager:
+    """
+    This process's current CatalogSnapshot, kept in step with the shared file;
+    `app.extensions['catalog_snapshot']`. `build()` returns the catalog's Books.
+    """
+
+    def __init__(self, app=None, build=None, on_swap=None, on_stock=None, flights=None):
+        self.build = build
+        self.on_swap = on_swap  # Called with the new snapshot whenever this process swaps
+        self.on_stock = on_stock  # Called after stock levels from the journal are overlaid
+        self.flights = flights  # utils.single_flight.SingleFlight shared with the app, if any
+        self.snapshot = None
+        self.path = None
+        self.swaps = 0
+        self.rebuilds = 0
+        self._identity = None  # (st_ino, st_mtime_ns) of the loaded file
+        self._next_check = 0.0
+        self._rebuilding = False  # A background rebuild is queued or running
+        self._journal = (None, 0)  # (st_ino, bytes replayed) of the stock journal
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        for key, value in DEFAULTS.items():
+            app.config.setdefault(key, value)
+        self.path = app.config['CATALOG_SNAPSHOT']
+        self.max_age = float(app.config['CATALOG_SNAPSHOT_MAX_AGE'])
+        app.add_url_rule('/admin/catalog/snapshot', 'admin_catalog_snapshot', self.admin_view,
+                         methods=['GET', 'POST'])
+        app.extensions['catalog_snapshot'] = self
+        if self.enabled and os.path.exists(self.path):
+            # Loaded at import, so under gunicorn's preload_app every worker shares the master's buffer
+            try:
+                self._load()
+            except ValueError:
+                pass  # An older format: the first check rebuilds it
+            self._next_check = time.monotonic() + CHECK_INTERVAL
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    def preload(self):
+        """Load (or build) the snapshot now, e.g. in the master before workers fork."""
+        with self._lock:
+            self._next_check = time.monotonic() + CHECK_INTERVAL
+            self._refresh(blocking=True)
+            if self.snapshot is not None:
+                self.snapshot.bitmaps.prepare()
+        return self.snapshot
+
+    def current(self):
+        """The snapshot to serve; picks up a newer file at most once per CHECK_INTERVAL."""
+        if time.monotonic() >= self._next_check or self.snapshot is None:
+            self._coalesced(self.flights and self.flights.do, 'snapshot_refresh', self._check)
+        return self.snapshot
+
+    def reload(self):
+        """Rebuild the file from the backend; every worker swaps to it on its next check."""
+        # Reloads requested during a rebuild (a burst of admin edits) share the one after it
+        return self._coalesced(self.flights and self.flights.do_fresh, 'snapshot_rebuild', self._force_rebuild)
+
+    def _coalesced(self, do, kind, fn):
+        return do((kind, self.path), fn) if do else fn()
+
+    def _check(self):
+        with self._lock:
+            if time.monotonic() >= self._next_check or self.snapshot is None:
+                self._next_check = time.monotonic() + CHECK_INTERVAL
+                self._refresh(blocking=self.snapshot is None)
+                self._replay()
+        return self.snapshot
+
+    def record_stock(self, isbn13, stock):
+        """Note an order's new stock level: overlaid here now, in every other worker on its next check."""
+        if not self.enabled:
+            return
+        with open(STOCK_JOURNAL.format(self.path), 'ab') as journal:
+            journal.write(f"{isbn13}\t{int(stock)}\n".encode())  # One O_APPEND write: lines never interleave
+        snapshot = self.snapshot
+        if snapshot is not None:
+            snapshot.set_stock(isbn13, int(stock))
+
+    def _replay(self):
+        """Overlay the journal lines written since the last replay (all of them after a swap or a new journal)."""
+        snapshot = self.snapshot
+        if snapshot is None:
+            return
+        try:
+            with open(STOCK_JOURNAL.format(self.path), 'rb') as journal:
+                inode = os.fstat(journal.fileno()).st_ino
+                position = self._journal[1] if inode == self._journal[0] else 0
+                journal.seek(position)
+                data = journal.read()
+        except FileNotFoundError:
+            return
+        end = data.rfind(b'\n') + 1  # A line still being written waits for the next check
+        for line in data[:end].splitlines():
+            isbn13, stock = line.split(b'\t')
+            snapshot.set_stock(isbn13.decode(), int(stock))
+        self._journal = (inode, position + end)
+        if end and self.on_stock is not None:
+            self.on_stock()
+
+    def _force_rebuild(self):
+        self._publish(blocking=True, force=True)
+        with self._lock:
+            self._load()
+        return self.snapshot
+
+    def _refresh(self, blocking):
+        stat = self._stat()
+        if stat is None or self._expired(stat):
+            if self.snapshot is not None and not blocking:
+                self._rebuild_in_background()  # Keep serving the mapped snapshot until the new file lands
+                return
+            try:
+                self._publish(blocking)
+            except Exception as e:
+                if self.snapshot is None:
+                    raise
+                print(f"⚠️  Catalog snapshot rebuild failed, serving the previous one: {e}")
+                return
+            stat = self._stat()
+            if stat is None:
+                return
+        if (stat.st_ino, stat.st_mtime_ns) != self._identity:
+            try:
+                self._load()
+            except ValueError as e:
+                print(f"⚠️  {e} (written by an older build), rebuilding it")
+                self._publish(blocking=True, force=True)
+                self._load()
+
+    def _rebuild_in_background(self):
+        """Queue one rebuild on the refresh thread; the check after it publishes swaps to the new file."""
+        if self._rebuilding:
+            return
+        self._rebuilding = True
+
+        def rebuild():
+            try:
+                self._publish(blocking=False)
+            except Exception as e:
+                print(f"⚠️  Catalog snapshot rebuild failed, serving the previous one: {e}")
+            finally:
+                self._rebuilding = False
+                self._next_check = 0.0
+
+        refresh_executor().submit(rebuild)
+
+    def _publish(self, blocking, force=False):
+        """
+        Build and write a new file under the cross-process lock (loading nothing);
+        False if another process is at it, True if it's done or was already fresh.
+        """
+        with open(f"{self.path}.lock", 'a') as lock_file:  # Closing it releases the flock
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+                except BlockingIOError:
+                    return False
+            if not force and self._published() is not None:
+                return True  # Another worker rebuilt it while we waited for the lock
+
+            reset_stock_journal(self.path)  # Orders from here on may be missing from the scan
+            start = time.perf_counter()
+            snapshot = CatalogSnapshot.from_books(self.build())
+            snapshot.write(self.path)
+            self.rebuilds += 1
+            print(f"📚 Catalog snapshot rebuilt: {len(snapshot)} books, {len(snapshot.data) / 1e6:.1f} MB "
+                  f"in {time.perf_counter() - start:.2f}s")
+            return True
+
+    def _stat(self):
+        try:
+            return os.stat(self.path)
+        except FileNotFoundError:
+            return None
+
+    def _published(self):
+        """stat() of a fresh snapshot file other than the one loaded here, else None."""
+        stat = self._stat()
+        if stat is None or self._expired(stat) or (stat.st_ino, stat.st_mtime_ns) == self._identity:
+            return None
+        return stat
+
+    def _expired(self, stat):
+        return self.max_age > 0 and time.time() - stat.st_mtime > self.max_age
+
+    def _load(self):
+        # Identity and mapping from one fd, so a file renamed into place meanwhile is picked up next check
+        with open(self.path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            snapshot = CatalogSnapshot(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), self.path)
+        self.snapshot = snapshot
+        self._identity = (stat.st_ino, stat.st_mtime_ns)
+        self._journal = (None, 0)  # Replay this file's journal from the start
+        self.swaps += 1
+        if self.on_swap is not None:
+            self.on_swap(snapshot)
+
+    def stats(self):
+        snapshot = self.snapshot
+        return {
+            'enabled': self.enabled,
+            'path': self.path,
+            'pid': os.getpid(),
+            'books': len(snapshot) if snapshot else None,
+            'bytes': len(snapshot.data) if snapshot else None,
+            'built_at': snapshot.built_at / 1e9 if snapshot else None,
+            'swaps': self.swaps,
+            'rebuilds': self.rebuilds,
+        }
+
+    def admin_view(self):
+        if 'admin_id' not in session:
+            return redirect(url_for('admin_login'))
+        if request.method == 'POST' and self.enabled:
+            self.reload()
+        return jsonify(self.stats())
@@ -0,0 +1,111 @@
+"""
+Response Compression
+Negotiates gzip/brotli from Accept-Encoding for HTML and JSON responses.
+
+Views marked with @precompressed keep their compressed bodies in a bounded
+cache keyed by a digest of the uncompressed body, so a page that renders the
+same bytes again (catalog pages, homepage, book details) is compressed once.
+Brotli is optional: without the `brotli` package only gzip is offered.
+"""
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # Optional dependency
+    brotli = None
+
+DEFAULTS = {
+    'COMPRESS_MIN_SIZE': 500,  # Bytes; smaller bodies are sent as-is
+    'COMPRESS_GZIP_LEVEL': 6,
+    'COMPRESS_BROTLI_LEVEL': 5,
+    'COMPRESS_MIMETYPES': ('text/html', 'application/json'),
+    'COMPRESS_CACHE_ENTRIES': 1024,
+}
+
+
+def precompressed(view):
+    """Mark a view whose responses are worth caching in compressed form."""
+    view.precompressed = True
+    return view
+
+
+class Compressor:
+    """after_request hook that compresses responses and caches cacheable ones."""
+
+    def __init__(self, app=None):
+        self._cache = OrderedDict()  # (digest, encoding) -> compressed bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        for key, value in DEFAULTS.items():
+            app.config.setdefault(key, value)
+        self.app = app
+        self.encodings = ('br', 'gzip') if brotli else ('gzip',)
+        app.after_request(self.after_request)
+        app.extensions['compressor'] = self
+
+    def compress(self, data, encoding):
+        config = self.app.config
+        if encoding == 'br':
+            return brotli.compress(data, quality=config['COMPRESS_BROTLI_LEVEL'])
+        return gzip.compress(data, compresslevel=config['COMPRESS_GZIP_LEVEL'], mtime=0)
+
+    def _cached_compress(self, data, encoding):
+        key = (hashlib.blake2b(data, digest_size=16).digest(), encoding)
+
+        with self._lock:
+            body = self._cache.get(key)
+            if body is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return body
+
+        body = self.compress(data, encoding)
+
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = body
+            if len(self._cache) > self.app.config['COMPRESS_CACHE_ENTRIES']:
+                self._cache.popitem(last=False)
+        return body
+
+    def after_request(self, response):
+        config = self.app.config
+
+        if (response.mimetype not in config['COMPRESS_MIMETYPES']
+                or response.direct_passthrough
+                or response.is_streamed
+                or 'Content-Encoding' in response.headers):
+            return response
+
+        response.vary.add('Accept-Encoding')
+
+        if response.status_code != 200 or request.method == 'HEAD':
+            return response
+
+        encoding = request.accept_encodings.best_match(self.encodings)
+        if not encoding:
+            return response
+
+        data = response.get_data()
+        if len(data) < config['COMPRESS_MIN_SIZE']:
+            return response
+
+        view = self.app.view_functions.get(request.endpoint)
+        if getattr(view, 'precompressed', False):
+            body = self._cached_compress(data, encoding)
+        else:
+            body = self.compress(data, encoding)
+
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        return response
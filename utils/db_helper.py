@@ -1,14 +1,59 @@
 # utils/db_helper.py
 import sqlite3
+import time
 from flask import g, current_app
 
+DEFAULT_DATABASE_PATH = 'instance/bookstore.db'
+
+
+def _timed(connection, method, sql, args):
+    start = time.perf_counter()
+    try:
+        return method(sql, *args)
+    finally:
+        elapsed = time.perf_counter() - start
+        params = args[0] if args else ()
+        for listener in connection.listeners:
+            listener(connection, sql, params, elapsed)
+
+
+class TimedCursor(sqlite3.Cursor):
+    def execute(self, sql, *args):
+        return _timed(self.connection, super().execute, sql, args)
+
+    def executemany(self, sql, *args):
+        return _timed(self.connection, super().executemany, sql, args)
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection that reports every statement to `listeners(connection, sql, params, seconds)`."""
+    listeners = ()
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, *args):
+        return _timed(self, super().execute, sql, args)
+
+    def executemany(self, sql, *args):
+        return _timed(self, super().executemany, sql, args)
+
+    def executescript(self, sql):
+        return _timed(self, super().executescript, sql, ())
+
+
 def get_db():
     """Get database connection for current request."""
     if 'db' not in g:
+        # Extensions such as /metrics and the slow-query log register statement listeners
+        listeners = current_app.extensions.get('sql_listeners')
         g.db = sqlite3.connect(
-            'instance/bookstore.db',
-            detect_types=sqlite3.PARSE_DECLTYPES
+            current_app.config.get('DATABASE_PATH', DEFAULT_DATABASE_PATH),
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            factory=TimedConnection if listeners else sqlite3.Connection
         )
+        if listeners:
+            g.db.listeners = listeners
         g.db.row_factory = sqlite3.Row  # Access columns by name
     return g.db
 
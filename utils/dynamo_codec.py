@@ -0,0 +1,48 @@
+"""
+DynamoDB Low-Level Codec
+Turns low-level attribute values ({'N': '29.99'}, {'S': 'Dune'}, ...) straight
+into native Python values and Book objects in one step, skipping boto3's
+Decimal deserializer and the decimal_to_float() walk.
+"""
+from utils.book import Book, BOOK_COLUMNS
+
+BOOK_COLUMN_SET = frozenset(BOOK_COLUMNS)
+
+
+def native_value(value):
+    """Convert one low-level attribute value. Numbers become floats, like decimal_to_float()."""
+    if 'S' in value:
+        return value['S']
+    if 'N' in value:
+        return float(value['N'])
+    if 'BOOL' in value:
+        return value['BOOL']
+    if 'NULL' in value:
+        return None
+    if 'M' in value:
+        return {k: native_value(v) for k, v in value['M'].items()}
+    if 'L' in value:
+        return [native_value(v) for v in value['L']]
+    if 'SS' in value:
+        return set(value['SS'])
+    if 'NS' in value:
+        return {float(n) for n in value['NS']}
+    if 'B' in value:
+        return value['B']
+    if 'BS' in value:
+        return set(value['BS'])
+    raise TypeError(f"Unknown DynamoDB attribute value: {value!r}")
+
+
+def deserialize_item(item):
+    """Convert a low-level item to a plain dict of native values."""
+    if not item:
+        return None
+    return {name: native_value(value) for name, value in item.items()}
+
+
+def deserialize_book(item):
+    """Convert a low-level Books item straight to a Book, decoding only the book columns."""
+    if not item:
+        return None
+    return Book(**{name: native_value(value) for name, value in item.items() if name in BOOK_COLUMN_SET})
@@ -0,0 +1,198 @@
+"""
+Streaming Exports
+Admin downloads of the catalog and order history at /admin/export/<dataset>
+(books, orders, order_items) as NDJSON or CSV, optionally limited to rows
+created since a date (`since=2024-01-01`). Rows are read from a SQLite cursor
+or from DynamoDB scan pages and encoded in ~64 KB chunks while the response is
+sent, so memory stays flat however large the table. Clients that accept gzip
+get a gzip stream compressed chunk by chunk (the Compressor leaves streamed
+responses alone).
+
+Usage:
+    curl -b session.txt 'http://127.0.0.1:5000/admin/export/orders?format=csv&since=2024-06-01' --compressed
+"""
+import csv
+import io
+import json
+import sqlite3
+import zlib
+from datetime import datetime, timezone
+
+from flask import Response, jsonify, redirect, request, session, stream_with_context, url_for
+
+from utils.book import BOOK_COLUMNS
+from utils.dynamo_codec import deserialize_item
+
+DATASETS = {
+    'books': BOOK_COLUMNS + ('created_at',),
+    'orders': (
+        'order_id', 'user_id', 'guest_email', 'guest_name', 'guest_phone', 'subtotal',
+        'discount', 'shipping', 'tax', 'total', 'coupon_code', 'status', 'created_at'
+    ),
+    'order_items': ('order_id', 'isbn13', 'title', 'price', 'quantity', 'subtotal'),
+}
+FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+CHUNK_SIZE = 64 * 1024
+GZIP_LEVEL = 6
+
+# Streamed in primary key order; order items are filtered on their order's date
+SQLITE_QUERIES = {
+    'books': 'SELECT {columns} FROM books{where} ORDER BY id',
+    'orders': 'SELECT {columns} FROM orders{where} ORDER BY id',
+    'order_items': 'SELECT {columns} FROM order_items JOIN orders USING (order_id){where} ORDER BY order_items.id',
+}
+
+
+def parse_since(value):
+    """`since=` as a naive datetime (ISO 8601 date or timestamp, aware ones in UTC); None if absent."""
+    if not value:
+        return None
+    since = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return since
+
+
+def sqlite_rows(database_path, dataset, since=None):
+    """
+    Rows of `dataset` stepped off a SQLite cursor as the response is written.
+    The stream outlives the request's connection, so it reads on its own.
+    """
+    columns = ', '.join(f'{dataset}.{column}' for column in DATASETS[dataset])
+    where, params = '', ()
+    if since is not None:
+        # created_at is SQLite's 'YYYY-MM-DD HH:MM:SS'; datetime() also accepts the 'T' form
+        dated = 'books' if dataset == 'books' else 'orders'
+        where, params = f' WHERE datetime({dated}.created_at) >= datetime(?)', (since.isoformat(' '),)
+
+    db = sqlite3.connect(database_path)
+    db.row_factory = sqlite3.Row
+    try:
+        yield from db.execute(SQLITE_QUERIES[dataset].format(columns=columns, where=where), params)
+    finally:
+        db.close()
+
+
+def dynamodb_rows(client, tables, dataset, since=None):
+    """
+    Rows of `dataset` from paginated low-level scans, one page in memory at a
+    time. `tables` maps dataset names to DynamoDB table names. Order items
+    carry no date, so with `since` they are queried per matching order.
+    """
+    if dataset == 'order_items' and since is not None:
+        for order in dynamodb_rows(client, tables, 'orders', since):
+            kwargs = {
+                'TableName': tables['order_items'],
+                'KeyConditionExpression': 'order_id = :order_id',
+                'ExpressionAttributeValues': {':order_id': {'S': order['order_id']}},
+            }
+            yield from _pages(client.query, kwargs)
+        return
+
+    kwargs = {'TableName': tables[dataset]}
+    if since is not None:
+        # Written with datetime.now().isoformat(), which sorts as a string
+        kwargs.update(
+            FilterExpression='#created_at >= :since',
+            ExpressionAttributeNames={'#created_at': 'created_at'},
+            ExpressionAttributeValues={':since': {'S': since.isoformat()}},
+        )
+    yield from _pages(client.scan, kwargs)
+
+
+def _pages(operation, kwargs):
+    while True:
+        response = operation(**kwargs)
+        for item in response.get('Items', []):
+            yield deserialize_item(item)
+        if 'LastEvaluatedKey' not in response:
+            return
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def ndjson_lines(rows, columns):
+    for row in rows:
+        yield json.dumps({column: _value(row, column) for column in columns}, default=str) + '\n'
+
+
+def csv_lines(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([_value(row, column) for column in columns])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _value(row, column):
+    try:
+        return row[column]
+    except (KeyError, IndexError):  # Attributes DynamoDB items don't have
+        return None
+
+
+def chunked(lines, size=CHUNK_SIZE):
+    """Join encoded lines into chunks of about `size` bytes."""
+    buffer, length = [], 0
+    for line in lines:
+        buffer.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(buffer).encode()
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer).encode()
+
+
+def gzipped(chunks, level=GZIP_LEVEL):
+    """Compress a chunk stream into one gzip member without holding it in memory."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class Exporter:
+    """Registers /admin/export/<dataset>; `rows(dataset, since)` supplies each app's rows."""
+
+    def __init__(self, app=None, rows=None):
+        self.rows = rows
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.add_url_rule('/admin/export/<dataset>', 'admin_export', self.export_view)
+        app.extensions['exporter'] = self
+
+    def export_view(self, dataset):
+        if 'admin_id' not in session:
+            return redirect(url_for('admin_login'))
+
+        fmt = request.args.get('format', 'ndjson')
+        if dataset not in DATASETS or fmt not in FORMATS:
+            return jsonify({'error': f"Export one of {', '.join(DATASETS)} as {' or '.join(FORMATS)}"}), 404
+        try:
+            since = parse_since(request.args.get('since'))
+        except ValueError:
+            return jsonify({'error': 'since must be an ISO 8601 date or timestamp'}), 400
+
+        columns = DATASETS[dataset]
+        encode = ndjson_lines if fmt == 'ndjson' else csv_lines
+        body = chunked(encode(self.rows(dataset, since), columns))
+
+        gzip_accepted = request.accept_encodings['gzip'] > 0
+        if gzip_accepted:
+            body = gzipped(body)
+
+        response = Response(stream_with_context(body), mimetype=FORMATS[fmt])
+        response.headers['Content-Disposition'] = f'attachment; filename={dataset}.{fmt}'
+        response.headers['Cache-Control'] = 'no-store'
+        response.vary.add('Accept-Encoding')
+        if gzip_accepted:
+            response.headers['Content-Encoding'] = 'gzip'
+        return response
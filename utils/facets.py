@@ -0,0 +1,70 @@
+"""
+Catalog Facet Counts
+Book counts per facet value (display category, price bucket, in stock, rating
+bucket) for /api/books?facets=true, computed in one pass over the books that
+pass the search and author filters. Each facet is counted under every other
+active filter but not its own, so the sidebar shows what picking another
+category or price range would return. Rows come in pre-bucketed, so app.py can
+feed one GROUP BY result through the same pass that app_aws.py feeds books or
+snapshot rows through.
+"""
+import json
+from bisect import bisect_right
+
+from utils.category_mapper import get_display_categories
+
+PRICE_BOUNDS = (400, 500, 750, 1000)  # Bucket i is [bound i-1, bound i); the last one is open-ended
+RATING_BOUNDS = (3.0, 3.5, 4.0, 4.5)
+
+
+def bucket_sql(column, bounds):
+    """SQL for the bucket index bisect_right(bounds, column) gives."""
+    whens = ' '.join(f'WHEN COALESCE({column}, 0) < {bound} THEN {i}' for i, bound in enumerate(bounds))
+    return f'CASE {whens} ELSE {len(bounds)} END'
+
+
+def book_rows(books, price_max=None):
+    """Facet rows for (category, price, stock, rating) tuples, one per book."""
+    for category, price, stock, rating in books:
+        yield ((category,), bisect_right(PRICE_BOUNDS, price), price_max is None or price <= price_max,
+               stock > 0, bisect_right(RATING_BOUNDS, rating), 1)
+
+
+def count_facets(rows, category=None, price_max=None, in_stock=False):
+    """
+    Facets document (JSON bytes) for `rows` of (categories, price bucket,
+    within price_max, in stock, rating bucket, count).
+    """
+    categories = dict.fromkeys(get_display_categories(), 0)
+    prices = [0] * (len(PRICE_BOUNDS) + 1)
+    ratings = [0] * (len(RATING_BOUNDS) + 1)
+    stocked_books = 0
+    for row_categories, price, within_price, stocked, rating, count in rows:
+        in_category = not category or category in row_categories
+        in_price = within_price or price_max is None
+        in_stock_filter = stocked or not in_stock
+        if in_price and in_stock_filter:
+            for name in row_categories:
+                if name in categories:
+                    categories[name] += count
+        if in_category and in_stock_filter:
+            prices[price] += count
+        if in_category and in_price:
+            if stocked:
+                stocked_books += count
+            if in_stock_filter:
+                ratings[rating] += count
+    return render_facets(categories, prices, stocked_books, ratings)
+
+
+def render_facets(categories, prices, stocked_books, ratings):
+    def buckets(bounds, counts):
+        edges = (0,) + bounds + (None,)
+        return [{'count': count, 'max': edges[i + 1], 'min': edges[i]} for i, count in enumerate(counts)]
+
+    return json.dumps({
+        'category': [{'count': count, 'name': name} for name, count in categories.items()],
+        'in_stock': stocked_books,
+        'price': buckets(PRICE_BOUNDS, prices),
+        'rating': buckets(RATING_BOUNDS, ratings),
+    }, separators=(',', ':'), sort_keys=True).encode()
@@ -1,18 +1,22 @@
 # utils/helpers.py
-import pandas as pd
+import math
 from functools import wraps
 from flask import redirect, url_for, flash
 from flask_login import current_user
 
+def is_missing(value):
+    """None or NaN (what pandas gives empty CSV cells), without importing pandas."""
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
 def calculate_book_price(num_pages, base_price=299, price_per_page=0.5):
     """Calculate book price based on page count."""
-    if pd.isna(num_pages) or num_pages is None:
+    if is_missing(num_pages):
         return base_price + 100
     return int(base_price + (num_pages * price_per_page))
 
 def format_authors(authors_string):
     """Format authors string for display."""
-    if pd.isna(authors_string) or not authors_string:
+    if is_missing(authors_string) or not authors_string:
         return "Unknown Author"
     
     authors = [a.strip() for a in str(authors_string).split(',')]
@@ -26,7 +30,7 @@ def format_authors(authors_string):
 
 def safe_thumbnail(thumbnail_url, fallback='/static/images/book-placeholder.jpg'):
     """Return thumbnail URL with fallback."""
-    if pd.isna(thumbnail_url) or not thumbnail_url:
+    if is_missing(thumbnail_url) or not thumbnail_url:
         return fallback
     return thumbnail_url
 
@@ -0,0 +1,57 @@
+"""
+Lazy Objects
+Stand-ins for expensive module-level objects (boto3 clients, resources and
+tables) that are only built on first attribute access, so importing an app
+does not pay for loading AWS service models it may never use.
+
+A proxy resolved in a process that later forks (gunicorn's preload_app
+master) would hand every worker the same client, connection pool and all;
+reset_all() in the child drops them so each worker builds its own.
+"""
+import threading
+import weakref
+
+_proxies = weakref.WeakSet()
+
+
+class LazyProxy:
+    """Forwards attribute access to `factory()`, called once on first use (again after reset())."""
+    __slots__ = ('_factory', '_lock', '_target', '__weakref__')
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._target = None
+        _proxies.add(self)
+
+    def resolve(self):
+        target = self._target
+        if target is None:
+            with self._lock:
+                if self._target is None:
+                    self._target = self._factory()
+                target = self._target
+        return target
+
+    @property
+    def resolved(self):
+        return self._target is not None
+
+    def reset(self):
+        """Forget the target; the next access builds a new one."""
+        self._lock = threading.Lock()  # A lock held across fork() by another thread stays held in the child
+        self._target = None
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+
+    def __repr__(self):
+        if self._target is None:
+            return f"<LazyProxy (unresolved) {getattr(self._factory, '__name__', self._factory)}>"
+        return f"<LazyProxy {self._target!r}>"
+
+
+def reset_all():
+    """Reset every LazyProxy in this process, e.g. in a freshly forked worker."""
+    for proxy in list(_proxies):
+        proxy.reset()
@@ -0,0 +1,249 @@
+"""
+Request Metrics
+Per-endpoint latency histograms, status counts and in-flight requests, plus
+per-request counts and durations of SQLite queries and boto3 (DynamoDB/SNS)
+calls and the hit ratios of the app's caches. Served at /metrics in the
+Prometheus text format to a logged-in admin or a scraper sending
+`Authorization: Bearer <METRICS_TOKEN>`.
+
+The hot path only takes a perf_counter() reading and a few counter updates
+under one lock; everything else is formatted at scrape time.
+"""
+import hmac
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from flask import g, has_request_context, request, session
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CALL_COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def lines(self, name, labels):
+        out = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            out.append(f"{name}_bucket{_labels(labels, le=bound)} {cumulative}")
+        out.append(f"{name}_sum{_labels(labels)} {self.sum:.6f}")
+        out.append(f"{name}_count{_labels(labels)} {cumulative}")
+        return out
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _sql_operation(sql):
+    return sql.lstrip().split(None, 1)[0].upper() if sql and sql.strip() else 'UNKNOWN'
+
+
+class Metrics:
+    """Flask extension; `app.extensions['metrics']`."""
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.request_latency = {}  # (endpoint, method) -> Histogram
+        self.responses = defaultdict(int)  # (endpoint, method, status) -> count
+        self.backend_calls = defaultdict(int)  # (backend, operation) -> count
+        self.backend_seconds = defaultdict(float)
+        self.calls_per_request = {}  # backend -> Histogram of calls per request
+        self.seconds_per_request = {}  # backend -> Histogram of time per request
+        self.caches = {}
+        self.collectors = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_TOKEN', None)
+        self.app = app
+        app.before_request(self._start_request)
+        app.after_request(self._note_status)
+        app.teardown_request(self._finish_request)
+        app.add_url_rule('/metrics', 'metrics', self.view)
+        app.extensions['metrics'] = self
+        app.extensions.setdefault('sql_listeners', []).append(self.record_sql)
+        self._boto3_instrumented = False
+        if 'boto3' in sys.modules:  # Apps that create clients lazily call instrument_boto3() first
+            self.instrument_boto3()
+
+    def track_caches(self, **caches):
+        """Report `hits`/`misses` counters of these objects (read only at scrape time)."""
+        self.caches.update(caches)
+
+    def add_collector(self, collector):
+        """Append the Prometheus lines `collector()` returns to every scrape."""
+        self.collectors.append(collector)
+
+    # === Request hooks ===
+
+    def _start_request(self):
+        g._metrics = [time.perf_counter(), None, {}]  # start, status, backend -> [calls, seconds]
+        with self._lock:
+            self.in_flight += 1
+
+    def _note_status(self, response):
+        state = g.get('_metrics')
+        if state:
+            state[1] = response.status_code
+        return response
+
+    def _finish_request(self, exc=None):
+        state = g.pop('_metrics', None)
+        if state is None:
+            return
+        start, status, backends = state
+        elapsed = time.perf_counter() - start
+        endpoint = request.endpoint or 'unmatched'
+        key = (endpoint, request.method)
+        status = 500 if exc is not None else (status or 500)
+
+        with self._lock:
+            self.in_flight -= 1
+            histogram = self.request_latency.get(key)
+            if histogram is None:
+                histogram = self.request_latency[key] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(elapsed)
+            self.responses[key + (status,)] += 1
+            for backend, (calls, seconds) in backends.items():
+                if backend not in self.calls_per_request:
+                    self.calls_per_request[backend] = Histogram(CALL_COUNT_BUCKETS)
+                    self.seconds_per_request[backend] = Histogram(LATENCY_BUCKETS)
+                self.calls_per_request[backend].observe(calls)
+                self.seconds_per_request[backend].observe(seconds)
+
+    # === Backend calls ===
+
+    def record_call(self, backend, operation, seconds):
+        with self._lock:
+            self.backend_calls[backend, operation] += 1
+            self.backend_seconds[backend, operation] += seconds
+        if has_request_context():
+            state = g.get('_metrics')
+            if state:
+                totals = state[2].setdefault(backend, [0, 0.0])
+                totals[0] += 1
+                totals[1] += seconds
+
+    def record_sql(self, connection, sql, params, seconds):
+        """Statement listener for utils.db_helper.TimedConnection."""
+        self.record_call('sqlite', _sql_operation(sql), seconds)
+
+    def instrument_boto3(self):
+        """Time every call made by clients created from boto3's default session from now on."""
+        if self._boto3_instrumented:
+            return
+        try:
+            import boto3
+        except ImportError:  # Optional dependency
+            return
+        self._boto3_instrumented = True
+        if boto3.DEFAULT_SESSION is None:
+            boto3.setup_default_session()
+        events = boto3.DEFAULT_SESSION.events
+        events.register('before-call', self._before_boto3_call, unique_id='bookstore-metrics-before')
+        events.register('after-call', self._after_boto3_call, unique_id='bookstore-metrics-after')
+        events.register('after-call-error', self._after_boto3_call, unique_id='bookstore-metrics-error')
+
+    def _before_boto3_call(self, context=None, **kwargs):
+        if context is not None:
+            context['metrics_start'] = time.perf_counter()
+
+    def _after_boto3_call(self, model=None, context=None, **kwargs):
+        start = context.pop('metrics_start', None) if context is not None else None
+        if start is not None and model is not None:
+            self.record_call(model.service_model.service_name, model.name, time.perf_counter() - start)
+
+    # === Exposition ===
+
+    def authorized(self):
+        token = self.app.config.get('METRICS_TOKEN')
+        header = request.headers.get('Authorization', '')
+        if token and hmac.compare_digest(header, f"Bearer {token}"):
+            return True
+        return 'admin_id' in session
+
+    def view(self):
+        if not self.authorized():
+            return self.app.response_class('Forbidden\n', status=403, mimetype='text/plain')
+        return self.app.response_class(self.render(), content_type=CONTENT_TYPE)
+
+    def render(self):
+        out = []
+
+        def header(name, kind, text):
+            out.append(f"# HELP {name} {text}")
+            out.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            header('bookstore_http_requests_in_flight', 'gauge', 'Requests currently being handled.')
+            out.append(f"bookstore_http_requests_in_flight {self.in_flight}")
+
+            header('bookstore_http_request_duration_seconds', 'histogram', 'Request latency by endpoint.')
+            for (endpoint, method), histogram in sorted(self.request_latency.items()):
+                out.extend(histogram.lines('bookstore_http_request_duration_seconds',
+                                           (('endpoint', endpoint), ('method', method))))
+
+            header('bookstore_http_responses_total', 'counter', 'Responses by endpoint and status code.')
+            for (endpoint, method, status), count in sorted(self.responses.items()):
+                out.append(f"bookstore_http_responses_total"
+                           f"{_labels((('endpoint', endpoint), ('method', method), ('status', status)))} {count}")
+
+            header('bookstore_backend_calls_total', 'counter', 'SQLite statements and AWS API calls.')
+            for (backend, operation), count in sorted(self.backend_calls.items()):
+                out.append(f"bookstore_backend_calls_total"
+                           f"{_labels((('backend', backend), ('operation', operation)))} {count}")
+
+            header('bookstore_backend_call_seconds_total', 'counter', 'Time spent in SQLite statements and AWS API calls.')
+            for (backend, operation), seconds in sorted(self.backend_seconds.items()):
+                out.append(f"bookstore_backend_call_seconds_total"
+                           f"{_labels((('backend', backend), ('operation', operation)))} {seconds:.6f}")
+
+            header('bookstore_backend_calls_per_request', 'histogram', 'Backend calls made by one request.')
+            for backend, histogram in sorted(self.calls_per_request.items()):
+                out.extend(histogram.lines('bookstore_backend_calls_per_request', (('backend', backend),)))
+
+            header('bookstore_backend_seconds_per_request', 'histogram', 'Backend time spent by one request.')
+            for backend, histogram in sorted(self.seconds_per_request.items()):
+                out.extend(histogram.lines('bookstore_backend_seconds_per_request', (('backend', backend),)))
+
+        header('bookstore_cache_hits_total', 'counter', 'Cache hits.')
+        stats = {name: (getattr(c, 'hits', 0), getattr(c, 'misses', 0)) for name, c in sorted(self.caches.items())}
+        for name, (hits, _) in stats.items():
+            out.append(f"bookstore_cache_hits_total{_labels((('cache', name),))} {hits}")
+        header('bookstore_cache_misses_total', 'counter', 'Cache misses.')
+        for name, (_, misses) in stats.items():
+            out.append(f"bookstore_cache_misses_total{_labels((('cache', name),))} {misses}")
+        header('bookstore_cache_hit_ratio', 'gauge', 'Hits / (hits + misses) since start.')
+        for name, (hits, misses) in stats.items():
+            ratio = hits / (hits + misses) if hits + misses else 0.0
+            out.append(f"bookstore_cache_hit_ratio{_labels((('cache', name),))} {ratio:.4f}")
+
+        for collector in self.collectors:
+            out.extend(collector())
+
+        return '\n'.join(out) + '\n'
@@ -0,0 +1,131 @@
+"""
+Cart Pricing Engine
+Single source of truth for subtotal, coupon discount, shipping, GST and total.
+Used by the cart, checkout and place-order routes of both apps.
+
+All money is Decimal. Totals are memoized per (cart_id, cart version), so a
+cart that hasn't changed is never re-summed.
+"""
+import threading
+from collections import OrderedDict
+from decimal import Decimal, ROUND_HALF_UP
+
+from utils.book import list_price
+
+TAX_RATE = Decimal('0.18')  # GST
+FREE_SHIPPING_OVER = Decimal('500')
+SHIPPING_FEE = Decimal('50')
+ZERO = Decimal('0')
+PAISA = Decimal('0.01')
+
+# Mock coupons
+COUPONS = {
+    'BOOK20': {'type': 'percent', 'value': 20, 'desc': '20% Off'},
+    'FIRST100': {'type': 'fixed', 'value': 100, 'desc': '₹100 Off'},
+    'WELCOME20': {'type': 'percent', 'value': 20, 'desc': 'Welcome Offer'}
+}
+
+
+def to_decimal(value):
+    """Convert a stored price to Decimal. DynamoDB values are already Decimal."""
+    if isinstance(value, Decimal):
+        return value
+    if value is None:
+        return ZERO
+    # repr of a float is its shortest round-trip form, e.g. 29.99 -> '29.99'
+    return Decimal(repr(value)) if isinstance(value, float) else Decimal(value)
+
+
+def _money(value):
+    return value.quantize(PAISA, rounding=ROUND_HALF_UP)
+
+
+def compute_totals(cart_items, coupon=None):
+    """Price a list of cart lines ({'price', 'quantity', ...}) with an optional coupon."""
+    subtotal = sum((to_decimal(item['price']) * int(item['quantity']) for item in cart_items), ZERO)
+
+    discount = ZERO
+    if coupon:
+        value = to_decimal(coupon['value'])
+        if coupon['type'] == 'percent':
+            discount = _money(subtotal * value / 100)
+        elif coupon['type'] == 'fixed':
+            discount = value
+
+    # Shipping logic (Free if > 500)
+    shipping = ZERO if subtotal > FREE_SHIPPING_OVER or subtotal == 0 else SHIPPING_FEE
+
+    # Tax (18% GST) on (Subtotal - Discount)
+    taxable_amount = max(ZERO, subtotal - discount)
+    tax = _money(taxable_amount * TAX_RATE)
+
+    total = max(ZERO, subtotal - discount + shipping + tax)
+
+    return {
+        'subtotal': subtotal,
+        'discount': discount,
+        'shipping': shipping,
+        'tax': tax,
+        'total': total
+    }
+
+
+def reprice_items(cart_items, catalog_rows):
+    """
+    Apply current catalog prices to cart lines in one pass.
+    `catalog_rows` maps isbn13 -> {'price': ..., 'stock': ...} from a single batch read;
+    an unset or zero price reprices to DEFAULT_PRICE, as it does on the Book the line came from.
+    Returns (repriced_items, changed) where `changed` maps isbn13 -> new Decimal price.
+    """
+    repriced = []
+    changed = {}
+
+    for item in cart_items:
+        line = dict(item)
+        line['price'] = to_decimal(item['price'])
+
+        row = catalog_rows.get(item['isbn13'])
+        if row is not None:
+            current = to_decimal(list_price(row.get('price')))
+            if current != line['price']:
+                line['price'] = current
+                changed[item['isbn13']] = current
+
+        line['subtotal'] = line['price'] * int(line['quantity'])
+        repriced.append(line)
+
+    return repriced, changed
+
+
+class PricingEngine:
+    """Memoizes compute_totals() per (cart_id, version) in a bounded LRU."""
+
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def price(self, cart_items, coupon=None, cart_id=None, version=None):
+        """Return totals for a cart, reusing the memoized result for an unchanged version."""
+        key = (cart_id, version) if cart_id and version is not None else None
+
+        if key is not None:
+            with self._lock:
+                totals = self._memo.get(key)
+                if totals is not None:
+                    self._memo.move_to_end(key)
+                    self.hits += 1
+                    return dict(totals)
+
+        totals = compute_totals(cart_items, coupon)
+
+        with self._lock:
+            self.misses += 1
+            if key is not None:
+                self._memo[key] = totals
+                if len(self._memo) > self.max_entries:
+                    self._memo.popitem(last=False)
+
+        return dict(totals)
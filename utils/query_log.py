@@ -0,0 +1,156 @@
+"""
+SQLite Slow-Query Log
+Listens to every statement run through get_db(), normalizes its SQL text
+(literals and IN-lists become ?), and keeps per-statement counts and timings.
+Statements slower than SLOW_QUERY_MS are printed and appended as JSON lines
+to SLOW_QUERY_LOG together with their EXPLAIN QUERY PLAN, flagging full
+table scans and temp B-tree sorts.
+
+The top statements are served at /admin/slow-queries; `python
+slow_queries.py` aggregates the log file from the command line.
+"""
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+from flask import has_request_context, jsonify, redirect, request, session, url_for
+
+DEFAULTS = {
+    'SLOW_QUERY_MS': 50,
+    'SLOW_QUERY_LOG': None,  # Defaults to <instance>/slow_queries.jsonl
+}
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.I)
+_SPACE = re.compile(r'\s+')
+_FULL_SCAN = re.compile(r'^SCAN (\w+)(?!\w| USING)')
+
+
+def normalize_sql(sql):
+    """Statement shape: literals and IN-lists replaced with ?, whitespace collapsed."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (?...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def _single_binding(params):
+    """Parameters of one statement; executemany() passes a sequence of sets, so use the first."""
+    if isinstance(params, dict) or not params:
+        return params or ()
+    first = params[0]
+    return first if isinstance(first, (tuple, list, dict)) else params
+
+
+def explain(connection, sql, params=()):
+    """EXPLAIN QUERY PLAN as indented detail lines (bypasses the statement listeners)."""
+    try:
+        rows = sqlite3.Connection.execute(connection, f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    except sqlite3.Error as e:
+        return [f"(no plan: {e})"]
+
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node_id] + detail)
+    return lines
+
+
+def plan_warnings(plan):
+    warnings = []
+    for line in plan:
+        detail = line.strip()
+        match = _FULL_SCAN.match(detail)
+        if match:
+            warnings.append(f"full scan of {match.group(1)}")
+        elif detail.startswith('USE TEMP B-TREE'):
+            warnings.append(detail.lower())
+    return warnings
+
+
+class QueryLog:
+    """Flask extension; `app.extensions['query_log']`."""
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self.stats = defaultdict(lambda: {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'slow': 0})
+        self.plans = {}  # normalized sql -> (plan, warnings), captured on the first slow run
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        for key, value in DEFAULTS.items():
+            app.config.setdefault(key, value)
+        self.app = app
+        self.threshold_ms = float(app.config['SLOW_QUERY_MS'])
+        self.path = app.config['SLOW_QUERY_LOG'] or f"{app.instance_path}/slow_queries.jsonl"
+        app.add_url_rule('/admin/slow-queries', 'admin_slow_queries', self.report_view)
+        app.extensions['query_log'] = self
+        app.extensions.setdefault('sql_listeners', []).append(self.record)
+
+    def record(self, connection, sql, params, seconds):
+        """Statement listener for utils.db_helper.TimedConnection."""
+        if sql.lstrip()[:7].upper() == 'EXPLAIN':
+            return
+        ms = seconds * 1000
+        normalized = normalize_sql(sql)
+        slow = ms >= self.threshold_ms
+
+        with self._lock:
+            entry = self.stats[normalized]
+            entry['count'] += 1
+            entry['total_ms'] += ms
+            entry['max_ms'] = max(entry['max_ms'], ms)
+            entry['slow'] += slow
+            known_plan = self.plans.get(normalized)
+
+        if slow:
+            if known_plan is None:
+                plan = explain(connection, sql, _single_binding(params))
+                known_plan = (plan, plan_warnings(plan))
+                with self._lock:
+                    self.plans[normalized] = known_plan
+            self._log_slow(normalized, ms, *known_plan)
+
+    def _log_slow(self, normalized, ms, plan, warnings):
+        endpoint = request.endpoint if has_request_context() else None
+        print(f"🐢 Slow query ({ms:.1f} ms, {endpoint or 'no request'}): {normalized}")
+        for line in plan:
+            print(f"     {line}")
+
+        record = {
+            'ts': round(time.time(), 3), 'ms': round(ms, 3), 'endpoint': endpoint,
+            'sql': normalized, 'plan': plan, 'warnings': warnings
+        }
+        try:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+        except OSError as e:
+            print(f"Slow-query log write failed: {e}")
+
+    def top(self, n=20, sort='total_ms'):
+        with self._lock:
+            rows = [
+                dict(entry, sql=sql, mean_ms=entry['total_ms'] / entry['count'],
+                     plan=self.plans.get(sql, (None, None))[0], warnings=self.plans.get(sql, (None, []))[1])
+                for sql, entry in self.stats.items()
+            ]
+        rows.sort(key=lambda row: row[sort], reverse=True)
+        for row in rows:
+            for key in ('total_ms', 'max_ms', 'mean_ms'):
+                row[key] = round(row[key], 3)
+        return rows[:n]
+
+    def report_view(self):
+        if 'admin_id' not in session:
+            return redirect(url_for('admin_login'))
+        sort = request.args.get('sort', 'total_ms')
+        if sort not in ('total_ms', 'max_ms', 'mean_ms', 'count', 'slow'):
+            sort = 'total_ms'
+        n = request.args.get('n', 20, type=int)
+        return jsonify({'threshold_ms': self.threshold_ms, 'sort': sort, 'statements': self.top(n, sort)})
@@ -0,0 +1,110 @@
+"""
+Single-Flight Request Coalescing
+When identical reads are in flight at the same time (the same /api/books
+filters, the same Books item, the same snapshot check), only the first runs
+against the backend; the others wait for it and share its result (or its
+exception). Keys are tuples whose first element names the kind of call, which
+labels the executed/coalesced counters exported at /metrics.
+
+Shared results are the same objects for every waiter: callers that mutate
+them (e.g. sort a list in place) must copy first.
+"""
+import threading
+from collections import defaultdict
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._running = {}  # key -> _Call being executed
+        self._pending = {}  # key -> _Call queued behind the running one (do_fresh)
+        self.executed = defaultdict(int)  # kind -> backend executions
+        self.coalesced = defaultdict(int)  # kind -> calls answered by another call's execution
+
+    def do(self, key, fn):
+        """Return fn(), sharing the execution with identical calls already in flight."""
+        with self._lock:
+            call = self._running.get(key)
+            if call is not None:
+                self.coalesced[key[0]] += 1
+                leader = False
+            else:
+                call = self._running[key] = _Call()
+                self.executed[key[0]] += 1
+                leader = True
+        if not leader:
+            return call.wait()
+        return self._run(key, call, fn)
+
+    def do_fresh(self, key, fn):
+        """
+        Like do(), but only shares an execution that starts after this call was
+        made, for rebuilds that must see a preceding write. Calls arriving while
+        one runs all share the single next run.
+        """
+        with self._lock:
+            call = self._pending.get(key)
+            if call is not None:
+                self.coalesced[key[0]] += 1
+                leader = False
+            else:
+                call = self._pending[key] = _Call()
+                leader = True
+        if not leader:
+            return call.wait()
+
+        while True:
+            with self._lock:
+                running = self._running.get(key)
+                if running is None:
+                    del self._pending[key]
+                    self._running[key] = call
+                    self.executed[key[0]] += 1
+                    break
+            running.done.wait()
+        return self._run(key, call, fn)
+
+    def _run(self, key, call, fn):
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._running[key]
+            call.done.set()
+        return call.result
+
+    def metric_lines(self):
+        """Prometheus lines for Metrics.add_collector()."""
+        with self._lock:
+            executed = sorted(self.executed.items())
+            coalesced = dict(self.coalesced)
+        out = [
+            '# HELP bookstore_single_flight_executions_total Backend executions per kind of coalesced read.',
+            '# TYPE bookstore_single_flight_executions_total counter',
+        ]
+        out += [f'bookstore_single_flight_executions_total{{kind="{kind}"}} {count}' for kind, count in executed]
+        out += [
+            '# HELP bookstore_single_flight_coalesced_total Calls that shared an identical in-flight execution.',
+            '# TYPE bookstore_single_flight_coalesced_total counter',
+        ]
+        out += [f'bookstore_single_flight_coalesced_total{{kind="{kind}"}} {coalesced.get(kind, 0)}'
+                for kind, _ in executed]
+        return out
@@ -0,0 +1,157 @@
+"""
+Stale-While-Revalidate Cache
+For catalog-derived data (homepage aggregates, related books, the full
+listing scan). Each entry has two deadlines:
+
+- soft TTL: past it the entry is still served, and one background refresh is
+  queued on this process's refresh thread. Soft deadlines are jittered so
+  entries (and workers) don't all refresh at once.
+- hard TTL: past it a request loads synchronously.
+
+If a load fails (the backend is unavailable), requests keep getting the last
+value, however old, and only a cold miss raises. Entries also carry the
+catalog version they were loaded at: a catalog write (version bump) makes the
+next read load synchronously so writes are visible at once. Writes that can
+show up a refresh later (stock changes from orders) call expire() instead,
+which only moves every entry past its soft TTL.
+"""
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_SOFT_TTL = 30.0
+DEFAULT_HARD_TTL = 600.0
+JITTER = 0.2  # Soft deadlines land in [soft_ttl * (1 - JITTER), soft_ttl]
+RETRY_AFTER_ERROR = 5.0  # Seconds before retrying a failed background refresh
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def refresh_executor():
+    """This process's single refresh thread (threads don't survive gunicorn's fork)."""
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='swr-refresh')
+            _executor_pid = os.getpid()
+        return _executor
+
+
+class _Entry:
+    __slots__ = ('value', 'version', 'soft', 'hard')
+
+    def __init__(self, value, version, soft, hard):
+        self.value = value
+        self.version = version
+        self.soft = soft
+        self.hard = hard
+
+
+class SWRCache:
+    """
+    `version()` returns the current catalog version; `app` (optional) gives
+    background refreshes an app context, for loaders that use get_db().
+    """
+
+    def __init__(self, soft_ttl=DEFAULT_SOFT_TTL, hard_ttl=DEFAULT_HARD_TTL, version=None,
+                 app=None, max_entries=1024):
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = hard_ttl
+        self.version = version
+        self.app = app
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0  # Served past the soft TTL while a refresh ran
+        self.fallbacks = 0  # Served stale because a load failed
+        self.refresh_errors = 0
+
+    def get(self, key, load):
+        """Cached load() for `key`; see the module docstring for freshness rules."""
+        version = self.version() if self.version else None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            usable = entry is not None and entry.version == version and now < entry.hard
+            if usable:
+                self._entries.move_to_end(key)
+                if now < entry.soft:
+                    self.hits += 1
+                    return entry.value
+                self.stale_hits += 1
+                refresh = key not in self._refreshing
+                self._refreshing.add(key)
+            else:
+                self.misses += 1
+
+        if usable:
+            if refresh:
+                refresh_executor().submit(self._refresh, key, load, version)
+            return entry.value
+
+        try:
+            value = load()
+        except Exception as e:
+            if entry is None:
+                raise
+            with self._lock:
+                self.fallbacks += 1
+            print(f"⚠️  Serving stale {key!r} after a failed load: {e}")
+            return entry.value
+        self._store(key, value, version)
+        return value
+
+    def expire(self):
+        """Put every entry past its soft TTL: each is served once more while a refresh is queued."""
+        with self._lock:
+            for entry in self._entries.values():
+                entry.soft = 0.0
+
+    def _refresh(self, key, load, version):
+        try:
+            if self.app is not None:
+                with self.app.app_context():
+                    value = load()
+            else:
+                value = load()
+            self._store(key, value, version)
+        except Exception as e:
+            with self._lock:
+                self.refresh_errors += 1
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.soft = time.monotonic() + RETRY_AFTER_ERROR
+            print(f"⚠️  Background refresh of {key!r} failed, still serving the previous value: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _store(self, key, value, version):
+        now = time.monotonic()
+        soft = now + self.soft_ttl * random.uniform(1 - JITTER, 1)
+        with self._lock:
+            self._entries[key] = _Entry(value, version, soft, now + self.hard_ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def metric_lines(self, name):
+        """Prometheus lines for Metrics.add_collector() (hits/misses go through track_caches)."""
+        out = []
+        for metric, attribute, text in (
+            ('bookstore_swr_stale_served_total', 'stale_hits', 'Entries served stale while refreshing.'),
+            ('bookstore_swr_fallbacks_total', 'fallbacks', 'Stale entries served because a load failed.'),
+            ('bookstore_swr_refresh_errors_total', 'refresh_errors', 'Failed background refreshes.'),
+        ):
+            out.append(f'# HELP {metric} {text}')
+            out.append(f'# TYPE {metric} counter')
+            out.append(f'{metric}{{cache="{name}"}} {getattr(self, attribute)}')
+        return out
@@ -0,0 +1,165 @@
+"""
+Book Cover Thumbnails
+Fetches each book's remote cover once, keeps the original on disk and serves
+resized WebP/JPEG variants from a local cache, so catalog grids load small
+same-origin images instead of third-party URLs.
+
+Layout: <cache_dir>/<isbn13>/original, <size>.webp, <size>.jpg, and a
+`missing` marker when the remote fetch failed (retried after MISSING_RETRY).
+"""
+import io
+import os
+import re
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import redirect, request, send_file
+
+# Bounding boxes (width, height); covers keep their aspect ratio
+SIZES = {
+    'sm': (96, 144),
+    'md': (256, 384),
+    'lg': (512, 768),
+}
+FORMATS = {'webp': 'image/webp', 'jpg': 'image/jpeg'}
+PLACEHOLDER_IMAGE = '/static/images/book-placeholder.jpg'
+
+CACHE_MAX_AGE = 30 * 24 * 3600  # Covers rarely change
+MISSING_RETRY = 24 * 3600
+FETCH_TIMEOUT = 5
+MAX_ORIGINAL_BYTES = 5 * 1024 * 1024
+USER_AGENT = 'BookSpot-Thumbnailer/1.0'
+LOCK_STRIPES = 64  # Fixed lock pool: same-ISBN fetches serialize, memory doesn't grow per ISBN
+
+_ISBN_RE = re.compile(r'^[0-9A-Za-z-]{10,20}$')
+
+
+class ThumbnailCache:
+    """Disk cache of fetched covers and their resized variants."""
+
+    def __init__(self, cache_dir, timeout=FETCH_TIMEOUT):
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+    def _dir(self, isbn13):
+        return os.path.join(self.cache_dir, isbn13)
+
+    def _lock(self, isbn13):
+        return self._locks[hash(isbn13) % LOCK_STRIPES]
+
+    def fetch_original(self, isbn13, source_url):
+        """
+        Return the original cover bytes, downloading them on first use (None if unavailable).
+        `source_url` may be a callable, so the catalog is only consulted on a cache miss.
+        """
+        folder = self._dir(isbn13)
+        original = os.path.join(folder, 'original')
+        missing = os.path.join(folder, 'missing')
+
+        if os.path.exists(original):
+            with open(original, 'rb') as f:
+                return f.read()
+        if os.path.exists(missing) and time.time() - os.path.getmtime(missing) < MISSING_RETRY:
+            return None
+        if callable(source_url):
+            source_url = source_url()
+        if not source_url or not source_url.startswith(('http://', 'https://')):
+            return None
+
+        os.makedirs(folder, exist_ok=True)
+        try:
+            req = urllib.request.Request(source_url, headers={'User-Agent': USER_AGENT})
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                data = response.read(MAX_ORIGINAL_BYTES + 1)
+            if not data or len(data) > MAX_ORIGINAL_BYTES:
+                raise ValueError(f"unusable image ({len(data)} bytes)")
+        except Exception as e:
+            print(f"Thumbnail fetch failed for {isbn13}: {e}")
+            open(missing, 'w').close()
+            return None
+
+        _write_atomic(original, data)
+        if os.path.exists(missing):
+            os.remove(missing)
+        return data
+
+    def get(self, isbn13, size, fmt, source_url):
+        """Path of the resized variant, creating it if needed (None if the cover is unavailable)."""
+        if size not in SIZES or fmt not in FORMATS or not _ISBN_RE.match(isbn13):
+            return None
+
+        path = os.path.join(self._dir(isbn13), f"{size}.{fmt}")
+        if os.path.exists(path):
+            return path
+
+        with self._lock(isbn13):
+            if os.path.exists(path):
+                return path
+            data = self.fetch_original(isbn13, source_url)
+            if data is None:
+                return None
+            try:
+                _write_atomic(path, resize(data, SIZES[size], fmt))
+            except Exception as e:
+                print(f"Thumbnail resize failed for {isbn13}: {e}")
+                return None
+        return path
+
+    def prefetch(self, books, sizes=tuple(SIZES), formats=tuple(FORMATS), workers=8):
+        """
+        Warm the cache for (isbn13, source_url) pairs in parallel.
+        Returns (ready, unavailable) counts.
+        """
+        def warm(book):
+            isbn13, source_url = book
+            return all(self.get(isbn13, size, fmt, source_url) for size in sizes for fmt in formats)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(warm, books))
+        return results.count(True), results.count(False)
+
+
+def resize(data, box, fmt):
+    """Shrink image bytes to fit `box` and encode as WebP or progressive JPEG."""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert('RGB')
+        image.thumbnail(box, Image.LANCZOS)
+        out = io.BytesIO()
+        if fmt == 'webp':
+            image.save(out, 'WEBP', quality=80, method=4)
+        else:
+            image.save(out, 'JPEG', quality=82, optimize=True, progressive=True)
+        return out.getvalue()
+
+
+def _write_atomic(path, data):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def preferred_format():
+    """WebP for browsers that list it explicitly (a bare */* doesn't count), JPEG otherwise."""
+    return 'webp' if 'image/webp' in request.accept_mimetypes.values() else 'jpg'
+
+
+def send_thumbnail(cache, isbn13, size, source_url):
+    """Response for /img/<isbn13>/<size>: the cached variant, or a redirect to the placeholder."""
+    fmt = preferred_format()
+    path = cache.get(isbn13, size, fmt, source_url)
+
+    if path is None:
+        response = redirect(PLACEHOLDER_IMAGE)
+        response.cache_control.max_age = 3600
+        return response
+
+    response = send_file(path, mimetype=FORMATS[fmt], max_age=CACHE_MAX_AGE)
+    response.cache_control.public = True
+    response.vary.add('Accept')
+    return response